@@ -0,0 +1,26 @@
+"""Cost of serialising logs for output."""
+import io
+
+import pytest
+
+from elastic_log_cli.output import JSONLinesWriter, dumps
+
+
+@pytest.mark.parametrize("sort_keys", [True, False])
+def bench_dumps(benchmark, corpus: list[dict], sort_keys: bool) -> None:
+    document = corpus[0]
+    benchmark(dumps, document, sort_keys=sort_keys)
+
+
+@pytest.mark.parametrize("buffer_size", [0, 64 * 1024])
+def bench_write(benchmark, corpus: list[dict], buffer_size: int) -> None:
+    documents = corpus[:10_000]
+
+    def _write() -> None:
+        with JSONLinesWriter(io.BytesIO(), buffer_size=buffer_size) as writer:
+            for document in documents:
+                writer.write(document)
+
+    benchmark(_write)
+    if benchmark.stats:  # Not collected with --benchmark-disable
+        benchmark.extra_info["documents_per_second"] = len(documents) / benchmark.stats.stats.mean
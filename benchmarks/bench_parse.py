@@ -0,0 +1,18 @@
+"""Latency of compiling KQL queries."""
+import pytest
+
+from benchmarks.corpus import QUERIES
+from elastic_log_cli.kql import parse
+from elastic_log_cli.kql.parser import get_parser
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def bench_parse(benchmark, query: str) -> None:
+    get_parser()
+    benchmark(parse, query, cache=False)
+
+
+@pytest.mark.parametrize("query", QUERIES[:1])
+def bench_parse_cached(benchmark, query: str) -> None:
+    parse(query)
+    benchmark(parse, query)
@@ -0,0 +1,80 @@
+"""End-to-end throughput of scans against a local fake Elasticsearch."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from elastic_log_cli.search import point_in_time_scan, search_after_scan, time_window_scan
+from tests.fake_elasticsearch import FakeElasticsearch
+
+SORT: list[dict | str] = [{"@timestamp": {"order": "asc"}}, "_seq_no"]
+QUERY: dict = {"match_all": {}}
+PAGE_SIZE = 1000
+
+
+def _exhaust(benchmark, elasticsearch: FakeElasticsearch, scan) -> None:
+    count = benchmark.pedantic(lambda: sum(1 for _ in scan()), rounds=3, warmup_rounds=1)
+    assert count == len(elasticsearch.documents)
+    if benchmark.stats:  # Not collected with --benchmark-disable
+        benchmark.extra_info["documents_per_second"] = count / benchmark.stats.stats.mean
+
+
+def bench_search_after_scan(benchmark, elasticsearch: FakeElasticsearch) -> None:
+    _exhaust(
+        benchmark,
+        elasticsearch,
+        lambda: search_after_scan(index="logs", query=QUERY, sort=SORT, size=PAGE_SIZE, prefetch=1),
+    )
+
+
+def bench_search_after_scan_without_prefetch(benchmark, elasticsearch: FakeElasticsearch) -> None:
+    _exhaust(
+        benchmark,
+        elasticsearch,
+        lambda: search_after_scan(index="logs", query=QUERY, sort=SORT, size=PAGE_SIZE),
+    )
+
+
+@pytest.mark.parametrize("slices", [1, 4])
+def bench_point_in_time_scan(benchmark, elasticsearch: FakeElasticsearch, slices: int) -> None:
+    _exhaust(
+        benchmark,
+        elasticsearch,
+        lambda: point_in_time_scan(index="logs", query=QUERY, sort=SORT, size=PAGE_SIZE, slices=slices),
+    )
+
+
+def bench_time_window_scan(benchmark, elasticsearch: FakeElasticsearch) -> None:
+    _exhaust(
+        benchmark,
+        elasticsearch,
+        lambda: time_window_scan(
+            index="logs", query=QUERY, sort=SORT, timestamp_field="@timestamp", size=PAGE_SIZE, parallel=4
+        ),
+    )
+
+
+def bench_cli(benchmark, elasticsearch: FakeElasticsearch) -> None:
+    """Run `elastic-logs` in a subprocess, including interpreter start-up and writing output."""
+    command = [
+        sys.executable,
+        "-m",
+        "elastic_log_cli",
+        "--start",
+        "2022-03-01T00:00:00",
+        "--end",
+        "2022-03-10T00:00:00",
+        "--page-size",
+        str(PAGE_SIZE),
+        "level:*",
+    ]
+
+    def _run() -> int:
+        result = subprocess.run(command, env=os.environ, stdout=subprocess.PIPE, check=True)
+        return result.stdout.count(b"\n")
+
+    count = benchmark.pedantic(_run, rounds=3, warmup_rounds=1)
+    assert count == len(elasticsearch.documents)
+    if benchmark.stats:  # Not collected with --benchmark-disable
+        benchmark.extra_info["documents_per_second"] = count / benchmark.stats.stats.mean
@@ -0,0 +1,40 @@
+import pytest
+
+from benchmarks.corpus import synthetic_logs
+from benchmarks.server import serve
+from elastic_log_cli import search
+from elastic_log_cli.config import get_cluster_settings
+from tests.fake_elasticsearch import FakeElasticsearch
+
+
+def pytest_addoption(parser):
+    parser.addoption("--corpus-size", type=int, default=20_000, help="Number of synthetic logs to index.")
+
+
+@pytest.fixture(scope="session")
+def corpus(request) -> list[dict]:
+    return synthetic_logs(request.config.getoption("corpus_size"))
+
+
+@pytest.fixture(scope="session")
+def elasticsearch(corpus: list[dict]):
+    """Run a local fake Elasticsearch containing the corpus, and point the library at it."""
+    fake = FakeElasticsearch()
+    fake.index(corpus)
+    with serve(fake) as url, pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("ELASTICSEARCH_URL", url)
+        monkeypatch.setenv("ELASTICSEARCH_INDEX", "logs")
+        _clear_caches()
+        yield fake
+    _clear_caches()
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(monkeypatch, tmp_path):
+    """Keep persistent caches out of the user's home directory."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+
+
+def _clear_caches() -> None:
+    for function in (get_cluster_settings, search.get_cluster_client):
+        function.cache_clear()
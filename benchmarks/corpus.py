@@ -0,0 +1,48 @@
+"""Synthetic corpora of logs and KQL queries."""
+import random
+from datetime import datetime, timedelta
+
+LEVELS = ["DEBUG", "INFO", "INFO", "INFO", "WARNING", "ERROR"]
+SERVICES = ["api", "worker", "scheduler", "gateway", "auth"]
+
+QUERIES = [
+    "level:ERROR",
+    "service:api and level:(ERROR or WARNING)",
+    "not level:DEBUG",
+    "http.response.status_code >= 500 and http.request.method:POST",
+    "message:timeout or message:refused or message:reset",
+    'service:gateway and url.path:"/api/v1/users" and not user.id:anonymous',
+    "kubernetes:{ namespace:production and pod.name:api-5d8f9c } and level:ERROR",
+    "(service:api or service:worker) and (level:ERROR or http.response.status_code > 499) and not tags:healthcheck",
+    "event.duration > 1000000 and event.duration <= 5000000",
+    "host.name:web-01 web-02 web-03",
+]
+
+
+def synthetic_logs(count: int, seed: int = 0, start: datetime = datetime(2022, 3, 5)) -> list[dict]:
+    """Generate logs shaped like those shipped by filebeat, roughly 500 bytes each."""
+    generator = random.Random(seed)
+    logs = []
+    for i in range(count):
+        service = generator.choice(SERVICES)
+        status = generator.choice([200, 200, 200, 201, 204, 301, 400, 404, 500, 503])
+        logs.append(
+            {
+                "@timestamp": (start + timedelta(milliseconds=250 * i)).isoformat(),
+                "level": generator.choice(LEVELS),
+                "service": service,
+                "message": f"{service} handled request {generator.getrandbits(64):016x} with status {status}",
+                "host": {"name": f"web-{generator.randint(1, 20):02}"},
+                "http": {
+                    "request": {"method": generator.choice(["GET", "GET", "POST", "PUT", "DELETE"])},
+                    "response": {"status_code": status, "bytes": generator.randint(100, 100_000)},
+                },
+                "event": {"duration": generator.randint(10_000, 10_000_000)},
+                "kubernetes": {
+                    "namespace": "production",
+                    "pod": {"name": f"{service}-{generator.getrandbits(24):06x}"},
+                },
+                "tags": generator.sample(["beats", "healthcheck", "canary", "eu-west-1"], k=2),
+            }
+        )
+    return logs
@@ -0,0 +1,59 @@
+"""HTTP server in front of the in-memory fake Elasticsearch, so benchmarks exercise real connections."""
+import gzip
+import json
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from urllib.parse import parse_qs, urlparse
+
+from tests.fake_elasticsearch import FakeElasticsearch
+
+
+@contextmanager
+def serve(elasticsearch: FakeElasticsearch) -> Iterator[str]:
+    """Serve the fake on a free local port for the duration of the context, yielding its URL."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            self._handle()
+
+        def do_POST(self) -> None:
+            self._handle()
+
+        def do_DELETE(self) -> None:
+            self._handle()
+
+        def log_message(self, *_) -> None:
+            pass
+
+        def _handle(self) -> None:
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            content = self.rfile.read(int(self.headers.get("content-length", 0)))
+            if content and self.headers.get("content-encoding") == "gzip":
+                content = gzip.decompress(content)
+            status, payload = elasticsearch.handle(
+                self.command, url.path, params, json.loads(content) if content else None
+            )
+            response_content = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            if "gzip" in self.headers.get("accept-encoding", ""):
+                response_content = gzip.compress(response_content, compresslevel=1)
+                self.send_header("content-encoding", "gzip")
+            self.send_header("content-length", str(len(response_content)))
+            self.end_headers()
+            self.wfile.write(response_content)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,13 @@
+try:
+    import httpx
+except ImportError as exc:
+    raise RuntimeError(
+        """Async dependencies are not installed, please run
+    pip install elastic-log-cli[async]
+"""
+    ) from exc
+
+
+__all__ = [
+    "httpx",
+]
@@ -0,0 +1,13 @@
+try:
+    import ijson
+except ImportError as exc:
+    raise RuntimeError(
+        """Streaming dependencies are not installed, please run
+    pip install elastic-log-cli[streaming]
+"""
+    ) from exc
+
+
+__all__ = [
+    "ijson",
+]
@@ -0,0 +1,15 @@
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError as exc:
+    raise RuntimeError(
+        """Columnar output dependencies are not installed, please run
+    pip install elastic-log-cli[arrow]
+"""
+    ) from exc
+
+
+__all__ = [
+    "pyarrow",
+]
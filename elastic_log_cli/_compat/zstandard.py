@@ -0,0 +1,13 @@
+try:
+    import zstandard
+except ImportError as exc:
+    raise RuntimeError(
+        """Zstandard dependencies are not installed, please run
+    pip install elastic-log-cli[zstd]
+"""
+    ) from exc
+
+
+__all__ = [
+    "zstandard",
+]
@@ -0,0 +1,177 @@
+"""Asynchronous equivalents of `elastic_log_cli.search`, built on `httpx`.
+
+Allows many scans (e.g. of different indices or time windows) to run concurrently from a single process, sharing a
+pool of connections.
+
+Usage:
+
+    async with get_async_client(max_connections=4) as client:
+        async for hit in search_after_scan(client, index="filebeat-*", query=query, sort=sort):
+            ...
+
+Requires the `async` extra to be installed.
+"""
+import asyncio
+import os
+from collections.abc import AsyncIterator, Generator
+
+from elastic_log_cli import __version__
+from elastic_log_cli._compat.httpx import httpx
+from elastic_log_cli.config import get_settings
+from elastic_log_cli.search import ElasticsearchError, get_api_key, get_elasticsearch_url, search_body, search_params
+from elastic_log_cli.utils.backoff import Backoff, exponential_backoff
+from elastic_log_cli.utils.polling import PollingInterval
+
+
+async def search_after_scan(
+    client: httpx.AsyncClient,
+    index: str,
+    query: dict,
+    sort: list[dict | str] | dict | str,
+    source: list[str] | dict | bool | None = None,
+    size: int = 1000,
+    backoff: Backoff = None,
+    follow: bool = False,
+    polling: PollingInterval = None,
+    fields: list[str] = None,
+    docvalue_fields: list[str] = None,
+    filter_path: str = None,
+) -> AsyncIterator[dict]:
+    """Asynchronous implementation of `search_after` pagination (without point-in-time).
+
+    Behaves as `elastic_log_cli.search.search_after_scan`. Back-off waits are performed in a worker thread, so they
+    do not block the event loop.
+    """
+    backoff = backoff or exponential_backoff(base=2.0, factor=1.0, maximum=10)
+    polling = polling or PollingInterval()
+    search_after = None
+    while True:
+        try:
+            result = await search(
+                client,
+                index=index,
+                query=query,
+                source=source,
+                fields=fields,
+                docvalue_fields=docvalue_fields,
+                filter_path=filter_path,
+                sort=sort,
+                size=size,
+                search_after=search_after,
+            )
+        except httpx.TransportError as exc:
+            await asyncio.to_thread(backoff.trigger, exc)
+            continue
+        backoff.reset()
+        hits = result.get("hits", {}).get("hits", [])
+        if not hits and not follow:
+            return
+        if hits:
+            search_after = hits[-1]["sort"]
+            for hit in hits:
+                yield hit
+        if follow:
+            await asyncio.sleep(polling.next(received=len(hits), capacity=size))
+
+
+async def search(
+    client: httpx.AsyncClient,
+    index: str,
+    query: dict,
+    sort: list[dict | str] | dict | str,
+    source: list[str] | dict | bool | None = None,
+    size: int = 1000,
+    search_after: list[str] = None,
+    pit: dict = None,
+    search_slice: dict = None,
+    fields: list[str] = None,
+    docvalue_fields: list[str] = None,
+    filter_path: str = None,
+) -> dict:
+    """Perform a single search request, as `elastic_log_cli.search.search`."""
+    response = await client.request(
+        "GET",
+        "/_search" if pit else f"/{index}/_search",
+        params=search_params(filter_path),
+        json=search_body(
+            query=query,
+            sort=sort,
+            source=source,
+            fields=fields,
+            docvalue_fields=docvalue_fields,
+            size=size,
+            search_after=search_after,
+            pit=pit,
+            search_slice=search_slice,
+        ),
+    )
+    if response.is_error:
+        raise ElasticsearchError(response.status_code, response.text)
+    return response.json()
+
+
+def get_async_client(
+    max_connections: int = 10,
+    max_keepalive_connections: int = 10,
+    keepalive_expiry: float = 30.0,
+) -> httpx.AsyncClient:
+    """Build an asynchronous client for the configured cluster.
+
+    Connections are pooled and kept alive between requests, so many concurrent scans can share a few connections.
+    Requests beyond `max_connections` wait for a connection to become available.
+
+    Compressed responses are negotiated unless compression is disabled, but request bodies are never compressed.
+    """
+    settings = get_settings()
+
+    headers = {"user-agent": f"elastic-log-cli-{__version__}"}
+    if settings.elasticsearch_compression == "none":
+        headers["accept-encoding"] = "identity"
+    auth: httpx.Auth | tuple[str, str] | None = None
+    if settings.elasticsearch_auth_mode == "basicauth":
+        if settings.elasticsearch_username and settings.elasticsearch_password:
+            auth = (settings.elasticsearch_username, settings.elasticsearch_password)
+    elif settings.elasticsearch_auth_mode == "apikey":
+        headers["authorization"] = f"ApiKey {get_api_key()}"
+    elif settings.elasticsearch_auth_mode == "awssigv4":
+        auth = get_async_awssigv4_auth()
+
+    return httpx.AsyncClient(
+        base_url=get_elasticsearch_url(),
+        headers=headers,
+        auth=auth,
+        timeout=settings.elasticsearch_timeout,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        ),
+    )
+
+
+def get_async_awssigv4_auth() -> httpx.Auth:
+    from botocore.auth import SigV4Auth
+    from botocore.awsrequest import AWSRequest
+
+    from elastic_log_cli._compat import aws  # This will trigger errors if dependencies not installed
+
+    class AWSV4SignerAuth(httpx.Auth):
+        requires_request_body = True
+
+        def __init__(self, credentials, region):
+            if not credentials:
+                raise ValueError("Credentials cannot be empty")
+            self.credentials = credentials
+
+            if not region:
+                raise ValueError("Region cannot be empty")
+            self.region = region
+
+        def auth_flow(self, request: httpx.Request) -> Generator[httpx.Request, httpx.Response, None]:
+            aws_request = AWSRequest(method=request.method, url=str(request.url), data=request.content)
+            SigV4Auth(self.credentials, "es", self.region).add_auth(aws_request)
+            request.headers.update(dict(aws_request.headers.items()))
+            yield request
+
+    session = aws.boto3.Session(profile_name=os.getenv("AWS_PROFILE"))
+    return AWSV4SignerAuth(session.get_credentials(), session.region_name)
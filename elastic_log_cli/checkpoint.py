@@ -0,0 +1,62 @@
+"""Persisted progress of a scan, so that long exports can be resumed."""
+import json
+import os
+from collections.abc import Callable
+from pathlib import Path
+
+from elastic_log_cli.exceptions import ElasticLogValidationError
+
+
+class Checkpoint:
+    """The `search_after` cursor of a scan and the number of documents consumed so far, saved to a file.
+
+    `search_after_scan` saves the checkpoint once each page has been consumed, and starts from a resumed checkpoint's
+    cursor, so a scan can be restarted from where it stopped without repeating or skipping hits. `before_save` is
+    called before each save, e.g. to flush output, so a checkpoint never claims hits which were not yet written.
+
+    The checkpoint records a `key` describing the scan (index, query, sort and so on), and only resumes a scan with the
+    same key. Files are replaced atomically, so an interrupted save leaves the previous checkpoint intact.
+
+    Usage:
+
+        checkpoint = Checkpoint(path, key={"index": index, "query": query})
+        if resume:
+            checkpoint.resume()
+        for hit in search_after_scan(..., checkpoint=checkpoint):
+            ...
+    """
+
+    def __init__(self, path: Path, key: dict, before_save: Callable[[], None] = None) -> None:
+        self.path = path
+        self.key = key
+        self.before_save = before_save
+        self.search_after: list | None = None
+        self.documents = 0
+
+    def resume(self) -> None:
+        """Load the saved cursor and document count."""
+        try:
+            saved = json.loads(self.path.read_text(encoding="utf-8"))
+        except FileNotFoundError as exc:
+            raise ElasticLogValidationError(f"No checkpoint to resume from at {self.path}.") from exc
+        except ValueError as exc:
+            raise ElasticLogValidationError(f"Checkpoint at {self.path} is not valid JSON.") from exc
+        if saved.get("key") != json.loads(json.dumps(self.key)):
+            raise ElasticLogValidationError(
+                f"Checkpoint at {self.path} was saved for a different scan. Resume with the same query, index, --start "
+                "and --end."
+            )
+        self.search_after = saved["search_after"]
+        self.documents = saved["documents"]
+
+    def save(self, search_after: list, documents: int) -> None:
+        if self.before_save is not None:
+            self.before_save()
+        self.search_after = search_after
+        self.documents = documents
+        temporary = self.path.with_name(f"{self.path.name}.tmp")
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump({"key": self.key, "search_after": search_after, "documents": documents}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
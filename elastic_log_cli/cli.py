@@ -1,15 +1,26 @@
+"""Command line interface.
+
+Heavier modules (`requests`, `pydantic`, `lark`) are imported only when they are needed, so that e.g. `--version` and
+`--help` return quickly. This is checked by `tests/test_import_time.py`.
+"""
 import json
+import re
 import sys
+from collections.abc import Callable, Iterator
 from datetime import datetime, timedelta
+from functools import partial
+from pathlib import Path
+from time import monotonic
+from typing import Any
 
 import click
 
 from elastic_log_cli import __version__
-from elastic_log_cli.config import get_settings
 from elastic_log_cli.exceptions import ElasticLogError, ElasticLogValidationError
-from elastic_log_cli.kql import parse
-from elastic_log_cli.search import search_after_scan
 from elastic_log_cli.utils.backoff import exponential_backoff
+from elastic_log_cli.utils.page_size import AdaptivePageSize
+from elastic_log_cli.utils.polling import PollingInterval
+from elastic_log_cli.utils.stats import format_summary, get_stats
 
 
 class CSV(click.ParamType):
@@ -21,6 +32,15 @@ class CSV(click.ParamType):
         return value.split(",")
 
 
+def _default_from_settings(name: str) -> Callable[[], Any]:
+    def _default() -> Any:
+        from elastic_log_cli.config import get_settings
+
+        return getattr(get_settings(), name)
+
+    return _default
+
+
 @click.command()
 @click.argument(
     "query",
@@ -33,11 +53,20 @@ class CSV(click.ParamType):
     default=2000,
     help="The number of logs to fetch per page",
 )
+@click.option(
+    "--adaptive-page-size",
+    is_flag=True,
+    default=False,
+    help=(
+        "Tune the number of logs fetched per page, starting from --page-size, according to how long each page takes "
+        "and how large it is. Cannot be used with --stream, --slices or --parallel."
+    ),
+)
 @click.option(
     "--index",
     "-i",
     type=str,
-    default=lambda: get_settings().elasticsearch_index,
+    default=_default_from_settings("elasticsearch_index"),
     show_default="filebeat-*",
     help="The index to target. Globs are supported.",
 )
@@ -55,52 +84,503 @@ class CSV(click.ParamType):
     default=None,
     help="When to stop streaming logs. Omit to continuously stream logs until interrupted.",
 )
+@click.option(
+    "--cluster",
+    "clusters",
+    type=str,
+    multiple=True,
+    help=(
+        "Query this named cluster (see ELASTICSEARCH_CLUSTERS), rather than the default cluster. Repeat to query "
+        "several clusters at once, merging their logs in timestamp order."
+    ),
+)
+@click.option(
+    "--field-aware",
+    is_flag=True,
+    default=False,
+    help=(
+        "Compile the query according to the type of each field, from the index mapping (cached for an hour): exact "
+        "`term` queries for keyword and numeric fields, ranges for dates, phrases for quoted text, and `nested` "
+        "queries for nested fields."
+    ),
+)
 @click.option(
     "--source",
     type=CSV(),
     default=None,
     help="Source fields to retrieve, comma-separated. Default behaviour is to fetch full document.",
 )
+@click.option(
+    "--source-excludes",
+    type=CSV(),
+    default=None,
+    help="Source fields to exclude, comma-separated. Wildcards are supported.",
+)
+@click.option(
+    "--retrieve",
+    type=click.Choice(["source", "fields", "docvalue_fields"]),
+    default="source",
+    show_default=True,
+    help=(
+        "How to retrieve fields. With `fields` or `docvalue_fields`, the fields given by --source (default all) are "
+        "output as lists of values keyed by field name, rather than the original document."
+    ),
+)
+@click.option(
+    "--grep",
+    type=str,
+    multiple=True,
+    metavar="FIELD=REGEX",
+    help=(
+        "Only output logs where the field matches the regular expression, for filters KQL cannot express. Applied "
+        "client-side, after the query. Repeat to require several matches."
+    ),
+)
+@click.option(
+    "--grep-exclude",
+    type=str,
+    multiple=True,
+    metavar="FIELD=REGEX",
+    help="Do not output logs where the field matches the regular expression. Applied client-side, after the query.",
+)
+@click.option(
+    "--project",
+    type=CSV(),
+    default=None,
+    help=(
+        "Output only these fields, comma-separated dotted paths, as flat keys. Use NAME=PATH to rename a field, e.g. "
+        "`host=host.name`."
+    ),
+)
+@click.option(
+    "--drop",
+    type=CSV(),
+    default=None,
+    help="Fields to remove from each output log, comma-separated dotted paths.",
+)
+@click.option(
+    "--line-format",
+    type=str,
+    default=None,
+    metavar="TEMPLATE",
+    help=(
+        "Output each log as a line of text rather than JSON, formatted from fields by dotted path, e.g. "
+        "'{@timestamp} [{log.level}] {message}'. Write literal braces as {{ and }}."
+    ),
+)
 @click.option(
     "--timestamp-field",
     "-t",
     type=str,
-    default=lambda: get_settings().elasticsearch_timestamp_field,
+    default=_default_from_settings("elasticsearch_timestamp_field"),
     show_default="@timestamp",
     help="The field which denotes the timestamp in the indexed logs.",
 )
-@click.option("--version", type=bool, default=False, is_flag=True, help="Show version and exit.")
+@click.option(
+    "--slices",
+    type=click.IntRange(min=1),
+    default=None,
+    help=(
+        "Scan a point-in-time snapshot of the index, split into this many slices which are fetched in parallel. "
+        "Requires --end."
+    ),
+)
+@click.option(
+    "--keep-alive",
+    default="1m",
+    show_default=True,
+    help=(
+        "How long Elasticsearch keeps the point-in-time of --slices open between page requests, e.g. 30s or 5m. It is "
+        "renewed by each request, so only needs to cover the time taken to output a page."
+    ),
+)
+@click.option(
+    "--parallel",
+    type=click.IntRange(min=1),
+    default=None,
+    help=(
+        "Split the time range into windows with similar numbers of logs, and scan this many windows in parallel. "
+        "Requires --end."
+    ),
+)
+@click.option(
+    "--prefetch",
+    type=click.IntRange(min=0),
+    default=1,
+    show_default=True,
+    help="The number of pages to fetch ahead of output. Set to 0 to disable prefetching.",
+)
+@click.option(
+    "--stream",
+    is_flag=True,
+    default=False,
+    help=(
+        "Decode each page incrementally as it is received, so memory use does not grow with --page-size. Pages are "
+        "not prefetched. Requires the `streaming` extra."
+    ),
+)
+@click.option(
+    "--min-poll-interval",
+    type=click.FloatRange(min=0),
+    default=0.5,
+    show_default=True,
+    help="When following logs, the minimum time to wait between polls for new logs, in seconds.",
+)
+@click.option(
+    "--max-poll-interval",
+    type=click.FloatRange(min=0),
+    default=10.0,
+    show_default=True,
+    help="When following logs, the maximum time to wait between polls whilst no new logs arrive, in seconds.",
+)
+@click.option(
+    "--follow-overlap",
+    type=click.FloatRange(min=0),
+    default=0.0,
+    show_default=True,
+    help=(
+        "When following logs, re-read this many seconds behind the latest log on each poll, so logs which are indexed "
+        "late are not skipped. Logs which were already output are not repeated. Cannot be used with --stream."
+    ),
+)
+@click.option(
+    "--sort-keys/--no-sort-keys",
+    default=True,
+    show_default=True,
+    help="Whether to sort the keys of each output log. Disabling this is faster for large exports.",
+)
+@click.option(
+    "--output-format",
+    "-f",
+    type=click.Choice(["ndjson", "ndjson.gz", "ndjson.zst", "parquet", "arrow"]),
+    default="ndjson",
+    show_default=True,
+    help=(
+        "Format to write logs to stdout in. `ndjson.gz` and `ndjson.zst` are compressed JSON lines; `ndjson.zst` "
+        "requires the `zstd` extra. `parquet` and `arrow` (Arrow IPC stream) are columnar, written one page at a "
+        "time, with a column for each --source field (default all top-level fields of the first page); these "
+        "require the `arrow` extra."
+    ),
+)
+@click.option(
+    "--cache-results",
+    is_flag=True,
+    default=False,
+    help=(
+        "Cache logs on disk when --end is more than 10 minutes in the past, so re-running the same query is served "
+        "locally. Requires --end to be an ISO 8601 timestamp."
+    ),
+)
+@click.option(
+    "--checkpoint",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help=(
+        "Save progress to this file after each page, so an interrupted export can be continued with --resume. Output "
+        "is flushed before each checkpoint is saved. Not supported with columnar output formats."
+    ),
+)
+@click.option(
+    "--resume",
+    is_flag=True,
+    default=False,
+    help=(
+        "Continue from the progress saved in --checkpoint, outputting only logs which were not output before. The "
+        "query, --index, --start and --end must match the interrupted export."
+    ),
+)
+@click.option(
+    "--count",
+    "count_only",
+    is_flag=True,
+    default=False,
+    help="Output the number of matching logs, rather than the logs themselves.",
+)
+@click.option(
+    "--histogram",
+    type=str,
+    default=None,
+    metavar="INTERVAL",
+    help=(
+        "Output the number of matching logs in each interval of time (e.g. 30s, 5m, 1h), rather than the logs "
+        "themselves."
+    ),
+)
+@click.option(
+    "--stats",
+    "show_stats",
+    is_flag=True,
+    default=False,
+    help="Print throughput and latency statistics to stderr once finished.",
+)
+@click.option(
+    "--stats-file",
+    type=click.Path(dir_okay=False, writable=True),
+    help="Write throughput and latency statistics to this file as JSON once finished.",
+)
+@click.version_option(__version__, message="%(version)s", help="Show version and exit.")
 def cli(
     query: str,
     *,
     page_size: int,
+    adaptive_page_size: bool,
     index: str,
     start: str,
     end: str | None,
+    clusters: tuple[str, ...],
+    field_aware: bool,
     source: list[str] | None,
+    source_excludes: list[str] | None,
+    retrieve: str,
+    grep: tuple[str, ...],
+    grep_exclude: tuple[str, ...],
+    project: list[str] | None,
+    drop: list[str] | None,
+    line_format: str | None,
     timestamp_field: str,
-    version: bool,
+    slices: int | None,
+    keep_alive: str,
+    parallel: int | None,
+    prefetch: int,
+    stream: bool,
+    min_poll_interval: float,
+    max_poll_interval: float,
+    follow_overlap: float,
+    sort_keys: bool,
+    output_format: str,
+    cache_results: bool,
+    checkpoint: str | None,
+    resume: bool,
+    count_only: bool,
+    histogram: str | None,
+    show_stats: bool,
+    stats_file: str | None,
 ):
     """Stream logs from Elasticsearch.
 
     Accepts a KQL query as its only positional argument.
     """
-    if version:
-        print(__version__)
-        sys.exit(0)
-    for doc in search_after_scan(
-        index=index,
-        query=query_from_args(query, start=start, end=end, timestamp_field=timestamp_field),
-        sort=[{timestamp_field: {"order": "asc"}}, "_seq_no"],
-        size=page_size,
-        source=source,
-        backoff=exponential_backoff(on_backoff=_log_backoff),
-        follow=not end,
-    ):
-        print(json.dumps(doc["_source"], sort_keys=True))
-
-
-def query_from_args(kql_query: str, *, start: str, end: str | None, timestamp_field: str) -> dict:
+    from elastic_log_cli.checkpoint import Checkpoint
+    from elastic_log_cli.config import get_settings, use_cluster
+    from elastic_log_cli.field_types import get_field_types
+    from elastic_log_cli.output import JSONLinesWriter, open_writer
+    from elastic_log_cli.postprocess import PostProcessor, compile_template, parse_field_pattern
+    from elastic_log_cli.result_cache import get_result_cache, is_historical
+    from elastic_log_cli.search import (
+        SCAN_FILTER_PATH,
+        count_hits,
+        date_histogram,
+        get_client,
+        multi_cluster_scan,
+        point_in_time_scan,
+        search_after_scan,
+        time_window_scan,
+    )
+
+    stats = get_stats()
+    configured_clusters = get_settings().elasticsearch_clusters if clusters else []
+    for cluster in clusters:
+        if cluster not in configured_clusters:
+            raise ElasticLogValidationError(f"Cluster {cluster!r} is not configured in ELASTICSEARCH_CLUSTERS.")
+    field_types = None
+    if field_aware:
+        with use_cluster(clusters[0] if clusters else None):
+            field_types = get_field_types(index)
+    query_body = query_from_args(query, start=start, end=end, timestamp_field=timestamp_field, field_types=field_types)
+    if count_only and histogram:
+        raise ElasticLogValidationError("--count and --histogram cannot be used together.")
+    # Only single weeks, months, quarters and years are supported, as calendar intervals
+    if histogram and not re.fullmatch(r"[1-9][0-9]*(ms|s|m|h|d)|1[wMqy]", histogram):
+        raise ElasticLogValidationError("--histogram must be a time interval, e.g. 30s, 5m, 1h, 1w or 1M.")
+    selected_cluster: str | None  # Each cluster in turn, or the default cluster
+    if count_only or histogram:
+        counts: dict[str, int] = {}
+        for selected_cluster in clusters or [None]:
+            with use_cluster(selected_cluster):
+                if count_only:
+                    counts["count"] = counts.get("count", 0) + count_hits(index, query_body)
+                elif histogram is not None:
+                    for bucket in date_histogram(index, query_body, timestamp_field, interval=histogram):
+                        counts[bucket["timestamp"]] = counts.get(bucket["timestamp"], 0) + bucket["count"]
+        with open_writer(sys.stdout.buffer, output_format, sort_keys=sort_keys) as writer:
+            if count_only:
+                writer.write(counts)
+            else:
+                for timestamp, count in sorted(counts.items()):
+                    writer.write({"timestamp": timestamp, "count": count})
+        return
+    sort: list[dict | str] = [{timestamp_field: {"order": "asc"}}, "_seq_no"]
+    if min_poll_interval > max_poll_interval:
+        raise ElasticLogValidationError("--min-poll-interval cannot be greater than --max-poll-interval.")
+    if slices and parallel:
+        raise ElasticLogValidationError("--slices and --parallel cannot be used together.")
+    if stream and (slices or parallel):
+        raise ElasticLogValidationError("--stream cannot be used with --slices or --parallel.")
+    if adaptive_page_size and (stream or slices or parallel):
+        raise ElasticLogValidationError("--adaptive-page-size cannot be used with --stream, --slices or --parallel.")
+    if source_excludes and retrieve != "source":
+        raise ElasticLogValidationError("--source-excludes can only be used when retrieving source.")
+    retrieval: dict[str, Any] = {"filter_path": SCAN_FILTER_PATH}
+    if retrieve == "source":
+        retrieval["source"] = {"includes": source or [], "excludes": source_excludes} if source_excludes else source
+    else:
+        retrieval["source"] = False
+        retrieval[retrieve] = source or ["*"]
+    columnar = output_format in ("parquet", "arrow")
+    if columnar and not project and source and any("*" in field for field in source):
+        raise ElasticLogValidationError(f"--source cannot contain wildcards with --output-format {output_format}.")
+    if line_format and output_format not in ("ndjson", "ndjson.gz", "ndjson.zst"):
+        raise ElasticLogValidationError("--line-format can only be used with JSON lines output formats.")
+    post_process = (
+        PostProcessor(
+            include=[parse_field_pattern(value) for value in grep],
+            exclude=[parse_field_pattern(value) for value in grep_exclude],
+            project=project,
+            drop=drop,
+        )
+        if grep or grep_exclude or project or drop
+        else None
+    )
+    format_line = compile_template(line_format) if line_format else None
+    # Columnar output has a column for each projected field, or else each --source field
+    columns = [projection.partition("=")[0] for projection in project] if project else source
+    if follow_overlap and end:
+        raise ElasticLogValidationError("--follow-overlap can only be used when following logs, without --end.")
+    if follow_overlap and (stream or checkpoint):
+        raise ElasticLogValidationError("--follow-overlap cannot be used with --stream or --checkpoint.")
+    if resume and not checkpoint:
+        raise ElasticLogValidationError("--resume requires --checkpoint.")
+    if checkpoint and (slices or parallel or len(clusters) > 1 or cache_results):
+        raise ElasticLogValidationError(
+            "--checkpoint cannot be used with --slices, --parallel, --cache-results or more than one --cluster."
+        )
+    if checkpoint and columnar:
+        # A Parquet file is unreadable until its footer is written, so output saved by a checkpoint could be lost
+        raise ElasticLogValidationError(f"--checkpoint cannot be used with --output-format {output_format}.")
+    if parallel and not end:
+        raise ElasticLogValidationError("--parallel requires --end, as the time range must be bounded.")
+    if slices and not end:
+        raise ElasticLogValidationError("--slices requires --end, as a point-in-time cannot be followed.")
+    if not re.fullmatch(r"[1-9][0-9]*(ms|s|m|h|d)", keep_alive):
+        raise ElasticLogValidationError("--keep-alive must be a time interval, e.g. 30s or 5m.")
+
+    def _scan() -> Iterator[dict]:
+        if parallel:
+            return time_window_scan(
+                index=index,
+                query=query_body,
+                sort=sort,
+                timestamp_field=timestamp_field,
+                size=page_size,
+                **retrieval,
+                parallel=parallel,
+                backoff_factory=partial(exponential_backoff, on_backoff=_log_backoff),
+                prefetch=prefetch,
+            )
+        if slices:
+            return point_in_time_scan(
+                index=index,
+                query=query_body,
+                sort=sort,
+                size=page_size,
+                **retrieval,
+                slices=slices,
+                keep_alive=keep_alive,
+                backoff_factory=partial(exponential_backoff, on_backoff=_log_backoff),
+                prefetch=prefetch,
+            )
+        return search_after_scan(
+            index=index,
+            query=query_body,
+            sort=sort,
+            size=page_size,
+            **retrieval,
+            backoff=exponential_backoff(on_backoff=_log_backoff),
+            follow=not end,
+            prefetch=prefetch,
+            stream=stream,
+            checkpoint=scan_checkpoint,
+            overlap=follow_overlap,
+            # A quiet cluster must not hold back logs from the others
+            heartbeats=len(clusters) > 1,
+            polling=PollingInterval(minimum=min_poll_interval, maximum=max_poll_interval),
+            page_size=(
+                AdaptivePageSize(initial=page_size, minimum=min(page_size, 100), maximum=max(page_size, 10000))
+                if adaptive_page_size
+                else None
+            ),
+        )
+
+    scan_checkpoint = None
+    if checkpoint:
+        with use_cluster(clusters[0] if clusters else None):
+            url = get_client().base_url
+        scan_checkpoint = Checkpoint(
+            Path(checkpoint), key={"url": url, "index": index, "query": query_body, "sort": sort, **retrieval}
+        )
+        if resume:
+            scan_checkpoint.resume()
+    docs = multi_cluster_scan(list(clusters), _scan) if clusters else _scan()
+    result_cache = get_result_cache() if cache_results and is_historical(end) else None
+    if result_cache is not None:
+        urls = []
+        for selected_cluster in clusters or [None]:
+            with use_cluster(selected_cluster):
+                urls.append(get_client().base_url)
+        key = {"urls": urls, "index": index, "query": query_body, "sort": sort, **retrieval}
+        docs = result_cache.cached(key, docs)
+    # Following is interactive, so logs are flushed as soon as they arrive rather than in batches. When checkpointing,
+    # output is instead flushed with each checkpoint, so that output never runs ahead of the saved progress.
+    buffer_size = sys.maxsize if scan_checkpoint else 64 * 1024 if end else 0
+    output_seconds, documents = 0.0, 0
+    last_hit = None
+    try:
+        with open_writer(
+            sys.stdout.buffer,
+            output_format,
+            sort_keys=sort_keys,
+            buffer_size=buffer_size,
+            # Columnar output is batched by page
+            batch_size=max(page_size, 1),
+            columns=columns if columnar else None,
+        ) as writer:
+            if scan_checkpoint:
+                scan_checkpoint.before_save = writer.flush
+                checkpointed_documents = scan_checkpoint.documents
+            # --line-format is only valid with JSON lines output
+            line_writer = writer if isinstance(writer, JSONLinesWriter) else None
+            for doc in docs:
+                started = monotonic()
+                document = doc.get("_source" if retrieve == "source" else "fields", {})
+                if post_process is not None:
+                    document = post_process(document)
+                if document is not None and format_line is not None and line_writer is not None:
+                    line_writer.write_line(format_line(document).encode("utf-8"))
+                elif document is not None:
+                    writer.write(document)
+                last_hit = doc
+                output_seconds += monotonic() - started
+                documents += 1
+    finally:
+        if scan_checkpoint and last_hit is not None:
+            # Logs output after the last checkpoint (e.g. part of a page, when interrupted) have now been flushed
+            scan_checkpoint.before_save = None
+            scan_checkpoint.save(last_hit["sort"], checkpointed_documents + documents)
+        # Statistics are also reported when interrupted, e.g. when following logs
+        stats.record("output", output_seconds)
+        stats.record_documents(documents)
+        if show_stats:
+            click.echo(format_summary(stats.summary()), err=True)
+        if stats_file:
+            with open(stats_file, "w", encoding="utf-8") as file:
+                json.dump(stats.summary(), file, indent=2)
+
+
+def query_from_args(
+    kql_query: str, *, start: str, end: str | None, timestamp_field: str, field_types: dict[str, str] = None
+) -> dict:
+    from elastic_log_cli.kql import parse
+
     time_filter = {"range": {timestamp_field: {"gte": start}}}
     if end:
         time_filter["range"][timestamp_field]["lte"] = end
@@ -108,13 +588,14 @@ def query_from_args(kql_query: str, *, start: str, end: str | None, timestamp_fi
         "bool": {
             "filter": [
                 time_filter,
-                parse(kql_query),
+                parse(kql_query, field_types=field_types),
             ]
         }
     }
 
 
 def _log_backoff(exception: Exception, amount: float) -> None:
+    get_stats().record("backoff", amount)
     click.echo(f"Got error whilst querying Elasticsearch, backing off for {amount:.2f}s. Error: {exception}", err=True)
 
 
@@ -1,3 +1,6 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import cache
 from typing import Literal, Optional
 
@@ -35,6 +38,18 @@ Finally, if you are using [Amazon OpenSearch Service](https://aws.amazon.com/ope
         ),
     )
 
+    elasticsearch_compression: Literal["responses", "all", "none"] = Field(
+        "responses",
+        description=(
+            """Specify which Elasticsearch traffic should be compressed.
+
+The default behaviour is `responses`, which asks Elasticsearch to gzip its responses. Note that Elasticsearch disables response compression over HTTPS by default; see the [`http.compression`](https://www.elastic.co/guide/en/elasticsearch/reference/7.16/modules-network.html#http-settings) setting.
+
+You may also set this to `all` to additionally gzip request bodies, or `none` to disable compression entirely.
+"""
+        ),
+    )
+
     elasticsearch_timeout: int = Field(40, description="How long to wait on Elasticsearch requests.")
 
     elasticsearch_index: str = Field("filebeat-*", description="The index to target. Globs are supported.")
@@ -43,11 +58,57 @@ Finally, if you are using [Amazon OpenSearch Service](https://aws.amazon.com/ope
         "@timestamp", description="The field which denotes the timestamp in the indexed logs."
     )
 
+    elasticsearch_clusters: list[str] = Field(
+        [],
+        description=(
+            """Names of additional clusters, which can be queried with `--cluster`, as a JSON list.
+
+Each cluster is configured with the variables above, prefixed with its name in upper case. For example:
+
+```
+ELASTICSEARCH_CLUSTERS='["eu", "us"]'
+EU_ELASTICSEARCH_URL=https://eu.elasticsearch.example.com:9200
+US_ELASTICSEARCH_URL=https://us.elasticsearch.example.com:9200
+```
+"""
+        ),
+    )
+
     @property
     def is_cloud(self):
         return self.elasticsearch_url.startswith("cloud:")
 
 
+# The named cluster which requests are currently made to, see `use_cluster`
+current_cluster: ContextVar[str | None] = ContextVar("current_cluster", default=None)
+
+
+@contextmanager
+def use_cluster(name: str | None) -> Iterator[None]:
+    """Use the settings of a named cluster within this context, or of the default cluster if `name` is None.
+
+    Threads started within the context by `background_iterator` also use the cluster.
+    """
+    token = current_cluster.set(name)
+    try:
+        yield
+    finally:
+        current_cluster.reset(token)
+
+
+def get_settings() -> Settings:
+    """Settings of the current cluster."""
+    return get_cluster_settings(current_cluster.get())
+
+
 @cache
-def get_settings():
-    return Settings()
+def get_cluster_settings(name: str | None) -> Settings:
+    if name is None:
+        return Settings()
+    prefix = f"{name.upper()}_"
+
+    class ClusterSettings(Settings):
+        class Config:
+            env_prefix = prefix
+
+    return ClusterSettings()
@@ -0,0 +1,94 @@
+"""Types of the fields of an index, from its mapping, for field-aware compilation of KQL queries."""
+import json
+import sqlite3
+import time
+from collections.abc import Callable
+from contextlib import closing
+from pathlib import Path
+
+from elastic_log_cli.utils.cache import get_cache_dir
+
+# Mappings rarely change, but new fields can be added at any time by dynamic mapping
+MAPPING_TTL = 60 * 60
+
+
+class FieldTypeCache:
+    """Cache of the field types of each index, stored in SQLite, which expire after `ttl` seconds.
+
+    As with the other caches, database errors are ignored, so the cache can never prevent a query from running.
+    Expiry uses wall-clock time, as entries must expire between runs.
+    """
+
+    def __init__(self, path: Path, ttl: float = MAPPING_TTL, clock: Callable[[], float] = time.time) -> None:
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+
+    def get(self, key: str) -> dict[str, str] | None:
+        try:
+            with closing(self._connect()) as connection:
+                row = connection.execute(
+                    "SELECT field_types FROM field_types WHERE key = ? AND fetched > ?", (key, self.clock() - self.ttl)
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, key: str, field_types: dict[str, str]) -> None:
+        try:
+            with closing(self._connect()) as connection, connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO field_types (key, fetched, field_types) VALUES (?, ?, ?)",
+                    (key, self.clock(), json.dumps(field_types)),
+                )
+                connection.execute("DELETE FROM field_types WHERE fetched <= ?", (self.clock() - self.ttl,))
+        except sqlite3.Error:
+            pass
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=1.0)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS field_types (key TEXT PRIMARY KEY, fetched REAL, field_types TEXT)"
+        )
+        return connection
+
+
+def get_field_types(index: str) -> dict[str, str]:
+    """Types of the fields of the indices matching `index`, keyed by dotted path, fetched from the current cluster.
+
+    Results are cached for `MAPPING_TTL` seconds.
+    """
+    from elastic_log_cli.search import get_client, get_mapping
+
+    cache_dir = get_cache_dir()
+    cache = FieldTypeCache(cache_dir / "field-types.sqlite") if cache_dir else None
+    key = f"{get_client().base_url}/{index}"
+    field_types = cache.get(key) if cache else None
+    if field_types is None:
+        field_types = field_types_from_mappings(get_mapping(index))
+        if cache:
+            cache.set(key, field_types)
+    return field_types
+
+
+def field_types_from_mappings(mappings: dict) -> dict[str, str]:
+    """Types of fields by dotted path, from a `_mapping` response, including multi-fields such as `message.keyword`.
+
+    Nested fields have the type `nested`. Fields whose type differs between indices are omitted, so they are compiled
+    as if their type were unknown.
+    """
+    types: dict[str, set[str]] = {}
+    for index_mapping in mappings.values():
+        _collect_types(index_mapping.get("mappings", {}).get("properties", {}), "", types)
+    return {field: field_types.pop() for field, field_types in types.items() if len(field_types) == 1}
+
+
+def _collect_types(properties: dict, prefix: str, types: dict[str, set[str]]) -> None:
+    for name, mapping in properties.items():
+        path = f"{prefix}{name}"
+        field_type = mapping.get("type", "object")
+        if field_type != "object":
+            types.setdefault(path, set()).add(field_type)
+        _collect_types(mapping.get("properties", {}), f"{path}.", types)
+        for subfield, subfield_mapping in mapping.get("fields", {}).items():
+            types.setdefault(f"{path}.{subfield}", set()).add(subfield_mapping.get("type", "object"))
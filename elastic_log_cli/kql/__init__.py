@@ -1,4 +1,39 @@
-from elastic_log_cli.kql.parser import parse
+import hashlib
+import json
+
+from elastic_log_cli.kql.cache import get_compilation_cache
+
+
+def parse(string: str, *, cache: bool = True, field_types: dict[str, str] = None) -> dict:
+    """Compile a KQL query to the Elasticsearch query DSL, simplified by `optimize`.
+
+    If the types of fields are given by dotted path (see `elastic_log_cli.field_types`), each field is queried
+    according to its type, as described by `apply_field_types`.
+
+    Compiled queries are cached on disk, so repeated queries skip parsing (and importing the parser) entirely. Pass
+    `cache=False` to always compile the query.
+    """
+    key = string
+    if field_types:
+        digest = hashlib.sha256(json.dumps(field_types, sort_keys=True).encode("utf-8")).hexdigest()
+        key = f"{string}\n{digest}"
+    compilation_cache = get_compilation_cache() if cache else None
+    if compilation_cache is not None:
+        compiled = compilation_cache.get(key)
+        if compiled is not None:
+            return compiled
+
+    from elastic_log_cli.kql.fields import apply_field_types
+    from elastic_log_cli.kql.optimizer import optimize
+    from elastic_log_cli.kql.parser import parse as _parse
+
+    compiled = _parse(string)
+    if field_types:
+        compiled = apply_field_types(compiled, field_types)
+    compiled = optimize(compiled)
+    if compilation_cache is not None:
+        compilation_cache.set(key, compiled)
+    return compiled
 
 
 __all__ = ["parse"]
@@ -0,0 +1,93 @@
+"""Persistent cache of compiled KQL queries."""
+import hashlib
+import json
+import sqlite3
+from contextlib import closing
+from functools import cache
+from pathlib import Path
+
+from elastic_log_cli import __version__
+from elastic_log_cli.utils.cache import get_cache_dir
+
+
+class CompilationCache:
+    """Size-bounded LRU cache of compiled queries, stored in SQLite.
+
+    Entries are keyed by the query string and the compiler version, which changes whenever the grammar, the compiler
+    or the package version does. Errors accessing the database are ignored, so the cache can never prevent a query from
+    being compiled.
+
+    Recency is tracked with a logical clock rather than wall-clock time, so that eviction order is deterministic.
+    Hits only refresh the recency of an entry when it is in the older half of the cache, so the common case of
+    re-running a recent query is a read, without taking the database's write lock.
+    """
+
+    def __init__(self, path: Path, max_entries: int = 1000) -> None:
+        self.path = path
+        self.max_entries = max_entries
+
+    def get(self, query: str) -> dict | None:
+        try:
+            with closing(self._connect()) as connection, connection:
+                row = connection.execute(
+                    "SELECT compiled, (SELECT MAX(last_used) FROM compiled_queries) - last_used FROM compiled_queries"
+                    " WHERE version = ? AND query = ?",
+                    (compiler_version(), query),
+                ).fetchone()
+                if row is None:
+                    return None
+                compiled, age = row
+                if age >= self.max_entries // 2:
+                    connection.execute(
+                        "UPDATE compiled_queries SET last_used = ("
+                        "    SELECT COALESCE(MAX(last_used), 0) + 1 FROM compiled_queries"
+                        ") WHERE version = ? AND query = ?",
+                        (compiler_version(), query),
+                    )
+                return json.loads(compiled)
+        except sqlite3.Error:
+            return None
+
+    def set(self, query: str, compiled: dict) -> None:
+        try:
+            with closing(self._connect()) as connection, connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO compiled_queries (version, query, compiled, last_used) VALUES ("
+                    "    ?, ?, ?, (SELECT COALESCE(MAX(last_used), 0) + 1 FROM compiled_queries)"
+                    ")",
+                    (compiler_version(), query, json.dumps(compiled)),
+                )
+                connection.execute(
+                    "DELETE FROM compiled_queries WHERE rowid IN ("
+                    "    SELECT rowid FROM compiled_queries ORDER BY last_used DESC LIMIT -1 OFFSET ?"
+                    ")",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error:
+            pass
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=1.0)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS compiled_queries ("
+            "    version TEXT, query TEXT, compiled TEXT, last_used INTEGER, PRIMARY KEY (version, query)"
+            ")"
+        )
+        return connection
+
+
+@cache
+def compiler_version() -> str:
+    """Identifies the grammar, transformer, field-aware and wildcard rewriting and optimiser which compiled a query."""
+    digest = hashlib.sha256()
+    for name in ("kql.grammar", "parser.py", "fields.py", "wildcards.py", "optimizer.py"):
+        digest.update((Path(__file__).parent / name).read_bytes())
+    digest.update(__version__.encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+def get_compilation_cache() -> CompilationCache | None:
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return None
+    return CompilationCache(cache_dir / "kql-queries.sqlite")
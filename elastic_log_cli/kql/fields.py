@@ -0,0 +1,158 @@
+"""Field-aware compilation of KQL queries.
+
+Without knowledge of the mapping, every value is compiled to a `match` query, which is analysed according to the field.
+Given the type of each field, `apply_field_types` instead picks the query which is cheapest and most precise for it.
+"""
+from elastic_log_cli.kql.wildcards import (
+    WildcardString,
+    is_field_pattern,
+    keyword_value_query,
+    match_fields,
+    parse_pattern,
+    value_query,
+)
+
+# Beyond this, field patterns are left for Elasticsearch to expand, rather than sending a clause per field
+MAX_EXPANDED_FIELDS = 64
+
+# Fields queried by exact value
+_TERM_TYPES = {
+    "keyword",
+    "constant_keyword",
+    "wildcard",
+    "version",
+    "ip",
+    "boolean",
+    "long",
+    "integer",
+    "short",
+    "byte",
+    "double",
+    "float",
+    "half_float",
+    "scaled_float",
+    "unsigned_long",
+}
+_DATE_TYPES = {"date", "date_nanos"}
+_TEXT_TYPES = {"text", "match_only_text"}
+# Fields which are not analysed, so wildcard values can be matched with `prefix` and `wildcard` queries
+_KEYWORD_TYPES = {"keyword", "constant_keyword", "wildcard"}
+# Fields which can be queried for wildcard values
+_STRING_TYPES = _KEYWORD_TYPES | _TEXT_TYPES
+
+
+class QuotedString(str):
+    """A quoted value, which is matched as a phrase on text fields."""
+
+
+def apply_field_types(query: dict, field_types: dict[str, str], nested_path: str = None) -> dict:
+    """Rewrite the `match` queries of a compiled query according to the type of each field, given by dotted path.
+
+    - Keyword, numeric, boolean and IP fields are matched with `term`, which skips analysis.
+    - Date fields are matched with a `range` covering the value, so dates are matched at the precision given.
+    - Quoted values on text fields are matched with `match_phrase`, as in Kibana.
+    - Wildcard values on keyword fields are matched with `prefix` or `wildcard` queries, rather than `query_string`.
+    - Queries on fields within `nested` fields are wrapped in `nested` queries, unless they are already within one.
+    - Field patterns such as `service.*` are expanded to the matching fields, so that fields within `nested` fields
+      are queried too. Values are matched with a `multi_match` query per `nested` field, and wildcard values with a
+      query per field, for string fields only. Patterns matching more than `MAX_EXPANDED_FIELDS` fields are left as
+      they are.
+
+    Fields of unknown type are left as they are.
+    """
+    if "bool" in query:
+        return {
+            "bool": {
+                key: [apply_field_types(subquery, field_types, nested_path) for subquery in value]
+                if isinstance(value, list)
+                else value
+                for key, value in query["bool"].items()
+            }
+        }
+    if "nested" in query:
+        path = query["nested"]["path"]
+        return {"nested": {**query["nested"], "query": apply_field_types(query["nested"]["query"], field_types, path)}}
+    if "match" in query:
+        (field, value), *_ = query["match"].items()
+        query = _match_query(field, value, field_types.get(field))
+    (query_type, clause), *_ = query.items()
+    if query_type == "query_string" and not is_field_pattern(clause["fields"][0]):
+        field = clause["fields"][0]
+        query = _wildcard_query(field, parse_pattern(clause["query"]), field_types.get(field))
+        return _wrap_nested(query, field, field_types, nested_path)
+    if query_type in ("multi_match", "query_string"):
+        return _expand_fields(query, clause["fields"][0], field_types, nested_path)
+    if query_type not in ("exists", "match", "match_phrase", "term", "range"):
+        return query
+    field = clause["field"] if query_type == "exists" else next(iter(clause))
+    if is_field_pattern(field):
+        return _expand_fields(query, field, field_types, nested_path)
+    return _wrap_nested(query, field, field_types, nested_path)
+
+
+def _match_query(field: str, value: str, field_type: str | None) -> dict:
+    if field_type in _TERM_TYPES:
+        return {"term": {field: value}}
+    if field_type in _DATE_TYPES:
+        return {"range": {field: {"gte": value, "lte": value}}}
+    if field_type in _TEXT_TYPES and isinstance(value, QuotedString):
+        return {"match_phrase": {field: value}}
+    return {"match": {field: value}}
+
+
+def _wildcard_query(field: str, value: WildcardString, field_type: str | None) -> dict:
+    if field_type in _KEYWORD_TYPES:
+        return keyword_value_query(field, value)
+    return value_query(field, value)
+
+
+def _expand_fields(query: dict, pattern: str, field_types: dict[str, str], nested_path: str | None) -> dict:
+    """Replace a query on the fields matching a pattern with a query on each field, or `nested` field."""
+    (query_type, clause), *_ = query.items()
+    fields = [field for field in match_fields(pattern, list(field_types)) if field_types[field] != "nested"]
+    if query_type == "query_string":
+        fields = [field for field in fields if field_types[field] in _STRING_TYPES]
+    if len(fields) > MAX_EXPANDED_FIELDS:
+        return query
+    if query_type == "multi_match":
+        # Fields within the same `nested` field are queried together
+        groups: dict[tuple[str, ...], list[str]] = {}
+        for field in fields:
+            groups.setdefault(tuple(_nested_paths(field, field_types, nested_path)), []).append(field)
+        alternatives = [
+            _wrap_nested({"multi_match": {**clause, "fields": group}}, group[0], field_types, nested_path)
+            for group in groups.values()
+        ]
+    elif query_type == "query_string":
+        value = parse_pattern(clause["query"])
+        alternatives = [
+            _wrap_nested(_wildcard_query(field, value, field_types[field]), field, field_types, nested_path)
+            for field in fields
+        ]
+    else:
+        alternatives = [_wrap_nested({"exists": {"field": field}}, field, field_types, nested_path) for field in fields]
+    if not alternatives:
+        return {"match_none": {}}
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return {"bool": {"should": alternatives, "minimum_should_match": 1}}
+
+
+def _wrap_nested(query: dict, field: str, field_types: dict[str, str], nested_path: str | None) -> dict:
+    """Wrap a query on a field in a `nested` query for each nested field containing it, below `nested_path`."""
+    for path in _nested_paths(field, field_types, nested_path):
+        query = {"nested": {"path": path, "query": query, "score_mode": "none"}}
+    return query
+
+
+def _nested_paths(field: str, field_types: dict[str, str], nested_path: str | None) -> list[str]:
+    """The nested fields containing a field, below `nested_path`, innermost first."""
+    paths = []
+    parts = field.split(".")
+    for length in range(len(parts) - 1, 0, -1):
+        path = ".".join(parts[:length])
+        if nested_path is not None and (path == nested_path or not path.startswith(f"{nested_path}.")):
+            break
+        if field_types.get(path) == "nested":
+            paths.append(path)
+    return paths
@@ -0,0 +1,198 @@
+"""Simplification of compiled KQL queries.
+
+`KQLTreeTransformer` emits a `bool` query for every `and`, `or` and `not`, so nested expressions produce deeply nested
+DSL. `optimize` rewrites it into an equivalent query which is smaller and cheaper for Elasticsearch to plan.
+
+Compiled queries are used in filter context, where scores are irrelevant, so only the set of matching documents needs
+to be preserved.
+"""
+from typing import Any, NamedTuple
+
+_CLAUSES = {"filter", "must", "must_not", "should"}
+
+
+class _Bool(NamedTuple):
+    """Clauses of a `bool` query, with `must` clauses treated as `filter` and an explicit `minimum_should_match`."""
+
+    filter: list[dict]
+    must_not: list[dict]
+    should: list[dict]
+    minimum_should_match: int
+
+    @property
+    def is_conjunction(self) -> bool:
+        return not self.should
+
+    @property
+    def is_disjunction(self) -> bool:
+        return not self.filter and not self.must_not and self.minimum_should_match == 1
+
+    @property
+    def is_negation(self) -> bool:
+        return not self.filter and not self.should
+
+
+def optimize(query: dict) -> dict:
+    """Rewrite a query into equivalent, simpler DSL.
+
+    - Nested `bool` queries are flattened, e.g. `a and (b and c)` becomes a single `bool` with three filters, and
+      `a and (b or c)` a single `bool` with a filter and two alternatives.
+    - `bool` queries with a single clause are replaced by the clause.
+    - `must` clauses are moved into `filter`, as they do not need scoring.
+    - Negations are pushed inwards: `not (a or b)` becomes `not a and not b`, and `not not a` becomes `a`.
+    - Alternative `term` and `terms` queries on the same field are merged into a single `terms` query.
+    - `minimum_should_match` is omitted where it is the default.
+
+    Queries which are not understood, such as `bool` queries with a `boost` or a percentage `minimum_should_match`,
+    are left as they are (though their subqueries are still optimised).
+    """
+    if "bool" in query:
+        return _optimize_bool(query["bool"])
+    if "nested" in query:
+        return {"nested": {**query["nested"], "query": optimize(query["nested"]["query"])}}
+    return query
+
+
+def _optimize_bool(clause: dict) -> dict:
+    if not _is_simple_bool(clause):
+        return {
+            "bool": {
+                key: [optimize(subquery) for subquery in value] if key in _CLAUSES else value
+                for key, value in clause.items()
+            }
+        }
+    parts = _parts(clause)
+    filters = [optimize(subquery) for subquery in parts.filter]
+    must_not = [optimize(subquery) for subquery in parts.must_not]
+    should = [optimize(subquery) for subquery in parts.should]
+    minimum_should_match = parts.minimum_should_match
+
+    if minimum_should_match == 1:
+        should = _merge_terms([alternative for subquery in should for alternative in _alternatives(subquery)])
+        if len(should) == 1:
+            # A single alternative is required
+            filters.append(should.pop())
+            minimum_should_match = 0
+
+    negated = []
+    for subquery in must_not:
+        inner = _as_bool(subquery)
+        if inner is not None and inner.is_negation and len(inner.must_not) == 1:
+            filters.append(inner.must_not[0])
+        elif inner is not None and inner.is_disjunction:
+            negated.extend(inner.should)
+        else:
+            negated.append(subquery)
+    must_not = negated
+
+    flattened = []
+    for subquery in filters:
+        inner = _as_bool(subquery)
+        if inner is not None and inner.is_conjunction:
+            flattened.extend(inner.filter)
+            must_not.extend(inner.must_not)
+        else:
+            flattened.append(subquery)
+    filters = flattened
+
+    if not should:
+        # One required disjunction can be expressed by the `should` clauses of this query
+        for index, subquery in enumerate(filters):
+            inner = _as_bool(subquery)
+            if inner is not None and inner.is_disjunction and (len(filters) > 1 or must_not):
+                filters.pop(index)
+                should, minimum_should_match = inner.should, 1
+                break
+
+    if len(filters) == 1 and not must_not and not should:
+        return filters[0]
+    optimized: dict[str, Any] = {}
+    if filters:
+        optimized["filter"] = filters
+    if must_not:
+        optimized["must_not"] = must_not
+    if should:
+        optimized["should"] = should
+        if minimum_should_match != _default_minimum_should_match(should, filters):
+            optimized["minimum_should_match"] = minimum_should_match
+    return {"bool": optimized}
+
+
+def _parts(clause: dict) -> _Bool:
+    filters = clause.get("filter", []) + clause.get("must", [])
+    should = clause.get("should", [])
+    return _Bool(
+        filter=filters,
+        must_not=clause.get("must_not", []),
+        should=should,
+        minimum_should_match=clause.get("minimum_should_match", _default_minimum_should_match(should, filters)),
+    )
+
+
+def _is_simple_bool(clause: dict) -> bool:
+    """Whether a `bool` query has only clauses and an integer `minimum_should_match`, which can be rewritten."""
+    if set(clause) - _CLAUSES - {"minimum_should_match"}:
+        return False
+    minimum_should_match = clause.get("minimum_should_match")
+    if minimum_should_match is None:
+        return True
+    # Without `should` clauses, the effect of `minimum_should_match` varies between versions
+    return isinstance(minimum_should_match, int) and bool(clause.get("should"))
+
+
+def _as_bool(query: dict) -> _Bool | None:
+    """The clauses of a simple `bool` query, or `None` if it is any other query."""
+    if "bool" not in query or not _is_simple_bool(query["bool"]):
+        return None
+    return _parts(query["bool"])
+
+
+def _alternatives(query: dict) -> list[dict]:
+    """The alternatives of a disjunction, otherwise just the query itself."""
+    inner = _as_bool(query)
+    return inner.should if inner is not None and inner.is_disjunction else [query]
+
+
+def _default_minimum_should_match(should: list, filters: list) -> int:
+    """See https://www.elastic.co/guide/en/elasticsearch/reference/7.16/query-dsl-bool-query.html"""
+    return 1 if should and not filters else 0
+
+
+def _merge_terms(queries: list[dict]) -> list[dict]:
+    """Merge alternative `term` and `terms` queries on the same field into one `terms` query, in place of the first."""
+    merged: list[dict | str] = []
+    values: dict[str, list] = {}
+    for query in queries:
+        field_values = _term_values(query)
+        if field_values is None:
+            merged.append(query)
+            continue
+        field, new_values = field_values
+        if field not in values:
+            values[field] = []
+            merged.append(field)
+        for value in new_values:
+            if value not in values[field]:
+                values[field].append(value)
+    return [query if isinstance(query, dict) else _terms_query(query, values[query]) for query in merged]
+
+
+def _terms_query(field: str, values: list) -> dict:
+    if len(values) == 1:
+        return {"term": {field: values[0]}}
+    return {"terms": {field: values}}
+
+
+def _term_values(query: dict) -> tuple[str, list] | None:
+    """The field and values of a plain `term` or `terms` query, without options such as `boost`."""
+    if len(query) != 1:
+        return None
+    (query_type, clause), *_ = query.items()
+    if query_type not in ("term", "terms") or len(clause) != 1:
+        return None
+    (field, value), *_ = clause.items()
+    if query_type == "terms":
+        return (field, value) if isinstance(value, list) else None
+    if isinstance(value, dict):
+        return (field, [value["value"]]) if set(value) == {"value"} else None
+    return field, [value]
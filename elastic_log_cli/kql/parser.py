@@ -3,23 +3,30 @@
 Based on https://github.com/elastic/kibana/tree/614139b8e5a38c60918586c2282eb75c88fedb80/packages/kbn-es-query
 """
 import json
+import re
 from functools import cache
 from pathlib import Path
 
 from lark import Lark, Token, Transformer, Tree
 
-# TODO: Multi-field (e.g. *:value)
-# TODO: Field-awareness
+from elastic_log_cli.kql.fields import QuotedString
+from elastic_log_cli.kql.wildcards import WildcardString, is_field_pattern, multi_field_query, value_query
+from elastic_log_cli.utils.cache import get_cache_dir
+
 # TODO: Multi-nested query (using field awareness?)
-# TODO: Wildcards for prefix matching on values
-# TODO: Wildcards for prefix matching (including sub-fields) on fields
 
 
 @cache
-def get_parser():
+def get_parser() -> Lark:
+    """Build the KQL parser.
+
+    The grammar is LALR(1), so the compiled parser can be serialised. It is cached on disk and only rebuilt when the
+    grammar or Lark version changes.
+    """
     with open(Path(__file__).parent / "kql.grammar", "r", encoding="utf-8") as file:
         content = file.read()
-    return Lark(content)
+    cache_dir = get_cache_dir()
+    return Lark(content, parser="lalr", cache=str(cache_dir / "kql-parser.lark") if cache_dir else False)
 
 
 class KQLTreeTransformer(Transformer):
@@ -59,11 +66,16 @@ class KQLTreeTransformer(Transformer):
     def field_value_expression(self, terms) -> dict:
         field, expression = terms
         if isinstance(expression, str):
-            if expression == "*":
+            if is_field_pattern(field):
+                return multi_field_query(field, expression, phrase=isinstance(expression, QuotedString))
+            if isinstance(expression, WildcardString):
+                return value_query(field, expression)
+            if isinstance(expression, QuotedString) and expression == "*":
                 return {"exists": {"field": field}}
+            # Including an escaped `\*`, which is matched literally
             return {"match": {field: expression}}
         elif isinstance(expression, Tree):
-            expression_type = expression.data.value  # type: ignore[attr-defined]
+            expression_type = str(expression.data)
             constructor = {
                 "or_list_of_values": self.or_query,
                 "and_list_of_values": self.and_query,
@@ -81,28 +93,32 @@ class KQLTreeTransformer(Transformer):
         return str(values[0])
 
     def value(self, values: list[Token]) -> str:
+        if isinstance(values[0], (QuotedString, WildcardString)):
+            return values[0]
         return str(values[0])
 
     def quoted_string(self, values: list) -> str:
         assert len(values) == 1
         string = values[0]
-        return json.loads(string)
+        return QuotedString(json.loads(string))
 
     def unquoted_literal(self, tokens: list[Token]) -> str:
-        return "".join(tokens)
-
-    def unquoted_character(self, tokens: list[Token]) -> str:
         assert len(tokens) == 1
-        token = tokens[0]
-        token_type = token.type
-        value = token.value
-        if token_type == "ESCAPED_WHITESPACE":
-            return {"\\t": "\t", "\\r": "\r", "\\n": "\n"}[value]
-        if token_type in ("ESCAPED_SPECIAL_CHARACTER", "ESCAPED_KEYWORD"):
-            return value[1:]
-        if token_type == "ESCAPED_UNICODE_SEQUENCE":
-            return value.encode("utf-8").decode("unicode-escape")
-        return value
+        literal = tokens[0].value
+        # Split around unescaped wildcards
+        parts = []
+        part = ""
+        position = 0
+        for match in _ESCAPE_SEQUENCE_OR_WILDCARD.finditer(literal):
+            part += literal[position : match.start()]
+            position = match.end()
+            if match.group() == "*":
+                parts.append(part)
+                part = ""
+            else:
+                part += _unescape(match)
+        parts.append(part + literal[position:])
+        return WildcardString(parts) if len(parts) > 1 else parts[0]
 
 
 def parse(string: str) -> dict:
@@ -136,7 +152,24 @@ def _apply_field_prefix(prefix: str, query: dict) -> None:
         _apply_field_prefix(prefix, query["nested"]["query"])
     if "exists" in query:
         query["exists"]["field"] = f"{prefix}.{query['exists']['field']}"
+    for query_type in ["multi_match", "query_string"]:
+        if query_type in query:
+            query[query_type]["fields"] = [f"{prefix}.{field}" for field in query[query_type]["fields"]]
     for query_type in ["match", "range"]:
         if query_type in query:
             field, value = query[query_type].popitem()
             query[query_type][f"{prefix}.{field}"] = value
+
+
+_ESCAPE_SEQUENCE = re.compile(r"\\(?:(?i:or|and|not)|[trn]|u[0-9a-fA-F]{4}|[\\():<>\"*{}])")
+_ESCAPE_SEQUENCE_OR_WILDCARD = re.compile(rf"{_ESCAPE_SEQUENCE.pattern}|\*")
+_ESCAPED_WHITESPACE = {"\\t": "\t", "\\r": "\r", "\\n": "\n"}
+
+
+def _unescape(match: re.Match) -> str:
+    value = match.group(0)
+    if value in _ESCAPED_WHITESPACE:
+        return _ESCAPED_WHITESPACE[value]
+    if value.startswith("\\u") and len(value) == 6:
+        return value.encode("utf-8").decode("unicode-escape")
+    return value[1:]
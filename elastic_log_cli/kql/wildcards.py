@@ -0,0 +1,111 @@
+"""Wildcards in KQL values and field names.
+
+An unescaped `*` in a value matches any characters, e.g. `machine.os:win*`, and in a field name matches any fields,
+e.g. `*:error` or `service.*:api`. As in Kibana, values are compiled to `query_string` queries which analyse the
+wildcard value as the field's text, unless `apply_field_types` finds the field is a keyword, which is queried with a
+`prefix` or `wildcard` query. Fields are matched by Elasticsearch itself, or expanded using the mapping.
+"""
+import re
+
+# Characters with a meaning in `wildcard` and `query_string` queries, escaped to match them literally
+_WILDCARD_SPECIAL_CHARACTER = re.compile(r"[\\*?]")
+_QUERY_STRING_SPECIAL_CHARACTER = re.compile(r"[+\-=&|><!(){}\[\]^\"~*?:\\/\s]")
+_ESCAPED_CHARACTER_OR_WILDCARD = re.compile(r"\\(.)|\*", re.DOTALL)
+
+
+class WildcardString(str):
+    """An unquoted value containing wildcards, as the literal parts between them.
+
+    The string itself joins the parts with `*`, so it is only ambiguous where a part contains an escaped `*`.
+    """
+
+    parts: list[str]
+
+    def __new__(cls, parts: list[str]) -> "WildcardString":
+        string = super().__new__(cls, "*".join(parts))
+        string.parts = parts
+        return string
+
+    @property
+    def matches_anything(self) -> bool:
+        return not any(self.parts)
+
+    @property
+    def is_prefix(self) -> bool:
+        """Whether the only wildcard is at the end, e.g. `win*`."""
+        return len(self.parts) == 2 and bool(self.parts[0]) and not self.parts[1]
+
+
+def value_query(field: str, value: WildcardString) -> dict:
+    """Query a single field for a value containing wildcards.
+
+    The value is analysed like the field, e.g. `message:Error*` matches the lowercased terms of a text field.
+    """
+    if value.matches_anything:
+        return {"exists": {"field": field}}
+    return {"query_string": {"query": query_string_pattern(value), "fields": [field], "analyze_wildcard": True}}
+
+
+def keyword_value_query(field: str, value: WildcardString) -> dict:
+    """Query a single keyword field, which is not analysed, for a value containing wildcards.
+
+    Values are compiled to `prefix` queries where possible, which are cheaper than `wildcard` queries.
+    """
+    if value.matches_anything:
+        return {"exists": {"field": field}}
+    if value.is_prefix:
+        return {"prefix": {field: value.parts[0]}}
+    return {"wildcard": {field: wildcard_pattern(value)}}
+
+
+def multi_field_query(pattern: str, value: str, phrase: bool = False) -> dict:
+    """Query the fields matching a pattern, e.g. `service.*`, for a value, optionally as a phrase.
+
+    Fields are matched by Elasticsearch, leniently, so fields of other types (such as dates) are ignored rather than
+    failing the query.
+    """
+    if isinstance(value, WildcardString) and value.matches_anything:
+        return {"exists": {"field": pattern}}
+    if isinstance(value, WildcardString):
+        query = query_string_pattern(value)
+        return {"query_string": {"query": query, "fields": [pattern], "analyze_wildcard": True, "lenient": True}}
+    if phrase:
+        return {"multi_match": {"query": value, "fields": [pattern], "type": "phrase", "lenient": True}}
+    return {"multi_match": {"query": value, "fields": [pattern], "lenient": True}}
+
+
+def query_string_pattern(value: WildcardString) -> str:
+    """The query of a `query_string` query matching a value."""
+    return "*".join(_QUERY_STRING_SPECIAL_CHARACTER.sub(r"\\\g<0>", part) for part in value.parts)
+
+
+def wildcard_pattern(value: WildcardString) -> str:
+    """The pattern of a `wildcard` query matching a value."""
+    return "*".join(_WILDCARD_SPECIAL_CHARACTER.sub(r"\\\g<0>", part) for part in value.parts)
+
+
+def parse_pattern(pattern: str) -> WildcardString:
+    """The inverse of `wildcard_pattern`, also accepting the `query` of a `query_string`, see `query_string_pattern`."""
+    parts = []
+    part = ""
+    position = 0
+    for match in _ESCAPED_CHARACTER_OR_WILDCARD.finditer(pattern):
+        part += pattern[position : match.start()]
+        position = match.end()
+        if match.group(1) is None:
+            parts.append(part)
+            part = ""
+        else:
+            part += match.group(1)
+    parts.append(part + pattern[position:])
+    return WildcardString(parts)
+
+
+def is_field_pattern(field: str) -> bool:
+    return "*" in field
+
+
+def match_fields(pattern: str, fields: list[str]) -> list[str]:
+    """The fields matching a pattern. As in Elasticsearch, `*` matches any characters, including `.`."""
+    expression = re.compile(".*".join(re.escape(part) for part in pattern.split("*")))
+    return [field for field in fields if expression.fullmatch(field)]
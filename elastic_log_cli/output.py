@@ -0,0 +1,234 @@
+import gzip
+import json
+from typing import Any, BinaryIO, Literal
+
+from elastic_log_cli.exceptions import ElasticLogError
+from elastic_log_cli.utils.fields import get_field
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None  # type: ignore[assignment]
+
+OUTPUT_FORMATS = ["ndjson", "ndjson.gz", "ndjson.zst", "parquet", "arrow"]
+
+
+def dumps(document: dict, sort_keys: bool = True) -> bytes:
+    """Serialise a document to compact JSON.
+
+    Uses `orjson` when it is installed, falling back to the standard library otherwise (or for documents `orjson`
+    cannot handle, such as integers wider than 64 bits). The backends represent the same values, but format floats
+    differently, e.g. `1e16` with `orjson` and `1e+16` without, and `orjson` writes NaN and infinity as `null` where the
+    standard library writes the non-standard `NaN` and `Infinity`.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(document, option=orjson.OPT_SORT_KEYS if sort_keys else 0)
+        except orjson.JSONEncodeError:
+            pass
+    return json.dumps(document, sort_keys=sort_keys, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class JSONLinesWriter:
+    """Writes documents to a binary stream as JSON lines, batching writes to the stream.
+
+    Output is flushed whenever more than `buffer_size` bytes are pending. Set `buffer_size` to 0 to flush after every
+    document, e.g. when following logs interactively.
+
+    Output can be compressed with `gzip`, or `zstd` (which requires the `zstd` extra). Compressed output is only
+    complete once the writer is closed.
+
+    Usage:
+
+        with JSONLinesWriter(sys.stdout.buffer) as writer:
+            for document in documents:
+                writer.write(document)
+    """
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        sort_keys: bool = True,
+        buffer_size: int = 64 * 1024,
+        compression: Literal["gzip", "zstd"] = None,
+    ) -> None:
+        self.stream = stream
+        self.sort_keys = sort_keys
+        self.buffer_size = buffer_size
+        self._buffer: list[bytes] = []
+        self._buffered = 0
+        self._compressed: Any = None
+        if compression == "gzip":
+            self._compressed = gzip.GzipFile(fileobj=stream, mode="wb")
+        elif compression == "zstd":
+            from elastic_log_cli._compat.zstandard import zstandard
+
+            self._compressed = zstandard.ZstdCompressor().stream_writer(stream, closefd=False)
+
+    def write(self, document: dict) -> None:
+        self.write_line(dumps(document, sort_keys=self.sort_keys))
+
+    def write_line(self, line: bytes) -> None:
+        """Write a pre-formatted line, e.g. from a template, which should not include the trailing newline."""
+        line += b"\n"
+        self._buffer.append(line)
+        self._buffered += len(line)
+        if self._buffered >= self.buffer_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._buffer:
+            (self._compressed or self.stream).write(b"".join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+        if self._compressed is not None:
+            self._compressed.flush()
+        self.stream.flush()
+
+    def close(self) -> None:
+        """Flush pending output, and end the compressed stream (leaving the underlying stream open)."""
+        self.flush()
+        if self._compressed is not None:
+            self._compressed.close()
+            self._compressed = None
+            self.stream.flush()
+
+    def __enter__(self) -> "JSONLinesWriter":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+
+class ColumnarWriter:
+    """Writes documents to a binary stream as Parquet or Arrow IPC (streaming format), in record batches.
+
+    Requires the `arrow` extra. Documents are written in batches of `batch_size`, e.g. one batch per page of a scan.
+
+    Each column holds a field of the documents, looked up by its key or else by its dotted path, so `host.name` selects
+    `{"host": {"name": ...}}`. Columns are given by `columns`, or otherwise taken from the keys of the first batch.
+    Column types are inferred from the first batch, with columns which are empty throughout it stored as strings.
+    Fields whose values have a different type in later batches cannot be written, and raise `ElasticLogError`.
+
+    Usage:
+
+        with ColumnarWriter(sys.stdout.buffer, "parquet", columns=["@timestamp", "message"]) as writer:
+            for document in documents:
+                writer.write(document)
+    """
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        output_format: Literal["parquet", "arrow"],
+        columns: list[str] = None,
+        batch_size: int = 1000,
+    ) -> None:
+        self.stream = stream
+        self.output_format = output_format
+        self.columns = columns
+        self.batch_size = batch_size
+        self._rows: list[dict] = []
+        self._writer: Any = None
+        self._schema: Any = None
+
+    def write(self, document: dict) -> None:
+        self._rows.append(document)
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._rows:
+            self._write_batch()
+        self.stream.flush()
+
+    def close(self) -> None:
+        """Flush pending documents and finish the file. An empty file is written if there were no documents."""
+        self.flush()
+        if self._writer is None:
+            self._write_batch()
+        self._writer.close()
+        self.stream.flush()
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def _write_batch(self) -> None:
+        from elastic_log_cli._compat.pyarrow import pyarrow
+
+        if self.columns is None:
+            self.columns = list(dict.fromkeys(key for row in self._rows for key in row))
+        data = {column: [get_field(row, column) for row in self._rows] for column in self.columns}
+        if self._writer is None:
+            self._schema = _infer_schema(pyarrow, data)
+            self._writer = self._open(pyarrow, self._schema)
+        try:
+            table = pyarrow.Table.from_pydict(data, schema=self._schema)
+        except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError) as exc:
+            raise ElasticLogError(f"Could not write logs as {self.output_format}: {exc}") from exc
+        self._writer.write_table(table)
+        self._rows.clear()
+
+    def _open(self, pyarrow: Any, schema: Any) -> Any:
+        sink = pyarrow.PythonFile(_PositionTrackingStream(self.stream), mode="w")
+        if self.output_format == "parquet":
+            return pyarrow.parquet.ParquetWriter(sink, schema)
+        return pyarrow.ipc.new_stream(sink, schema)
+
+
+def open_writer(
+    stream: BinaryIO,
+    output_format: str = "ndjson",
+    *,
+    sort_keys: bool = True,
+    buffer_size: int = 64 * 1024,
+    batch_size: int = 1000,
+    columns: list[str] = None,
+) -> JSONLinesWriter | ColumnarWriter:
+    """Open a writer for one of `OUTPUT_FORMATS`. See `JSONLinesWriter` and `ColumnarWriter` for the options."""
+    if output_format == "ndjson":
+        return JSONLinesWriter(stream, sort_keys=sort_keys, buffer_size=buffer_size)
+    if output_format == "ndjson.gz":
+        return JSONLinesWriter(stream, sort_keys=sort_keys, buffer_size=buffer_size, compression="gzip")
+    if output_format == "ndjson.zst":
+        return JSONLinesWriter(stream, sort_keys=sort_keys, buffer_size=buffer_size, compression="zstd")
+    if output_format == "parquet":
+        return ColumnarWriter(stream, "parquet", columns=columns, batch_size=batch_size)
+    if output_format == "arrow":
+        return ColumnarWriter(stream, "arrow", columns=columns, batch_size=batch_size)
+    raise ValueError(f"Unknown output format {output_format!r}")
+
+
+class _PositionTrackingStream:
+    """Write-only stream which tracks its own position, as writing Parquet requires `tell`, which pipes lack."""
+
+    def __init__(self, stream: BinaryIO) -> None:
+        self.stream = stream
+        self.position = 0
+        self.closed = False
+
+    def write(self, data: bytes) -> int:
+        self.stream.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    def close(self) -> None:
+        # The underlying stream (e.g. stdout) is left open
+        self.flush()
+        self.closed = True
+
+
+def _infer_schema(pyarrow: Any, data: dict[str, list]) -> Any:
+    schema = pyarrow.Table.from_pydict(data).schema
+    return pyarrow.schema(
+        [field.with_type(pyarrow.string()) if pyarrow.types.is_null(field.type) else field for field in schema]
+    )
@@ -0,0 +1,131 @@
+"""Client-side filtering and reshaping of logs, applied to decoded documents before they are output."""
+import json
+import re
+from collections.abc import Callable
+from typing import Any
+
+from elastic_log_cli.exceptions import ElasticLogValidationError
+from elastic_log_cli.utils.fields import get_field, without_field
+
+
+class PostProcessor:
+    """Filters and reshapes documents, for what cannot be expressed in KQL.
+
+    Each stage is optional, and applied in order:
+
+    1. `include` and `exclude` are lists of `(field, pattern)` regular expressions. Documents are kept only if every
+       `include` pattern matches its field, and no `exclude` pattern does. Patterns are searched for anywhere in the
+       value, and any element of a list value may match. Missing fields never match.
+    2. `project` selects fields by dotted path, as `path` or `name=path` to rename them. Missing fields are omitted.
+    3. `drop` removes fields by dotted path.
+
+    Fields are looked up as described by `get_field`. Documents are never modified in place.
+
+    Usage:
+
+        post_process = PostProcessor(include=[("message", "timed? out")], drop=["agent"])
+        for document in documents:
+            document = post_process(document)
+            if document is not None:
+                ...
+    """
+
+    def __init__(
+        self,
+        include: list[tuple[str, str]] = None,
+        exclude: list[tuple[str, str]] = None,
+        project: list[str] = None,
+        drop: list[str] = None,
+    ) -> None:
+        self.include = [(field, _compile(pattern)) for field, pattern in include or []]
+        self.exclude = [(field, _compile(pattern)) for field, pattern in exclude or []]
+        self.project = [_parse_projection(projection) for projection in project] if project else None
+        self.drop = drop or []
+
+    def __call__(self, document: dict) -> dict | None:
+        """Filter and reshape a document, returning `None` if it is filtered out."""
+        for field, pattern in self.include:
+            if not _search(pattern, get_field(document, field)):
+                return None
+        for field, pattern in self.exclude:
+            if _search(pattern, get_field(document, field)):
+                return None
+        if self.project is not None:
+            projected = {}
+            for name, path in self.project:
+                value = get_field(document, path)
+                if value is not None:
+                    projected[name] = value
+            document = projected
+        for field in self.drop:
+            document = without_field(document, field)
+        return document
+
+
+def compile_template(template: str) -> Callable[[dict], str]:
+    """Compile a template such as `{@timestamp} [{log.level}] {message}` into a function formatting documents.
+
+    Fields are given by dotted path, and literal braces are written as `{{` and `}}`. Missing fields are formatted as
+    empty strings, and objects and lists as compact JSON.
+    """
+    literals: list[str] = []
+    fields: list[str] = []
+    position = 0
+    literal = ""
+    for match in re.finditer(r"\{\{|\}\}|\{([^{}]*)\}|[{}]", template):
+        literal += template[position : match.start()]
+        position = match.end()
+        if match.group() in ("{{", "}}"):
+            literal += match.group()[0]
+        elif match.group(1):
+            literals.append(literal)
+            fields.append(match.group(1))
+            literal = ""
+        else:
+            raise ElasticLogValidationError(f"Invalid template {template!r}: unmatched or empty braces.")
+    literals.append(literal + template[position:])
+
+    def _format(document: dict) -> str:
+        parts = [literals[0]]
+        for field, literal in zip(fields, literals[1:]):
+            parts.append(_format_value(get_field(document, field)))
+            parts.append(literal)
+        return "".join(parts)
+
+    return _format
+
+
+def parse_field_pattern(value: str) -> tuple[str, str]:
+    """Split a `FIELD=PATTERN` argument."""
+    field, separator, pattern = value.partition("=")
+    if not separator or not field:
+        raise ElasticLogValidationError(f"Expected FIELD=PATTERN, got {value!r}.")
+    return field, pattern
+
+
+def _compile(pattern: str) -> re.Pattern:
+    try:
+        return re.compile(pattern)
+    except re.error as exc:
+        raise ElasticLogValidationError(f"Invalid regular expression {pattern!r}: {exc}") from exc
+
+
+def _search(pattern: re.Pattern, value: Any) -> bool:
+    if value is None:
+        return False
+    if isinstance(value, list):
+        return any(_search(pattern, item) for item in value)
+    return pattern.search(value if isinstance(value, str) else _format_value(value)) is not None
+
+
+def _parse_projection(projection: str) -> tuple[str, str]:
+    name, _, path = projection.partition("=")
+    return (name, path) if path else (name, name)
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
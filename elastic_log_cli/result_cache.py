@@ -0,0 +1,186 @@
+"""Persistent cache of the results of historical scans."""
+import hashlib
+import json
+import sqlite3
+import zlib
+from collections.abc import Iterator
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+from pathlib import Path
+
+from elastic_log_cli.utils.cache import get_cache_dir
+
+# Logs may be indexed some time after their timestamp, so recent ranges are not considered complete
+SETTLE_TIME = timedelta(minutes=10)
+
+
+class ResultCache:
+    """Size-bounded LRU cache of scan results, stored in SQLite.
+
+    Each scan is identified by a key describing everything which determines its results (cluster, index, query, sort
+    and retrieved fields). Hits are stored as zlib-compressed JSON in chunks of `chunk_size`, as they are yielded, and
+    the scan is only served from the cache once it has been stored completely. When the total size of stored scans
+    exceeds `max_bytes`, the least recently used scans are evicted.
+
+    As with the compilation cache, database errors are ignored, so the cache can never prevent a scan from running.
+    Recency is tracked with a logical clock.
+
+    Usage:
+
+        hits = result_cache.cached(key, search_after_scan(...))
+    """
+
+    def __init__(self, path: Path, max_bytes: int = 1024 * 1024 * 1024, chunk_size: int = 1000) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+
+    def cached(self, key: dict, hits: Iterator[dict]) -> Iterator[dict]:
+        """Yield hits of a scan from the cache if it is stored, or otherwise from `hits`, storing them."""
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+        yielded = 0
+        try:
+            with closing(self._connect()) as connection:
+                if self._touch(connection, digest):
+                    for (content,) in connection.execute(
+                        "SELECT content FROM result_chunks WHERE key = ? ORDER BY chunk", (digest,)
+                    ):
+                        for hit in json.loads(zlib.decompress(content)):
+                            yield hit
+                            yielded += 1
+                    return
+        except (sqlite3.Error, zlib.error):
+            if yielded:
+                # Results are deterministic, so carry on from the same point in the scan, without storing it
+                yield from islice(hits, yielded, None)
+                return
+        yield from self._store(digest, hits)
+
+    def _store(self, digest: str, hits: Iterator[dict]) -> Iterator[dict]:
+        """Yield hits, storing them in chunks. Scans which are not yielded completely are discarded."""
+        connection = self._begin(digest)
+        chunk: list[dict] = []
+        chunks = size = 0
+        complete = False
+        try:
+            for hit in hits:
+                yield hit
+                chunk.append(hit)
+                if len(chunk) >= self.chunk_size:
+                    connection, size = self._store_chunk(connection, digest, chunks, chunk, size)
+                    chunk, chunks = [], chunks + 1
+            if chunk:
+                connection, size = self._store_chunk(connection, digest, chunks, chunk, size)
+            complete = True
+        finally:
+            if connection is not None:
+                self._finish(connection, digest, size, complete)
+
+    def _begin(self, digest: str) -> sqlite3.Connection | None:
+        try:
+            connection = self._connect()
+        except sqlite3.Error:
+            return None
+        try:
+            with connection:
+                connection.execute("DELETE FROM result_chunks WHERE key = ?", (digest,))
+        except sqlite3.Error:
+            connection.close()
+            return None
+        return connection
+
+    def _store_chunk(
+        self, connection: sqlite3.Connection | None, digest: str, index: int, chunk: list[dict], size: int
+    ) -> tuple[sqlite3.Connection | None, int]:
+        if connection is None:
+            return None, size
+        content = zlib.compress(json.dumps(chunk, separators=(",", ":")).encode("utf-8"))
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT INTO result_chunks (key, chunk, content) VALUES (?, ?, ?)", (digest, index, content)
+                )
+        except sqlite3.Error:
+            # Stop storing the scan, but carry on yielding it
+            connection.close()
+            return None, size
+        return connection, size + len(content)
+
+    def _finish(self, connection: sqlite3.Connection, digest: str, size: int, complete: bool) -> None:
+        try:
+            with connection:
+                if not complete:
+                    connection.execute("DELETE FROM result_chunks WHERE key = ?", (digest,))
+                    return
+                connection.execute(
+                    "INSERT OR REPLACE INTO result_scans (key, size, last_used) VALUES ("
+                    "    ?, ?, (SELECT COALESCE(MAX(last_used), 0) + 1 FROM result_scans)"
+                    ")",
+                    (digest, size),
+                )
+                self._evict(connection)
+        except sqlite3.Error:
+            pass
+        finally:
+            connection.close()
+
+    def _touch(self, connection: sqlite3.Connection, digest: str) -> bool:
+        """Mark a scan as recently used, returning whether it is stored."""
+        with connection:
+            updated = connection.execute(
+                "UPDATE result_scans SET last_used = ("
+                "    SELECT COALESCE(MAX(last_used), 0) + 1 FROM result_scans"
+                ") WHERE key = ?",
+                (digest,),
+            )
+        return updated.rowcount > 0
+
+    def _evict(self, connection: sqlite3.Connection) -> None:
+        evicted = [
+            key
+            for key, in connection.execute(
+                "SELECT key FROM ("
+                "    SELECT key, SUM(size) OVER (ORDER BY last_used DESC) AS total FROM result_scans"
+                ") WHERE total > ?",
+                (self.max_bytes,),
+            )
+        ]
+        connection.executemany("DELETE FROM result_scans WHERE key = ?", [(key,) for key in evicted])
+        connection.executemany("DELETE FROM result_chunks WHERE key = ?", [(key,) for key in evicted])
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=1.0)
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS result_scans (key TEXT PRIMARY KEY, size INTEGER, last_used INTEGER)"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS result_chunks (key TEXT, chunk INTEGER, content BLOB, PRIMARY KEY (key, chunk))"
+        )
+        return connection
+
+
+def is_historical(end: str | None, now: datetime = None) -> bool:
+    """Whether a time range ending at `end` is fully in the past, so its results will not change.
+
+    Only ISO 8601 timestamps are recognised, not date math such as `now-1d`. Timestamps without a timezone are UTC, as
+    in Elasticsearch.
+    """
+    if not end:
+        return False
+    try:
+        timestamp = datetime.fromisoformat(end.replace("Z", "+00:00"))
+    except ValueError:
+        return False
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    if now is None:
+        now = datetime.now(timezone.utc)
+    return timestamp <= now - SETTLE_TIME
+
+
+def get_result_cache() -> ResultCache | None:
+    cache_dir = get_cache_dir()
+    if cache_dir is None:
+        return None
+    return ResultCache(cache_dir / "results.sqlite")
@@ -1,76 +1,744 @@
 import binascii
+import gzip
+import heapq
+import json as jsonlib
 import os
-from collections.abc import Iterator
+import re
+from collections import deque
+from collections.abc import Callable, Generator, Iterable, Iterator
 from functools import cache
+from itertools import islice
+from time import monotonic, sleep, time
 from urllib.parse import parse_qs, urlencode, urlparse
 
-from requests import ConnectionError, PreparedRequest, Session, Timeout
+from requests import ConnectionError, PreparedRequest, Response, Session, Timeout
 from requests.auth import AuthBase
+from requests.exceptions import ChunkedEncodingError
 
 from elastic_log_cli import __version__
-from elastic_log_cli.config import get_settings
+from elastic_log_cli.checkpoint import Checkpoint
+from elastic_log_cli.config import current_cluster, get_settings, use_cluster
+from elastic_log_cli.utils.background import background_iterator
 from elastic_log_cli.utils.backoff import Backoff, exponential_backoff
+from elastic_log_cli.utils.page_size import AdaptivePageSize
+from elastic_log_cli.utils.polling import PollingInterval
+from elastic_log_cli.utils.seen import SeenSet
+from elastic_log_cli.utils.stats import get_stats
 
 
 class ElasticsearchError(Exception):
     pass
 
 
+class SearchTimeoutError(ElasticsearchError):
+    """A search timed out or was rejected as Elasticsearch is overloaded, so may succeed with a smaller page."""
+
+
+# Only the parts of search responses which scans use, see `search_params`
+SCAN_FILTER_PATH = "timed_out,pit_id,hits.hits._source,hits.hits.fields,hits.hits.sort"
+
+# Marks the heartbeats yielded by scans when following with `heartbeats` set, see `search_after_scan`
+_HEARTBEAT = "_heartbeat"
+
+
 def search_after_scan(
     index: str,
     query: dict,
     sort: list[dict | str] | dict | str,
-    source: list[str] = None,
+    source: list[str] | dict | bool | None = None,
     size: int = 1000,
     backoff: Backoff = None,
     follow: bool = False,
-) -> Iterator[dict]:
+    prefetch: int = 0,
+    polling: PollingInterval = None,
+    stream: bool = False,
+    page_size: AdaptivePageSize = None,
+    fields: list[str] = None,
+    docvalue_fields: list[str] = None,
+    filter_path: str = None,
+    checkpoint: Checkpoint = None,
+    overlap: float = 0.0,
+    seen: SeenSet = None,
+    heartbeats: bool = False,
+) -> Generator[dict, None, None]:
     """Implementation of `search_after` pagination (without point-in-time).
 
     Will paginate through results and yield them. Back-off is performed on connection errors, by default using an
     exponential back-off of 2, 4, 8 ... seconds (up to 8.5 minutes).
 
+    If `follow` is set, the scan continues polling for new results once it reaches the end. The interval between polls
+    adapts to the rate of new results, as described by `PollingInterval`.
+
+    When following, set `overlap` to re-read the last `overlap` seconds behind the cursor whenever the scan catches up,
+    so that logs which are indexed late (with a timestamp behind the cursor, e.g. from another shard) are not skipped.
+    Hits are de-duplicated by `_index` and `_id` using `seen` (by default a `SeenSet` of the last 100,000 hits), so
+    those which were already yielded are not repeated. This requires the first sort field to be a date, and is not
+    supported when streaming.
+
+    When following with `heartbeats` set, each poll which catches up is followed by a heartbeat: a hit with only a
+    `_heartbeat` key and `sort` values of the time of the poll (in epoch milliseconds), marking that no more hits are
+    expected before then. This lets `multi_cluster_scan` merge in hits from other clusters whilst this one is quiet.
+    It requires the first sort field to be a date.
+
+    If `prefetch` is non-zero, pages are fetched in a background thread, up to that many pages ahead of the consumer.
+    The next page is requested as soon as the cursor for the current page is known, overlapping network time with
+    the time taken to consume each page.
+
+    If `stream` is set, each response is decoded incrementally as it is received (see `search_hits`), so memory use
+    does not grow with the page size. Prefetching is not performed when streaming, as the cursor for the next page is
+    only known once the current page has been consumed.
+
+    If `page_size` is provided, it overrides `size`, and is tuned between pages according to the time taken and bytes
+    received for each page, as described by `AdaptivePageSize`. It is not supported when streaming.
+
+    Which fields are returned for each hit is controlled by `source`, `fields` and `docvalue_fields` (see
+    `search_body`). Set `filter_path` to `SCAN_FILTER_PATH` to omit hit metadata (e.g. `_id` and `_index`) which is
+    not needed to paginate, reducing the size of each response.
+
+    If a `checkpoint` is provided, the scan starts from its cursor, and saves the cursor once each page has been
+    consumed, so it can later be resumed (see `Checkpoint`). Hits which were fetched but not yet consumed, e.g. when
+    prefetching, are not included in the checkpoint.
+
     Notes:
         See https://www.elastic.co/guide/en/elasticsearch/reference/7.16/paginate-search-results.html#search-after
         Its poorly documented, but a sort _must_ be provided for `search_after` to work.
 
     Warning:
         This will only work if the search results do not change for the duration of the scan. A point-in-time search
-        should instead be used for that case.
+        should instead be used for that case, see `point_in_time_scan`.
     """
-    search_after = None
     backoff = backoff or exponential_backoff(base=2.0, factor=1.0, maximum=10)
-    while True:
-        with backoff.on(Timeout, ConnectionError):
-            result = search(
+    polling = (polling or PollingInterval()) if follow else None
+    heartbeats = heartbeats and follow
+    if heartbeats and checkpoint:
+        raise ValueError("Heartbeats are not supported with a checkpoint")
+    if stream and page_size:
+        raise ValueError("Adaptive page sizing is not supported when streaming")
+    overlap = overlap if follow else 0.0
+    if stream and overlap:
+        raise ValueError("Following with an overlap is not supported when streaming")
+    if overlap:
+        seen = seen or SeenSet()
+        if filter_path:
+            # Hits are identified by their index and ID
+            filter_path = f"{filter_path},hits.hits._index,hits.hits._id"
+    if stream:
+        yield from _search_after_stream(
+            index=index,
+            query=query,
+            sort=sort,
+            source=source,
+            fields=fields,
+            docvalue_fields=docvalue_fields,
+            filter_path=filter_path,
+            size=size,
+            backoff=backoff,
+            follow=follow,
+            polling=polling,
+            checkpoint=checkpoint,
+            heartbeats=heartbeats,
+        )
+        return
+    pages = _search_after_pages(
+        index=index,
+        query=query,
+        sort=sort,
+        source=source,
+        fields=fields,
+        docvalue_fields=docvalue_fields,
+        filter_path=filter_path,
+        size=size,
+        backoff=backoff,
+        follow=follow,
+        polling=polling,
+        page_size=page_size,
+        search_after=checkpoint.search_after if checkpoint else None,
+        overlap=overlap,
+        seen=seen,
+        heartbeats=heartbeats,
+    )
+    if prefetch:
+        pages = background_iterator(pages, maxsize=prefetch)
+    try:
+        yield from _checkpointed(pages, checkpoint) if checkpoint else _flatten(pages)
+    finally:
+        pages.close()
+
+
+def point_in_time_scan(
+    index: str,
+    query: dict,
+    sort: list[dict | str] | dict | str,
+    source: list[str] | dict | bool | None = None,
+    size: int = 1000,
+    slices: int = 1,
+    keep_alive: str = "1m",
+    backoff_factory: Callable[[], Backoff] = None,
+    prefetch: int = 1,
+    fields: list[str] = None,
+    docvalue_fields: list[str] = None,
+    filter_path: str = None,
+) -> Generator[dict, None, None]:
+    """Implementation of `search_after` pagination over a point-in-time, optionally split into parallel slices.
+
+    A point-in-time is opened against the index, so results are consistent for the duration of the scan. When
+    `slices` is greater than one, the point-in-time is split into that many slices, which are paginated concurrently
+    in background threads, each fetching up to `prefetch` pages ahead of the consumer. Hits from each slice are merged
+    back into sort order before being yielded.
+
+    Each slice performs its own back-off, so a factory is accepted rather than a single `Backoff` instance.
+
+    Notes:
+        See https://www.elastic.co/guide/en/elasticsearch/reference/7.16/point-in-time-api.html and
+        https://www.elastic.co/guide/en/elasticsearch/reference/7.16/paginate-search-results.html#slice-scroll
+        Merging assumes an ascending sort, and that the sort values of every hit are comparable.
+
+    Warning:
+        Point-in-time search is an Elasticsearch 7.10+ feature, and is not available on OpenSearch.
+    """
+    backoff_factory = backoff_factory or (lambda: exponential_backoff(base=2.0, factor=1.0, maximum=10))
+    pit_id = open_point_in_time(index, keep_alive=keep_alive)
+    scans: list[Generator[list[dict], None, None]] = []
+    try:
+        for slice_id in range(slices):
+            pages = _search_after_pages(
                 index=index,
                 query=query,
-                source=source,
                 sort=sort,
+                source=source,
+                fields=fields,
+                docvalue_fields=docvalue_fields,
+                filter_path=filter_path,
                 size=size,
-                search_after=search_after,
+                backoff=backoff_factory(),
+                follow=False,
+                pit={"id": pit_id, "keep_alive": keep_alive},
+                search_slice={"id": slice_id, "max": slices} if slices > 1 else None,
             )
-            hits = result["hits"]["hits"]
-            if not hits and not follow:
+            scans.append(background_iterator(pages, maxsize=prefetch))
+        yield from heapq.merge(*(_flatten(scan) for scan in scans), key=_sort_key)
+    finally:
+        for scan in scans:
+            scan.close()
+        close_point_in_time(pit_id)
+
+
+def time_window_scan(
+    index: str,
+    query: dict,
+    sort: list[dict | str] | dict | str,
+    timestamp_field: str,
+    source: list[str] | dict | bool | None = None,
+    size: int = 1000,
+    parallel: int = 1,
+    windows_per_scan: int = 4,
+    backoff_factory: Callable[[], Backoff] = None,
+    prefetch: int = 1,
+    fields: list[str] = None,
+    docvalue_fields: list[str] = None,
+    filter_path: str = None,
+) -> Iterator[dict]:
+    """Implementation of `search_after` pagination, split into time windows which are scanned in parallel.
+
+    The results of the query are first split into `parallel * windows_per_scan` consecutive time windows, containing
+    similar numbers of hits (see `time_windows`). Up to `parallel` windows are then scanned concurrently in background
+    threads, each with its own `search_after` cursor and fetching up to `prefetch` pages ahead. As the windows do not
+    overlap, yielding each window in turn preserves the overall order.
+
+    This is only suitable for bounded queries, and requires the sort to be ascending by `timestamp_field` first.
+    """
+    backoff_factory = backoff_factory or (lambda: exponential_backoff(base=2.0, factor=1.0, maximum=10))
+
+    def _scan(window: tuple[int | None, int | None]) -> Generator[list[dict], None, None]:
+        window_range: dict = {"format": "epoch_millis"}
+        lower, upper = window
+        if lower is not None:
+            window_range["gte"] = lower
+        if upper is not None:
+            window_range["lt"] = upper
+        pages = _search_after_pages(
+            index=index,
+            query={"bool": {"filter": [query, {"range": {timestamp_field: window_range}}]}},
+            sort=sort,
+            source=source,
+            fields=fields,
+            docvalue_fields=docvalue_fields,
+            filter_path=filter_path,
+            size=size,
+            backoff=backoff_factory(),
+            follow=False,
+        )
+        return background_iterator(pages, maxsize=prefetch)
+
+    windows = iter(time_windows(index, query, timestamp_field, count=parallel * windows_per_scan))
+    scans: deque[Generator[list[dict], None, None]] = deque(_scan(window) for window in islice(windows, parallel))
+    try:
+        while scans:
+            yield from _flatten(scans[0])
+            scans.popleft()
+            window = next(windows, None)
+            if window is not None:
+                scans.append(_scan(window))
+    finally:
+        for scan in scans:
+            scan.close()
+
+
+def time_windows(index: str, query: dict, timestamp_field: str, count: int) -> list[tuple[int | None, int | None]]:
+    """Split the results of a query into consecutive time windows, containing similar numbers of hits.
+
+    A histogram of hits over time is fetched with an `auto_date_histogram` aggregation, which is used to choose
+    boundaries between windows. Boundaries are epoch milliseconds; each window includes its lower bound and excludes
+    its upper bound. The first and last windows are unbounded below and above respectively, so that together the
+    windows cover every hit of the query.
+
+    Fewer than `count` windows may be returned, if there are too few hits to split.
+
+    Notes:
+        See https://www.elastic.co/guide/en/elasticsearch/reference/7.16/search-aggregations-bucket-autodatehistogram-aggregation.html
+    """
+    response = get_client().get(
+        f"/{index}/_search",
+        params={"track_total_hits": "false"},
+        json={
+            "size": 0,
+            "query": query,
+            "aggs": {"histogram": {"auto_date_histogram": {"field": timestamp_field, "buckets": count * 10}}},
+        },
+    )
+    _raise_for_status(response)
+    buckets = response.json()["aggregations"]["histogram"]["buckets"]
+    total = sum(bucket["doc_count"] for bucket in buckets)
+    boundaries: list[int] = []
+    cumulative = 0
+    for bucket in buckets:
+        if total and len(boundaries) < count - 1 and cumulative >= total * (len(boundaries) + 1) / count:
+            boundaries.append(bucket["key"])
+        cumulative += bucket["doc_count"]
+    return list(zip([None, *boundaries], [*boundaries, None]))
+
+
+def count_hits(index: str, query: dict) -> int:
+    """Count the hits of a query, without fetching them."""
+    response = get_client().get(f"/{index}/_count", json={"query": query})
+    _raise_for_status(response)
+    return response.json()["count"]
+
+
+def get_mapping(index: str) -> dict:
+    """Fetch the mappings of each index matching `index`, keyed by index name."""
+    response = get_client().get(f"/{index}/_mapping", params={"filter_path": "*.mappings"})
+    _raise_for_status(response)
+    return response.json()
+
+
+def date_histogram(index: str, query: dict, timestamp_field: str, interval: str) -> list[dict]:
+    """Count the hits of a query in consecutive time buckets, without fetching them.
+
+    `interval` is an Elasticsearch time unit, e.g. `30s` or `5m`. Single calendar units (e.g. `1d` or `1M`) are
+    calendar-aware, following daylight savings and month lengths; multiples are fixed lengths of time, so are only
+    supported for milliseconds, seconds, minutes, hours and days. Buckets are returned in ascending order, as
+    `timestamp` (the start of the bucket) and `count`, including empty buckets between the first and last hits.
+
+    Notes:
+        See https://www.elastic.co/guide/en/elasticsearch/reference/7.16/search-aggregations-bucket-datehistogram-aggregation.html
+    """
+    interval_type = "calendar_interval" if _CALENDAR_INTERVAL.fullmatch(interval) else "fixed_interval"
+    response = get_client().get(
+        f"/{index}/_search",
+        params={"track_total_hits": "false"},
+        json={
+            "size": 0,
+            "query": query,
+            "aggs": {
+                "histogram": {
+                    "date_histogram": {
+                        "field": timestamp_field,
+                        interval_type: interval,
+                        "format": "strict_date_optional_time",
+                        "min_doc_count": 0,
+                    }
+                }
+            },
+        },
+    )
+    _raise_for_status(response)
+    return [
+        {"timestamp": bucket["key_as_string"], "count": bucket["doc_count"]}
+        for bucket in response.json()["aggregations"]["histogram"]["buckets"]
+    ]
+
+
+_CALENDAR_INTERVAL = re.compile(r"1[mhdwMqy]")
+
+
+def multi_cluster_scan(clusters: list[str], scan: Callable[[], Iterator[dict]]) -> Generator[dict, None, None]:
+    """Run the same scan against several named clusters, merging hits back into sort order.
+
+    `scan` is called once for each cluster, and the resulting scan is always advanced within that cluster's context
+    (see `elastic_log_cli.config.use_cluster`), so each has its own client and cursors. Scans which prefetch pages
+    fetch from every cluster concurrently. Each hit is labelled with the name of its cluster as `_cluster`.
+
+    Notes:
+        Merging assumes an ascending sort, and that the sort values of hits from every cluster are comparable, e.g.
+        sorting by timestamp first.
+
+    Warning:
+        When following, a hit is only yielded once every other cluster has returned a later hit or heartbeat, so the
+        scans should set `heartbeats` (see `search_after_scan`). Otherwise, output from all clusters is held back
+        whilst any cluster is quiet. A hit which is indexed after a heartbeat later than its timestamp is yielded out of
+        order, once it is found.
+    """
+    scans = [_cluster_scan(cluster, scan) for cluster in clusters]
+    try:
+        for hit in heapq.merge(*scans, key=_sort_key):
+            if _HEARTBEAT not in hit:
+                yield hit
+    finally:
+        for cluster_scan in scans:
+            cluster_scan.close()
+
+
+def _cluster_scan(cluster: str, scan: Callable[[], Iterator[dict]]) -> Generator[dict, None, None]:
+    with use_cluster(cluster):
+        hits = scan()
+    try:
+        while True:
+            with use_cluster(cluster):
+                hit = next(hits, None)
+            if hit is None:
                 return
+            hit["_cluster"] = cluster
+            yield hit
+    finally:
+        close = getattr(hits, "close", None)
+        if close is not None:
+            with use_cluster(cluster):
+                close()
+
+
+def _search_after_pages(
+    *,
+    index: str,
+    query: dict,
+    sort: list[dict | str] | dict | str,
+    source: list[str] | dict | bool | None,
+    size: int,
+    backoff: Backoff,
+    follow: bool,
+    polling: PollingInterval | None = None,
+    page_size: AdaptivePageSize | None = None,
+    pit: dict | None = None,
+    search_slice: dict | None = None,
+    fields: list[str] | None,
+    docvalue_fields: list[str] | None,
+    filter_path: str | None,
+    search_after: list | None = None,
+    overlap: float = 0.0,
+    seen: SeenSet | None = None,
+    heartbeats: bool = False,
+) -> Generator[list[dict], None, None]:
+    """Paginate through results using `search_after`, yielding each non-empty page of hits.
+
+    When following, polls are scheduled according to `polling`. When `page_size` is provided, the size of each page is
+    taken from it, and it is updated with the cost of each page. Pagination starts after `search_after`, if provided.
+
+    Hits which are in `seen` are skipped. With an `overlap` (in seconds), the cursor is rewound by that much behind the
+    furthest hit each time pagination catches up, so the next poll re-reads the overlap window.
+
+    With `heartbeats`, each time pagination catches up, a page of just a heartbeat is yielded (see `_heartbeat`).
+    """
+    furthest = search_after
+    while True:
+        with backoff.on(Timeout, ConnectionError, SearchTimeoutError):
+            if page_size:
+                size = page_size.size
+            polled_at = time()
+            started = monotonic()
             try:
+                response = _search_response(
+                    index=index,
+                    query=query,
+                    source=source,
+                    fields=fields,
+                    docvalue_fields=docvalue_fields,
+                    filter_path=filter_path,
+                    sort=sort,
+                    size=size,
+                    search_after=search_after,
+                    pit=pit,
+                    search_slice=search_slice,
+                )
+                result = _decode(response)
+                if result.get("timed_out"):
+                    # The hits are partial, missing those of shards which timed out, so cannot be paginated past
+                    raise SearchTimeoutError(response.status_code, "Search timed out")
+            except (Timeout, SearchTimeoutError):
+                if page_size:
+                    page_size.timed_out()
+                raise
+            hits = result.get("hits", {}).get("hits", [])
+            if page_size:
+                page_size.observe(hits=len(hits), latency=monotonic() - started, content_bytes=len(response.content))
+            if not hits and not follow:
+                return
+            if pit and "pit_id" in result:
+                pit = {**pit, "id": result["pit_id"]}
+            new_hits = [hit for hit in hits if seen.add(hit)] if seen is not None else hits
+            if hits:
                 search_after = hits[-1]["sort"]
-            except IndexError:
-                pass
-            for hit in hits:
+                if furthest is None or search_after > furthest:
+                    furthest = search_after
+            if new_hits:
+                yield new_hits
+            if heartbeats and len(hits) < size:
+                yield [_heartbeat(polled_at)]
+            if overlap and furthest is not None and len(hits) < size:
+                # Caught up, so re-read the overlap window. Sort values of dates are epoch milliseconds, and lowering
+                # the first sort value places the cursor before every hit in the window, whatever the other values.
+                search_after = [furthest[0] - int(overlap * 1000) - 1, *furthest[1:]]
+            if polling:
+                # Whilst re-reading the overlap window, only new hits show that logs are arriving
+                sleep(polling.next(received=len(hits) if len(hits) >= size else len(new_hits), capacity=size))
+
+
+def _search_after_stream(
+    *,
+    index: str,
+    query: dict,
+    sort: list[dict | str] | dict | str,
+    source: list[str] | dict | bool | None,
+    size: int,
+    backoff: Backoff,
+    follow: bool,
+    polling: PollingInterval | None,
+    fields: list[str] | None,
+    docvalue_fields: list[str] | None,
+    filter_path: str | None,
+    checkpoint: Checkpoint | None = None,
+    heartbeats: bool = False,
+) -> Iterator[dict]:
+    """Paginate through results using `search_after`, yielding hits as they are decoded from each response.
+
+    The cursor advances with each hit, so retrying after an error part-way through a response does not repeat hits.
+    The checkpoint, if any, is saved once all hits of each response have been consumed. With `heartbeats`, a
+    heartbeat is yielded each time pagination catches up (see `_heartbeat`).
+    """
+    search_after = checkpoint.search_after if checkpoint else None
+    while True:
+        with backoff.on(Timeout, ConnectionError, ChunkedEncodingError, SearchTimeoutError):
+            received = 0
+            # The cursor after the last hit of this response, if it had any
+            last_sort: list | None = None
+            polled_at = time()
+            for hit in search_hits(
+                index=index,
+                query=query,
+                source=source,
+                fields=fields,
+                docvalue_fields=docvalue_fields,
+                filter_path=filter_path,
+                sort=sort,
+                size=size,
+                search_after=search_after,
+            ):
+                received += 1
+                search_after = last_sort = hit["sort"]
                 yield hit
+            if checkpoint and last_sort is not None:
+                checkpoint.save(last_sort, checkpoint.documents + received)
+            if not received and not follow:
+                return
+            if heartbeats and received < size:
+                yield _heartbeat(polled_at)
+            if polling:
+                sleep(polling.next(received=received, capacity=size))
+
+
+def _flatten(pages: Iterable[list[dict]]) -> Iterator[dict]:
+    for hits in pages:
+        yield from hits
+
+
+def _checkpointed(pages: Iterable[list[dict]], checkpoint: Checkpoint) -> Iterator[dict]:
+    """Flatten pages, saving the checkpoint once the last hit of each page has been consumed."""
+    for hits in pages:
+        yield from hits
+        checkpoint.save(hits[-1]["sort"], checkpoint.documents + len(hits))
+
+
+def _heartbeat(polled_at: float) -> dict:
+    """A heartbeat for a poll at `polled_at` (in epoch seconds), which sorts as a hit with a timestamp of the poll."""
+    return {_HEARTBEAT: True, "sort": [int(polled_at * 1000)]}
+
+
+def _sort_key(hit: dict) -> list:
+    return hit["sort"]
 
 
 def search(
     index: str,
     query: dict,
     sort: list[dict | str] | dict | str,
-    source: list[str] = None,
+    source: list[str] | dict | bool | None = None,
     size: int = 1000,
     search_after: list[str] = None,
+    pit: dict = None,
+    search_slice: dict = None,
+    fields: list[str] = None,
+    docvalue_fields: list[str] = None,
+    filter_path: str = None,
 ) -> dict:
+    """Perform a single search request.
+
+    When a point-in-time is provided, the index is omitted from the request, as it is implied by the point-in-time.
+    """
+    response = _search_response(
+        index=index,
+        query=query,
+        sort=sort,
+        source=source,
+        fields=fields,
+        docvalue_fields=docvalue_fields,
+        filter_path=filter_path,
+        size=size,
+        search_after=search_after,
+        pit=pit,
+        search_slice=search_slice,
+    )
+    return _decode(response)
+
+
+def _decode(response: Response) -> dict:
+    started = monotonic()
+    result = response.json()
+    get_stats().record("decode", monotonic() - started)
+    return result
+
+
+def _search_response(
+    index: str,
+    query: dict,
+    sort: list[dict | str] | dict | str,
+    source: list[str] | dict | bool | None,
+    size: int,
+    search_after: list[str] | None,
+    pit: dict | None,
+    search_slice: dict | None,
+    fields: list[str] | None,
+    docvalue_fields: list[str] | None,
+    filter_path: str | None,
+) -> Response:
+    """Perform a single search request, recording its latency and size."""
     client = get_client()
+    started = monotonic()
+    response = client.get(
+        "/_search" if pit else f"/{index}/_search",
+        params=search_params(filter_path),
+        json=search_body(
+            query=query,
+            sort=sort,
+            source=source,
+            fields=fields,
+            docvalue_fields=docvalue_fields,
+            size=size,
+            search_after=search_after,
+            pit=pit,
+            search_slice=search_slice,
+        ),
+    )
+    _raise_for_status(response)
+    get_stats().record_request(latency=monotonic() - started, content_bytes=len(response.content))
+    return response
+
 
+def search_hits(
+    index: str,
+    query: dict,
+    sort: list[dict | str] | dict | str,
+    source: list[str] | dict | bool | None = None,
+    size: int = 1000,
+    search_after: list[str] = None,
+    fields: list[str] = None,
+    docvalue_fields: list[str] = None,
+    filter_path: str = None,
+) -> Iterator[dict]:
+    """Perform a single search request, yielding hits as they are decoded from the response.
+
+    The response is streamed and decoded incrementally, rather than buffering the whole body and decoding every hit
+    before the first is returned.
+
+    Requires the `streaming` extra to be installed.
+    """
+    from elastic_log_cli._compat.ijson import ijson  # This will trigger errors if dependencies not installed
+
+    client = get_client()
+    stats = get_stats()
+    started = monotonic()
+    with client.get(
+        f"/{index}/_search",
+        params=search_params(filter_path),
+        json=search_body(
+            query=query,
+            sort=sort,
+            source=source,
+            size=size,
+            search_after=search_after,
+            fields=fields,
+            docvalue_fields=docvalue_fields,
+        ),
+        stream=True,
+    ) as response:
+        _raise_for_status(response)
+        # Time spent by the consumer between chunks is excluded from the recorded latency
+        latency, content_bytes = monotonic() - started, 0
+        hits = ijson.sendable_list()
+        decoder = ijson.items_coro(hits, "hits.hits.item", use_float=True)
+        chunks = response.iter_content(chunk_size=64 * 1024)
+        while True:
+            started = monotonic()
+            chunk = next(chunks, None)
+            latency += monotonic() - started
+            if chunk is None:
+                break
+            content_bytes += len(chunk)
+            started = monotonic()
+            decoder.send(chunk)
+            stats.record("decode", monotonic() - started)
+            yield from hits
+            hits.clear()
+        decoder.close()
+        stats.record_request(latency=latency, content_bytes=content_bytes)
+        yield from hits
+
+
+def search_params(filter_path: str = None) -> dict:
+    """Build the query parameters of a search request, shared by the synchronous and asynchronous clients.
+
+    `filter_path` restricts which parts of the response are returned, see `SCAN_FILTER_PATH`.
+    """
+    params = {"track_total_hits": "false"}
+    if filter_path:
+        params["filter_path"] = filter_path
+    return params
+
+
+def search_body(
+    query: dict,
+    sort: list[dict | str] | dict | str,
+    source: list[str] | dict | bool | None = None,
+    size: int = 1000,
+    search_after: list[str] = None,
+    pit: dict = None,
+    search_slice: dict = None,
+    fields: list[str] = None,
+    docvalue_fields: list[str] = None,
+) -> dict:
+    """Build the body of a search request, shared by the synchronous and asynchronous clients.
+
+    `source` is passed as `_source`, so may be a list of fields to include, a dictionary of `includes` and `excludes`,
+    or `False` to omit sources entirely, e.g. when retrieving `fields` or `docvalue_fields` instead.
+    """
     body: dict = {
         "query": query,
         "sort": sort,
@@ -78,25 +746,53 @@ def search(
     }
     if search_after:
         body["search_after"] = search_after
-    if source:
+    if source or source is False:
         body["_source"] = source
-    response = client.get(
-        f"/{index}/_search",
-        params={"track_total_hits": "false"},
-        json=body,
-    )
+    if fields:
+        body["fields"] = fields
+    if docvalue_fields:
+        body["docvalue_fields"] = docvalue_fields
+    if pit:
+        body["pit"] = pit
+    if search_slice:
+        body["slice"] = search_slice
+    return body
+
+
+def open_point_in_time(index: str, keep_alive: str = "1m") -> str:
+    """Open a point-in-time against the index, returning its ID."""
+    response = get_client().post(f"/{index}/_pit", params={"keep_alive": keep_alive})
+    _raise_for_status(response)
+    return response.json()["id"]
+
+
+def close_point_in_time(pit_id: str) -> None:
+    """Close a point-in-time, releasing its resources on the cluster."""
+    response = get_client().delete("/_pit", json={"id": pit_id})
+    if response.status_code == 404:
+        return  # Already expired
+    _raise_for_status(response)
+
+
+def _raise_for_status(response: Response) -> None:
     try:
         response.raise_for_status()
     except Exception as exc:
-        raise ElasticsearchError(response.status_code, response.text) from exc
-    return response.json()
+        error = SearchTimeoutError if response.status_code in (429, 504) else ElasticsearchError
+        raise error(response.status_code, response.text) from exc
 
 
 class SingleOriginSession(Session):
-    """Requests session which targets a single origin, accepting only paths for each request."""
+    """Requests session which targets a single origin, accepting only paths for each request.
 
-    def __init__(self, base_url: str) -> None:
+    If `compress_requests` is set, JSON request bodies are sent gzip-compressed. `timeout` (in seconds) applies to
+    requests which do not set their own.
+    """
+
+    def __init__(self, base_url: str, compress_requests: bool = False, timeout: float = None) -> None:
         self.base_url = base_url
+        self.compress_requests = compress_requests
+        self.timeout = timeout
         super().__init__()
 
     def request(
@@ -119,6 +815,10 @@ class SingleOriginSession(Session):
         json=None,
     ):
         url = self.base_url.rstrip("/") + "/" + url.lstrip("/")
+        if self.compress_requests and json is not None:
+            data = gzip.compress(jsonlib.dumps(json).encode("utf-8"))
+            headers = {**(headers or {}), "content-type": "application/json", "content-encoding": "gzip"}
+            json = None
         return super().request(
             method,
             url,
@@ -128,7 +828,7 @@ class SingleOriginSession(Session):
             cookies=cookies,
             files=files,
             auth=auth,
-            timeout=timeout,
+            timeout=self.timeout if timeout is None else timeout,
             allow_redirects=allow_redirects,
             proxies=proxies,
             hooks=hooks,
@@ -139,37 +839,55 @@ class SingleOriginSession(Session):
         )
 
 
-@cache
 def get_client() -> SingleOriginSession:
+    """Client for the current cluster, see `elastic_log_cli.config.use_cluster`."""
+    return get_cluster_client(current_cluster.get())
+
+
+@cache
+def get_cluster_client(name: str | None) -> SingleOriginSession:
+    with use_cluster(name):
+        return _create_client()
+
+
+def _create_client() -> SingleOriginSession:
     settings = get_settings()
 
     url = get_elasticsearch_url()
-    session = SingleOriginSession(base_url=url)
+    session = SingleOriginSession(
+        base_url=url,
+        compress_requests=settings.elasticsearch_compression == "all",
+        timeout=settings.elasticsearch_timeout,
+    )
     session.verify = True
 
     for key in set(session.headers):
         session.headers.pop(key)
-    session.headers["accept-encoding"] = "gzip,deflate" if settings.is_cloud else None  # type: ignore
+    if settings.elasticsearch_compression != "none":
+        session.headers["accept-encoding"] = "gzip,deflate"
     session.headers["user-agent"] = f"elastic-log-cli-{__version__}"
 
     if settings.elasticsearch_auth_mode == "basicauth":
-        user_pass = (settings.elasticsearch_username, settings.elasticsearch_password)
-        if all(user_pass):
+        if settings.elasticsearch_username and settings.elasticsearch_password:
+            user_pass: tuple[str, str] = (settings.elasticsearch_username, settings.elasticsearch_password)
             session.auth = user_pass
     elif settings.elasticsearch_auth_mode == "apikey":
-        api_key = (
-            binascii.b2a_base64(f"{settings.elasticsearch_username}:{settings.elasticsearch_password}".encode("utf-8"))
-            .rstrip(b"\r\n")
-            .decode("utf-8")
-        )
-        session.headers["authorization"] = f"ApiKey {api_key}"
+        session.headers["authorization"] = f"ApiKey {get_api_key()}"
     elif settings.elasticsearch_auth_mode == "awssigv4":
         session.auth = get_awssigv4_auth()
 
     return session
 
 
-@cache
+def get_api_key() -> str:
+    settings = get_settings()
+    return (
+        binascii.b2a_base64(f"{settings.elasticsearch_username}:{settings.elasticsearch_password}".encode("utf-8"))
+        .rstrip(b"\r\n")
+        .decode("utf-8")
+    )
+
+
 def get_elasticsearch_url():
     settings = get_settings()
     if settings.is_cloud:
@@ -0,0 +1,68 @@
+from collections.abc import Generator, Iterable
+from contextvars import copy_context
+from queue import Empty, Full, Queue
+from threading import Event, Thread
+from typing import TypeVar
+
+T = TypeVar("T")
+
+_DONE = object()
+_POLL_INTERVAL = 0.1
+
+
+def background_iterator(iterable: Iterable[T], maxsize: int = 1) -> Generator[T, None, None]:
+    """Consume an iterable in a background thread, buffering up to `maxsize` items ahead of the consumer.
+
+    The background thread is started immediately, so several of these may be created up-front and will all make
+    progress concurrently. The thread runs in a copy of the current context, so sees the same context variables (e.g.
+    the current cluster). Exceptions raised whilst iterating are re-raised to the consumer. Closing the returned
+    generator (or exhausting it) stops the background thread at its next opportunity.
+
+    Usage:
+
+        for page in background_iterator(fetch_pages(), maxsize=2):
+            ...
+    """
+    items: Queue = Queue(maxsize=max(maxsize, 1))
+    stopped = Event()
+
+    def _put(item: tuple) -> bool:
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=_POLL_INTERVAL)
+                return True
+            except Full:
+                continue
+        return False
+
+    def _produce() -> None:
+        try:
+            for item in iterable:
+                if not _put((item, None)):
+                    return
+        except Exception as exc:  # pylint: disable=broad-except
+            _put((_DONE, exc))
+            return
+        _put((_DONE, None))
+
+    thread = Thread(target=copy_context().run, args=(_produce,), daemon=True)
+    thread.start()
+
+    def _consume() -> Generator[T, None, None]:
+        try:
+            while True:
+                try:
+                    item, exc = items.get(timeout=_POLL_INTERVAL)
+                except Empty:
+                    if not thread.is_alive() and items.empty():
+                        return
+                    continue
+                if item is _DONE:
+                    if exc is not None:
+                        raise exc
+                    return
+                yield item
+        finally:
+            stopped.set()
+
+    return _consume()
@@ -0,0 +1,15 @@
+import os
+from pathlib import Path
+
+
+def get_cache_dir() -> Path | None:
+    """Directory for persistent caches, following the XDG base directory specification.
+
+    Returns None if the directory cannot be created, in which case callers should carry on without caching.
+    """
+    path = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "elastic-log-cli"
+    try:
+        path.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return None
+    return path
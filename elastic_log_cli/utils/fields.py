@@ -0,0 +1,26 @@
+from typing import Any
+
+
+def get_field(document: dict, field: str) -> Any:
+    """Look up a field by its key, or else by its dotted path, so `host.name` selects `{"host": {"name": ...}}`.
+
+    Returns `None` if the field is missing.
+    """
+    if field in document:
+        return document[field]
+    value: Any = document
+    for part in field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def without_field(document: dict, field: str) -> dict:
+    """Copy of a document without a field, given by its key or dotted path. Only objects along the path are copied."""
+    if field in document:
+        return {key: value for key, value in document.items() if key != field}
+    head, _, rest = field.partition(".")
+    if not rest or not isinstance(document.get(head), dict):
+        return document
+    return {**document, head: without_field(document[head], rest)}
@@ -0,0 +1,62 @@
+class AdaptivePageSize:
+    """Page size which adapts to the observed cost of each page of results.
+
+    After each page, the time taken and bytes received per hit are estimated (smoothed over recent pages), and the
+    size is set to the number of hits expected to take `target_latency` seconds, or to produce `max_bytes` bytes,
+    whichever is fewer. Each change is limited to a multiple of `factor`, and the size is kept between `minimum`
+    and `maximum`. Timed out requests divide the size by `factor`.
+
+    Usage:
+
+        page_size = AdaptivePageSize(initial=1000)
+        while True:
+            started = monotonic()
+            hits, content = search(size=page_size.size)
+            page_size.observe(hits=len(hits), latency=monotonic() - started, content_bytes=len(content))
+    """
+
+    def __init__(
+        self,
+        initial: int = 1000,
+        minimum: int = 100,
+        maximum: int = 10000,
+        target_latency: float = 2.0,
+        max_bytes: int = 20 * 1024 * 1024,
+        factor: float = 2.0,
+        smoothing: float = 0.5,
+    ) -> None:
+        if minimum > maximum:
+            raise ValueError("Minimum page size cannot exceed the maximum")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+        self.factor = factor
+        self.smoothing = smoothing
+        self.size = self._clamp(initial)
+        self._latency_per_hit: float | None = None
+        self._bytes_per_hit: float | None = None
+
+    def observe(self, hits: int, latency: float, content_bytes: int) -> None:
+        """Record the cost of a page, and update the size for the next page."""
+        if not hits:
+            return
+        self._latency_per_hit = self._smooth(self._latency_per_hit, latency / hits)
+        self._bytes_per_hit = self._smooth(self._bytes_per_hit, content_bytes / hits)
+        ideal = min(
+            self.target_latency / self._latency_per_hit if self._latency_per_hit else self.maximum,
+            self.max_bytes / self._bytes_per_hit if self._bytes_per_hit else self.maximum,
+        )
+        self.size = self._clamp(min(max(ideal, self.size / self.factor), self.size * self.factor))
+
+    def timed_out(self) -> None:
+        """Record that a request timed out, reducing the size for the next attempt."""
+        self.size = self._clamp(self.size / self.factor)
+
+    def _smooth(self, previous: float | None, observed: float) -> float:
+        if previous is None:
+            return observed
+        return self.smoothing * observed + (1 - self.smoothing) * previous
+
+    def _clamp(self, size: float) -> int:
+        return max(self.minimum, min(self.maximum, int(size)))
@@ -0,0 +1,32 @@
+class PollingInterval:
+    """Adaptive interval between polls for new results, e.g. when following logs.
+
+    Whilst polls return full pages there is a backlog, so the next poll is made immediately. Partial pages mean
+    results are flowing but have caught up, so polls are made every `minimum` seconds. Each poll which returns
+    nothing multiplies the interval by `factor`, up to `maximum` seconds, until results arrive again.
+
+    Usage:
+
+        polling = PollingInterval(minimum=0.5, maximum=10.0)
+        while True:
+            results = poll()
+            ...
+            sleep(polling.next(received=len(results), capacity=page_size))
+    """
+
+    def __init__(self, minimum: float = 0.5, maximum: float = 10.0, factor: float = 2.0) -> None:
+        if minimum > maximum:
+            raise ValueError("Minimum polling interval cannot exceed the maximum")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self._idle_interval = minimum
+
+    def next(self, received: int, capacity: int) -> float:
+        """The interval to wait before the next poll, given how many results the last poll received."""
+        if received:
+            self._idle_interval = self.minimum
+            return 0.0 if received >= capacity else self.minimum
+        interval = self._idle_interval
+        self._idle_interval = min(self._idle_interval * self.factor, self.maximum)
+        return interval
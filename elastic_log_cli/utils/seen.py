@@ -0,0 +1,45 @@
+from array import array
+
+
+class SeenSet:
+    """Bounded set of recently seen hits, for de-duplicating polls which overlap, e.g. when following logs.
+
+    Hits are identified by a 64-bit hash of their `_index` and `_id`, so each entry takes a fixed amount of memory
+    however large the IDs. Hashes are kept in a ring buffer of `capacity` entries, which records their order, and a
+    set of the same hashes for lookups. Once the buffer is full the oldest hashes are forgotten. Duplicates are only
+    detected within the last `capacity` hits, so it should comfortably exceed the number of hits which can be re-read
+    at once.
+
+    Most of the memory is taken by the set, for around 85 bytes per entry in total, or roughly 8.5 MB at the default
+    capacity.
+
+    Usage:
+
+        seen = SeenSet(capacity=100_000)
+        new_hits = [hit for hit in hits if seen.add(hit)]
+    """
+
+    def __init__(self, capacity: int = 100_000) -> None:
+        if capacity < 1:
+            raise ValueError("Capacity must be positive")
+        self.capacity = capacity
+        self._ring = array("q")
+        self._position = 0
+        self._hashes: set[int] = set()
+
+    def add(self, hit: dict) -> bool:
+        """Record a hit as seen, returning whether it was not seen before."""
+        key = hash((hit["_index"], hit["_id"]))
+        if key in self._hashes:
+            return False
+        if len(self._ring) < self.capacity:
+            self._ring.append(key)
+        else:
+            self._hashes.discard(self._ring[self._position])
+            self._ring[self._position] = key
+            self._position = (self._position + 1) % self.capacity
+        self._hashes.add(key)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._hashes)
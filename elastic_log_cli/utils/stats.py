@@ -0,0 +1,103 @@
+import random
+from collections.abc import Callable
+from functools import cache
+from threading import Lock
+from time import monotonic
+
+
+class Stats:
+    """Counters and timings of a scan, for diagnosing where time goes.
+
+    Requests are recorded by the search functions, and are safe to record from background threads. Other timings are
+    accumulated by name, e.g. `decode` (JSON decoding of responses), `output` (serialising and writing documents) and
+    `backoff` (sleeping after errors).
+
+    Latency percentiles are estimated from a uniform sample of at most `max_latency_samples` requests (reservoir
+    sampling), so memory use is bounded however long a scan runs.
+
+    Usage:
+
+        stats = get_stats()
+        started = monotonic()
+        response = ...
+        stats.record_request(latency=monotonic() - started, content_bytes=len(response.content))
+        ...
+        print(format_summary(stats.summary()))
+    """
+
+    def __init__(self, clock: Callable[[], float] = monotonic, max_latency_samples: int = 10_000) -> None:
+        self.clock = clock
+        self.started = clock()
+        self.max_latency_samples = max_latency_samples
+        self.requests = 0
+        self.latencies: list[float] = []
+        self.content_bytes = 0
+        self.documents = 0
+        self.timings: dict[str, float] = {}
+        self._lock = Lock()
+        self._random = random.Random()
+
+    def record_request(self, latency: float, content_bytes: int) -> None:
+        with self._lock:
+            self.requests += 1
+            if len(self.latencies) < self.max_latency_samples:
+                self.latencies.append(latency)
+            else:
+                # Replace a sample with the probability that keeps the sample uniform over all requests
+                index = self._random.randrange(self.requests)
+                if index < self.max_latency_samples:
+                    self.latencies[index] = latency
+            self.content_bytes += content_bytes
+
+    def record_documents(self, count: int) -> None:
+        with self._lock:
+            self.documents += count
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def summary(self) -> dict:
+        """Summarise the scan so far, as a JSON-serialisable dictionary."""
+        with self._lock:
+            elapsed = self.clock() - self.started
+            latencies = sorted(self.latencies)
+            return {
+                "elapsed_seconds": elapsed,
+                "documents": self.documents,
+                "documents_per_second": self.documents / elapsed if elapsed else 0.0,
+                "requests": self.requests,
+                "response_bytes": self.content_bytes,
+                "response_megabytes_per_second": self.content_bytes / 1e6 / elapsed if elapsed else 0.0,
+                "request_latency_p50_seconds": _percentile(latencies, 50),
+                "request_latency_p95_seconds": _percentile(latencies, 95),
+                **{f"{name}_seconds": seconds for name, seconds in sorted(self.timings.items())},
+            }
+
+
+def format_summary(summary: dict) -> str:
+    """Format a summary (see `Stats.summary`) for humans."""
+    lines = [
+        f"{summary['documents']} logs in {summary['elapsed_seconds']:.2f}s "
+        f"({summary['documents_per_second']:.1f} logs/s, {summary['response_megabytes_per_second']:.2f} MB/s)",
+        f"{summary['requests']} requests, latency p50 {summary['request_latency_p50_seconds']:.3f}s "
+        f"p95 {summary['request_latency_p95_seconds']:.3f}s",
+    ]
+    for key, value in summary.items():
+        if key.endswith("_seconds") and not key.startswith(("elapsed", "request_latency")):
+            lines.append(f"{key.removesuffix('_seconds')}: {value:.2f}s")
+    return "\n".join(lines)
+
+
+@cache
+def get_stats() -> Stats:
+    """Statistics for the current process."""
+    return Stats()
+
+
+def _percentile(ordered: list[float], percentile: int) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * percentile // 100))
+    return ordered[rank - 1]
@@ -6,11 +6,12 @@ from tasks.docs import namespace as docs
 from tasks.lint import lint
 from tasks.release import build, release
 from tasks.run import run
-from tasks.test import coverage, test
+from tasks.test import benchmark, coverage, test
 from tasks.typecheck import typecheck
 from tasks.verify import verify
 
 namespace = Collection(
+    benchmark,
     build,
     changelog_check,
     coverage,
@@ -12,6 +12,6 @@ def lint(ctx):
     """
     print_header("RUNNING LINTER")
 
-    ctx.run(f"pyflakes {package.__name__} tasks tests", pty=True)
+    ctx.run(f"pyflakes {package.__name__} tasks tests benchmarks", pty=True)
     # pyflakes doesn't give positive output
     cprint("✔ No issues found.", "green")
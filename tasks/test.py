@@ -31,6 +31,25 @@ def test(ctx, debug=False, maxfail=0):
     print(f"\nCoverage: {get_total_coverage(ctx)}")
 
 
+@task(optional=["corpus_size", "compare"])
+def benchmark(ctx, corpus_size=20_000, compare=""):
+    """Run benchmarks against a local fake Elasticsearch.
+
+    Results are saved under `.benchmarks`. Pass `--compare` with a previous run's ID (e.g. 0001) to compare against it.
+    """
+    print_header("RUNNING BENCHMARKS")
+    flags = [
+        '-o python_files="bench_*.py"',
+        '-o python_functions="bench_*"',
+        f"--corpus-size={int(corpus_size)}",
+        "--benchmark-autosave",
+    ]
+    if compare:
+        flags.append(f"--benchmark-compare={compare}")
+
+    ctx.run(f"pytest {' '.join(flags)} benchmarks/", pty=True)
+
+
 @task
 def coverage(ctx):
     """Open browsable coverage report."""
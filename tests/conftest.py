@@ -0,0 +1,60 @@
+import json
+from collections.abc import Iterator
+
+import pytest
+
+from elastic_log_cli import search
+from elastic_log_cli.config import current_cluster, get_cluster_settings
+from elastic_log_cli.utils.stats import get_stats
+from tests.fake_elasticsearch import FakeElasticsearch, FakeElasticsearchAdapter
+
+FAKE_ELASTICSEARCH_URL = "http://elasticsearch:9200"
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(monkeypatch, tmp_path):
+    """Keep persistent caches out of the user's home directory."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    return tmp_path / "cache" / "elastic-log-cli"
+
+
+@pytest.fixture(autouse=True)
+def stats():
+    """Start each test with fresh statistics."""
+    get_stats.cache_clear()
+    yield get_stats()
+    get_stats.cache_clear()
+
+
+@pytest.fixture
+def elasticsearch(monkeypatch) -> FakeElasticsearch:
+    """Serve requests from the library against an in-memory fake Elasticsearch."""
+    fake = FakeElasticsearch()
+    session = search.SingleOriginSession(base_url=FAKE_ELASTICSEARCH_URL)
+    session.mount(FAKE_ELASTICSEARCH_URL, FakeElasticsearchAdapter(fake))
+    monkeypatch.setattr(search, "get_client", lambda: session)
+    return fake
+
+
+@pytest.fixture
+def clusters(monkeypatch) -> Iterator[dict[str, FakeElasticsearch]]:
+    """Serve requests from the library against a separate fake Elasticsearch for each of the named clusters."""
+    fakes = {name: FakeElasticsearch() for name in ("eu", "us")}
+    sessions: dict[str, search.SingleOriginSession] = {}
+    for name, fake in fakes.items():
+        url = f"http://{name}.elasticsearch:9200"
+        sessions[name] = search.SingleOriginSession(base_url=url)
+        sessions[name].mount(url, FakeElasticsearchAdapter(fake))
+        monkeypatch.setenv(f"{name.upper()}_ELASTICSEARCH_URL", url)
+
+    def get_client() -> search.SingleOriginSession:
+        cluster = current_cluster.get()
+        assert cluster is not None, "Requests must be made within use_cluster"
+        return sessions[cluster]
+
+    monkeypatch.setattr(search, "get_client", get_client)
+    monkeypatch.setenv("ELASTICSEARCH_URL", FAKE_ELASTICSEARCH_URL)
+    monkeypatch.setenv("ELASTICSEARCH_CLUSTERS", json.dumps(list(fakes)))
+    get_cluster_settings.cache_clear()
+    yield fakes
+    get_cluster_settings.cache_clear()
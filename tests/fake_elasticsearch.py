@@ -0,0 +1,340 @@
+"""In-memory stand-in for the subset of the Elasticsearch API used by this library.
+
+Supports `_search` with `search_after`, point-in-time and slicing, and a small subset of the query DSL and
+aggregations. Mappings are not inferred, but can be set for `_mapping` requests. Requests are served via a `requests`
+transport adapter, so the real client code paths (including compression) are exercised.
+"""
+import bisect
+import gzip
+import io
+import json
+import re
+import uuid
+from datetime import datetime, timezone
+from fnmatch import fnmatch, fnmatchcase
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+from requests import PreparedRequest, Response
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPResponse
+
+
+class FakeElasticsearch:
+    def __init__(self, timestamp_field: str = "@timestamp") -> None:
+        self.timestamp_field = timestamp_field
+        self.documents: list[dict] = []
+        self.mappings: dict[str, dict] = {}
+        self.pits: dict[str, list[dict]] = {}
+        self.requests: list[tuple[str, str, dict, Any]] = []
+        self.request_headers: list[dict[str, str]] = []
+        # Responses to return instead of handling the next requests, e.g. to simulate errors
+        self.responses: list[tuple[int, Any]] = []
+        self._sorted_hits: dict[str, tuple[list[dict], list[list]]] = {}
+
+    def index(self, documents: list[dict], index: str = "logs") -> None:
+        """Add documents to an index, assigning IDs and sequence numbers."""
+        for source in documents:
+            seq_no = len(self.documents)
+            self.documents.append({"_index": index, "_id": str(seq_no), "_seq_no": seq_no, "_source": source})
+
+    def handle(self, method: str, path: str, params: dict, body: Any) -> tuple[int, Any]:
+        self.requests.append((method, path, params, body))
+        status, payload = self.responses.pop(0) if self.responses else self._handle(method, path, body)
+        if "filter_path" in params and status == 200:
+            payload = _filter_path(payload, [path.split(".") for path in params["filter_path"].split(",")])
+        return status, payload
+
+    def _handle(self, method: str, path: str, body: Any) -> tuple[int, Any]:
+        parts = [part for part in path.split("/") if part]
+        if parts[-1] == "_search":
+            return self._search(parts[0] if len(parts) > 1 else None, body or {})
+        if parts[-1] == "_count":
+            query = (body or {}).get("query", {"match_all": {}})
+            documents = [doc for doc in self.documents if fnmatch(doc["_index"], parts[0])]
+            return 200, {"count": sum(_matches(query, doc["_source"]) for doc in documents)}
+        if parts[-1] == "_mapping":
+            return 200, {
+                index: {"mappings": mappings} for index, mappings in self.mappings.items() if fnmatch(index, parts[0])
+            }
+        if parts[-1] == "_pit" and method == "DELETE":
+            if self.pits.pop(body["id"], None) is None:
+                return 404, {"error": "pit not found"}
+            return 200, {"succeeded": True}
+        if parts[-1] == "_pit" and method == "POST":
+            pit_id = str(uuid.uuid4())
+            self.pits[pit_id] = [doc for doc in self.documents if fnmatch(doc["_index"], parts[0])]
+            return 200, {"id": pit_id}
+        return 404, {"error": f"No handler for {method} {path}"}
+
+    def _search(self, index: str | None, body: dict) -> tuple[int, dict]:
+        pit = body.get("pit")
+        if pit:
+            if index is not None:
+                return 400, {"error": "cannot specify index with point-in-time"}
+            if pit["id"] not in self.pits:
+                return 404, {"error": "pit not found"}
+            documents = self.pits[pit["id"]]
+        else:
+            documents = [doc for doc in self.documents if fnmatch(doc["_index"], index or "*")]
+        key = json.dumps(
+            [pit["id"] if pit else index, len(self.documents), body.get("query"), body.get("slice"), body.get("sort")]
+        )
+        if key not in self._sorted_hits:
+            self._sorted_hits[key] = self._sort_hits(documents, body)
+        matching, sort_values = self._sorted_hits[key]
+        offset = bisect.bisect_right(sort_values, body["search_after"]) if body.get("search_after") else 0
+        hits = matching[offset : offset + body.get("size", 10)]
+        response: dict = {
+            "took": 1,
+            "timed_out": False,
+            "hits": {"hits": [_hit(hit, body) for hit in hits]},
+        }
+        if pit:
+            response["pit_id"] = pit["id"]
+        if "aggs" in body:
+            response["aggregations"] = {
+                name: self._aggregate(aggregation, matching) for name, aggregation in body["aggs"].items()
+            }
+        return 200, response
+
+    def _sort_hits(self, documents: list[dict], body: dict) -> tuple[list[dict], list[list]]:
+        """Matching hits in sort order, with their sort values. These are cached between pages of a scan."""
+        documents = [doc for doc in documents if _matches(body.get("query", {"match_all": {}}), doc["_source"])]
+        if "slice" in body:
+            slice_id, slice_max = body["slice"]["id"], body["slice"]["max"]
+            documents = [doc for doc in documents if doc["_seq_no"] % slice_max == slice_id]
+        hits = sorted(
+            ({**doc, "sort": self._sort_values(body.get("sort", ["_seq_no"]), doc)} for doc in documents),
+            key=lambda hit: hit["sort"],
+        )
+        return hits, [hit["sort"] for hit in hits]
+
+    def _aggregate(self, aggregation: dict, documents: list[dict]) -> dict:
+        (aggregation_type, options), *_ = aggregation.items()
+        if aggregation_type not in ("auto_date_histogram", "date_histogram"):
+            raise NotImplementedError(f"Unsupported aggregation type {aggregation_type!r}")
+        timestamps = [_coerce(_get_field(doc["_source"], options["field"])) for doc in documents]
+        if not timestamps:
+            return {"buckets": []}
+        if aggregation_type == "date_histogram":
+            return self._date_histogram(options, timestamps)
+        start = min(timestamps)
+        interval = max((max(timestamps) - start) // options["buckets"] + 1, 1)
+        counts: dict[int, int] = {}
+        for timestamp in timestamps:
+            key = start + (timestamp - start) // interval * interval
+            counts[key] = counts.get(key, 0) + 1
+        return {"buckets": [{"key": key, "doc_count": count} for key, count in sorted(counts.items())]}
+
+    def _date_histogram(self, options: dict, timestamps: list[int]) -> dict:
+        """Fixed intervals only, including calendar intervals of up to a day."""
+        interval_string = options.get("fixed_interval") or options["calendar_interval"]
+        units = {"s": 1000, "m": 60 * 1000, "h": 60 * 60 * 1000, "d": 24 * 60 * 60 * 1000}
+        interval = int(interval_string[:-1]) * units[interval_string[-1]]
+        counts = {key: 0 for key in range(min(timestamps) // interval, max(timestamps) // interval + 1)}
+        for timestamp in timestamps:
+            counts[timestamp // interval] += 1
+        return {
+            "buckets": [
+                {
+                    "key": key * interval,
+                    "key_as_string": datetime.fromtimestamp(key * interval / 1000, timezone.utc)
+                    .isoformat(timespec="milliseconds")
+                    .replace("+00:00", "Z"),
+                    "doc_count": count,
+                }
+                for key, count in counts.items()
+            ]
+        }
+
+    def _sort_values(self, sort: list | dict | str, doc: dict) -> list:
+        values = []
+        for entry in sort if isinstance(sort, list) else [sort]:
+            field, options = (entry, {}) if isinstance(entry, str) else next(iter(entry.items()))
+            if options.get("order", "asc") != "asc":
+                raise NotImplementedError("Only ascending sorts are supported")
+            if field in ("_seq_no", "_shard_doc"):
+                values.append(doc["_seq_no"])
+            else:
+                values.append(_coerce(_get_field(doc["_source"], field)))
+        return values
+
+
+class FakeElasticsearchAdapter(HTTPAdapter):
+    def __init__(self, elasticsearch: FakeElasticsearch) -> None:
+        self.elasticsearch = elasticsearch
+        super().__init__()
+
+    def send(self, request: PreparedRequest, *args, **kwargs) -> Response:
+        assert request.url and request.method
+        url = urlparse(request.url)
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        headers = {key.lower(): value for key, value in request.headers.items()}
+        self.elasticsearch.request_headers.append(headers)
+        content = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+        if content and headers.get("content-encoding") == "gzip":
+            content = gzip.decompress(content)
+        body = json.loads(content) if content else None
+        status, payload = self.elasticsearch.handle(request.method, url.path, params, body)
+        response_headers = {"content-type": "application/json"}
+        response_content = json.dumps(payload).encode("utf-8")
+        if "gzip" in headers.get("accept-encoding", ""):
+            response_headers["content-encoding"] = "gzip"
+            response_content = gzip.compress(response_content)
+        raw = HTTPResponse(
+            body=io.BytesIO(response_content),
+            headers=response_headers,
+            status=status,
+            preload_content=False,
+        )
+        return self.build_response(request, raw)
+
+
+def _hit(doc: dict, body: dict) -> dict:
+    hit = {
+        "_index": doc["_index"],
+        "_id": doc["_id"],
+        "_score": None,
+        "_source": doc["_source"],
+        "sort": doc["sort"],
+    }
+    source = body.get("_source", True)
+    if source is False:
+        del hit["_source"]
+    elif isinstance(source, list):
+        hit["_source"] = {key: value for key, value in doc["_source"].items() if _includes(key, source)}
+    elif isinstance(source, dict):
+        hit["_source"] = {
+            key: value
+            for key, value in doc["_source"].items()
+            if _includes(key, source.get("includes") or ["*"])
+            and not any(fnmatch(key, pattern) for pattern in source.get("excludes", []))
+        }
+    fields = {
+        field: [value]
+        for pattern in body.get("fields", []) + body.get("docvalue_fields", [])
+        for field, value in _flatten(doc["_source"]).items()
+        if fnmatch(field, pattern)
+    }
+    if fields:
+        hit["fields"] = fields
+    return hit
+
+
+def _includes(key: str, patterns: list[str]) -> bool:
+    """Whether a top-level source field is selected by any of the patterns, including objects selected by path."""
+    return any(fnmatch(key, pattern) or pattern.startswith(f"{key}.") for pattern in patterns)
+
+
+def _flatten(source: dict, prefix: str = "") -> dict:
+    """Leaf values of a document, keyed by their dotted path."""
+    flattened = {}
+    for key, value in source.items():
+        if isinstance(value, dict):
+            flattened.update(_flatten(value, f"{prefix}{key}."))
+        else:
+            flattened[f"{prefix}{key}"] = value
+    return flattened
+
+
+def _filter_path(payload: Any, paths: list[list[str]]) -> Any:
+    """Apply `filter_path` to a response, with `*` wildcards. Arrays are filtered element-wise, and empty objects are
+    removed.
+    """
+    if not isinstance(payload, dict):
+        if isinstance(payload, list):
+            return [_filter_path(item, paths) for item in payload]
+        return payload
+    filtered = {}
+    for key, value in payload.items():
+        matching = [path[1:] for path in paths if fnmatch(key, path[0])]
+        if any(not path for path in matching):
+            filtered[key] = value
+        elif matching:
+            value = _filter_path(value, matching)
+            if value or value == 0:
+                filtered[key] = value
+    return filtered
+
+
+def _matches(query: dict, source: dict) -> bool:
+    (query_type, clause), *_ = query.items()
+    if query_type == "match_all":
+        return True
+    if query_type == "match_none":
+        return False
+    if query_type == "bool":
+        required = clause.get("filter", []) + clause.get("must", [])
+        should = clause.get("should", [])
+        minimum_should_match = clause.get("minimum_should_match", 0 if required else 1)
+        return (
+            all(_matches(subquery, source) for subquery in required)
+            and not any(_matches(subquery, source) for subquery in clause.get("must_not", []))
+            and (not should or sum(_matches(subquery, source) for subquery in should) >= minimum_should_match)
+        )
+    if query_type == "exists":
+        return _get_field(source, clause["field"]) is not None
+    if query_type == "multi_match":
+        return any(
+            str(actual) == str(clause["query"])
+            for field, actual in _flatten(source).items()
+            if any(fnmatch(field, pattern) for pattern in clause["fields"])
+        )
+    if query_type == "query_string":
+        # Analysis is approximated by also matching the lowercased pattern against each lowercased word of the value
+        pattern = re.sub(r"\\(.)", lambda match: f"[{match.group(1)}]", clause["query"])
+        return any(
+            isinstance(actual, str)
+            and (
+                fnmatchcase(actual, pattern)
+                or any(fnmatchcase(word, pattern.lower()) for word in actual.lower().split())
+            )
+            for field, actual in _flatten(source).items()
+            if any(fnmatch(field, field_pattern) for field_pattern in clause["fields"])
+        )
+    field, value = next(iter(clause.items()))
+    actual = _get_field(source, field)
+    if query_type == "prefix":
+        return isinstance(actual, str) and actual.startswith(value)
+    if query_type == "wildcard":
+        return isinstance(actual, str) and fnmatch(actual, value)
+    if query_type in ("match", "term"):
+        return actual is not None and str(actual) == str(value)
+    if query_type == "terms":
+        return actual is not None and str(actual) in [str(item) for item in value]
+    if query_type == "range":
+        if actual is None:
+            return False
+        actual = _coerce(actual)
+        comparisons = {
+            "gte": lambda bound: actual >= bound,
+            "gt": lambda bound: actual > bound,
+            "lte": lambda bound: actual <= bound,
+            "lt": lambda bound: actual < bound,
+        }
+        return all(
+            comparisons[operator](_coerce(bound)) for operator, bound in value.items() if operator in comparisons
+        )
+    raise NotImplementedError(f"Unsupported query type {query_type!r}")
+
+
+def _get_field(source: dict, field: str) -> Any:
+    if field in source:
+        return source[field]
+    value: Any = source
+    for part in field.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _coerce(value: Any) -> Any:
+    """Dates are compared and sorted as epoch milliseconds, as in Elasticsearch."""
+    if isinstance(value, str):
+        try:
+            return int(datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() * 1000)
+        except ValueError:
+            return value
+    return value
@@ -0,0 +1,62 @@
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from elastic_log_cli.kql import parse, parser
+from elastic_log_cli.kql.cache import CompilationCache
+
+
+class TestCompilationCache:
+    @staticmethod
+    def should_return_stored_queries(tmp_path):
+        cache = CompilationCache(tmp_path / "cache.sqlite")
+        assert cache.get("foo:bar") is None
+        cache.set("foo:bar", {"match": {"foo": "bar"}})
+        assert cache.get("foo:bar") == {"match": {"foo": "bar"}}
+
+    @staticmethod
+    def should_evict_least_recently_used_queries(tmp_path):
+        cache = CompilationCache(tmp_path / "cache.sqlite", max_entries=2)
+        cache.set("a", {"exists": {"field": "a"}})
+        cache.set("b", {"exists": {"field": "b"}})
+        cache.get("a")
+        cache.set("c", {"exists": {"field": "c"}})
+        assert cache.get("a") is not None
+        assert cache.get("b") is None
+        assert cache.get("c") is not None
+
+    @staticmethod
+    def should_only_refresh_recency_of_older_queries(tmp_path):
+        path = tmp_path / "cache.sqlite"
+        cache = CompilationCache(path, max_entries=4)
+        for name in "abc":
+            cache.set(name, {"exists": {"field": name}})
+        cache.get("c")
+        cache.get("b")
+        cache.get("a")
+        with closing(sqlite3.connect(path)) as connection:
+            last_used = dict(connection.execute("SELECT query, last_used FROM compiled_queries"))
+        assert last_used == {"a": 4, "b": 2, "c": 3}
+
+    @staticmethod
+    def should_ignore_unreadable_database(tmp_path):
+        path = tmp_path / "cache.sqlite"
+        path.write_bytes(b"not a database")
+        cache = CompilationCache(path)
+        cache.set("foo:bar", {"match": {"foo": "bar"}})
+        assert cache.get("foo:bar") is None
+
+
+class TestCachedParse:
+    @staticmethod
+    def should_not_reparse_cached_queries(monkeypatch):
+        assert parse("foo:bar") == {"match": {"foo": "bar"}}
+
+        def _fail(string: str) -> dict:
+            raise AssertionError("Query should not be reparsed")
+
+        monkeypatch.setattr(parser, "parse", _fail)
+        assert parse("foo:bar") == {"match": {"foo": "bar"}}
+        with pytest.raises(AssertionError):
+            parse("foo:bar", cache=False)
@@ -0,0 +1,191 @@
+import pytest
+
+from elastic_log_cli.kql import fields, parse
+from elastic_log_cli.kql.fields import apply_field_types
+from elastic_log_cli.kql.parser import parse as parse_raw
+
+FIELD_TYPES = {
+    "level": "keyword",
+    "status": "integer",
+    "@timestamp": "date",
+    "message": "text",
+    "message.keyword": "keyword",
+    "items": "nested",
+    "items.name": "keyword",
+    "items.parts": "nested",
+    "items.parts.name": "text",
+}
+
+
+class TestApplyFieldTypes:
+    @staticmethod
+    @pytest.mark.parametrize(
+        "query,expected",
+        [
+            ("level:INFO", {"term": {"level": "INFO"}}),
+            ("status:404", {"term": {"status": "404"}}),
+            ("message.keyword:Started", {"term": {"message.keyword": "Started"}}),
+            ("@timestamp:2022-03-05", {"range": {"@timestamp": {"gte": "2022-03-05", "lte": "2022-03-05"}}}),
+            ('message:"timed out"', {"match_phrase": {"message": "timed out"}}),
+            ("message:timed out", {"match": {"message": "timed out"}}),
+            ("unknown:value", {"match": {"unknown": "value"}}),
+            ("status >= 500", {"range": {"status": {"gte": "500"}}}),
+            (
+                "items.name:banana",
+                {"nested": {"path": "items", "query": {"term": {"items.name": "banana"}}, "score_mode": "none"}},
+            ),
+            (
+                "items:{ name:banana }",
+                {"nested": {"path": "items", "query": {"term": {"items.name": "banana"}}, "score_mode": "none"}},
+            ),
+            (
+                "items:{ parts.name:bolt }",
+                {
+                    "nested": {
+                        "path": "items",
+                        "query": {
+                            "nested": {
+                                "path": "items.parts",
+                                "query": {"match": {"items.parts.name": "bolt"}},
+                                "score_mode": "none",
+                            }
+                        },
+                        "score_mode": "none",
+                    }
+                },
+            ),
+        ],
+    )
+    def should_query_each_field_according_to_its_type(query: str, expected: dict) -> None:
+        assert apply_field_types(parse_raw(query), FIELD_TYPES) == expected
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "query,expected",
+        [
+            ("level:IN*", {"prefix": {"level": "IN"}}),
+            ("level:I*O", {"wildcard": {"level": "I*O"}}),
+            ("message:Error*", {"query_string": {"query": "Error*", "fields": ["message"], "analyze_wildcard": True}}),
+            ("unknown:val*", {"query_string": {"query": "val*", "fields": ["unknown"], "analyze_wildcard": True}}),
+            (
+                "items.name:ban*",
+                {"nested": {"path": "items", "query": {"prefix": {"items.name": "ban"}}, "score_mode": "none"}},
+            ),
+            (
+                "message.*:Started",
+                {"multi_match": {"query": "Started", "fields": ["message.keyword"], "lenient": True}},
+            ),
+            (
+                "*:banana",
+                {
+                    "bool": {
+                        "should": [
+                            {
+                                "multi_match": {
+                                    "query": "banana",
+                                    "fields": ["level", "status", "@timestamp", "message", "message.keyword"],
+                                    "lenient": True,
+                                }
+                            },
+                            {
+                                "nested": {
+                                    "path": "items",
+                                    "query": {
+                                        "multi_match": {"query": "banana", "fields": ["items.name"], "lenient": True}
+                                    },
+                                    "score_mode": "none",
+                                }
+                            },
+                            {
+                                "nested": {
+                                    "path": "items",
+                                    "query": {
+                                        "nested": {
+                                            "path": "items.parts",
+                                            "query": {
+                                                "multi_match": {
+                                                    "query": "banana",
+                                                    "fields": ["items.parts.name"],
+                                                    "lenient": True,
+                                                }
+                                            },
+                                            "score_mode": "none",
+                                        }
+                                    },
+                                    "score_mode": "none",
+                                }
+                            },
+                        ],
+                        "minimum_should_match": 1,
+                    }
+                },
+            ),
+            (
+                "message*:time*",
+                {
+                    "bool": {
+                        "should": [
+                            {"query_string": {"query": "time*", "fields": ["message"], "analyze_wildcard": True}},
+                            {"prefix": {"message.keyword": "time"}},
+                        ],
+                        "minimum_should_match": 1,
+                    }
+                },
+            ),
+            ("s*:4*", {"match_none": {}}),
+            (
+                "items.*:*",
+                {
+                    "bool": {
+                        "should": [
+                            {
+                                "nested": {
+                                    "path": "items",
+                                    "query": {"exists": {"field": "items.name"}},
+                                    "score_mode": "none",
+                                }
+                            },
+                            {
+                                "nested": {
+                                    "path": "items",
+                                    "query": {
+                                        "nested": {
+                                            "path": "items.parts",
+                                            "query": {"exists": {"field": "items.parts.name"}},
+                                            "score_mode": "none",
+                                        }
+                                    },
+                                    "score_mode": "none",
+                                }
+                            },
+                        ],
+                        "minimum_should_match": 1,
+                    }
+                },
+            ),
+            ("other.*:banana", {"match_none": {}}),
+        ],
+    )
+    def should_expand_field_patterns(query: str, expected: dict) -> None:
+        assert apply_field_types(parse_raw(query), FIELD_TYPES) == expected
+
+    @staticmethod
+    def should_leave_patterns_matching_many_fields_to_elasticsearch(monkeypatch) -> None:
+        monkeypatch.setattr(fields, "MAX_EXPANDED_FIELDS", 2)
+        query = parse_raw("*:banana")
+        assert apply_field_types(query, FIELD_TYPES) == query
+
+    @staticmethod
+    def should_merge_alternative_terms_once_optimised() -> None:
+        assert parse("level:(INFO or WARN) and not message:debug", field_types=FIELD_TYPES) == {
+            "bool": {
+                "filter": [{"terms": {"level": ["INFO", "WARN"]}}],
+                "must_not": [{"match": {"message": "debug"}}],
+            }
+        }
+
+    @staticmethod
+    def should_cache_queries_for_each_set_of_field_types() -> None:
+        assert parse("level:INFO") == {"match": {"level": "INFO"}}
+        assert parse("level:INFO", field_types=FIELD_TYPES) == {"term": {"level": "INFO"}}
+        assert parse("level:INFO", field_types={"level": "text"}) == {"match": {"level": "INFO"}}
@@ -0,0 +1,141 @@
+from itertools import product
+
+import pytest
+
+from elastic_log_cli.kql.optimizer import optimize
+from elastic_log_cli.kql.parser import parse
+from tests.fake_elasticsearch import _matches
+
+# Every combination of values (or absence) of three fields, to check optimised queries match the same documents
+DOCUMENTS = [
+    {field: value for field, value in zip("abc", values) if value is not None}
+    for values in product([None, "x", "y", "z"], repeat=3)
+]
+
+QUERIES = [
+    "a:x",
+    "a:x and b:y",
+    "a:x and (b:y and (c:z and a:*))",
+    "a:x or (b:y or (c:z or a:y))",
+    "a:(x or y or z)",
+    "not (a:x or b:y)",
+    "not (not a:x)",
+    "not (not a:x and b:y)",
+    "not (not (a:x and b:y))",
+    "a:x and not (b:y or (c:z and not a:y))",
+    "(a:x and b:y) or (a:y and not c:z) or c",
+    "not (a:x or b:y) and (c:z or (a:y and b))",
+    "a:(x and not y) or b:(y or z) and not c:(x or z)",
+    "not (not (not (a:x or not b:y)))",
+]
+
+
+def _matching(query: dict) -> list[int]:
+    return [i for i, document in enumerate(DOCUMENTS) if _matches(query, document)]
+
+
+def _term(query: dict) -> dict:
+    """Compile `match` queries to `term` queries, as a field-aware compiler does for keyword fields."""
+    if "match" in query:
+        return {"term": query["match"]}
+    if "bool" in query:
+        return {
+            "bool": {
+                key: [_term(subquery) for subquery in value] if isinstance(value, list) else value
+                for key, value in query["bool"].items()
+            }
+        }
+    return query
+
+
+class TestOptimize:
+    @staticmethod
+    @pytest.mark.parametrize("query", QUERIES)
+    @pytest.mark.parametrize("compile_terms", [False, True])
+    def should_match_same_documents(query: str, compile_terms: bool) -> None:
+        compiled = parse(query)
+        if compile_terms:
+            compiled = _term(compiled)
+        assert _matching(optimize(compiled)) == _matching(compiled)
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "query,expected",
+        [
+            ("a:x", {"match": {"a": "x"}}),
+            (
+                "a:x and (b:y and (c:z and not a:y))",
+                {
+                    "bool": {
+                        "filter": [{"match": {"a": "x"}}, {"match": {"b": "y"}}, {"match": {"c": "z"}}],
+                        "must_not": [{"match": {"a": "y"}}],
+                    }
+                },
+            ),
+            (
+                "a:x or (b:y or c:z)",
+                {"bool": {"should": [{"match": {"a": "x"}}, {"match": {"b": "y"}}, {"match": {"c": "z"}}]}},
+            ),
+            ("not (a:x or b:y)", {"bool": {"must_not": [{"match": {"a": "x"}}, {"match": {"b": "y"}}]}}),
+            ("not (not a:x)", {"match": {"a": "x"}}),
+            (
+                "a:x and (b:y or c:z)",
+                {
+                    "bool": {
+                        "filter": [{"match": {"a": "x"}}],
+                        "should": [{"match": {"b": "y"}}, {"match": {"c": "z"}}],
+                        "minimum_should_match": 1,
+                    }
+                },
+            ),
+        ],
+    )
+    def should_flatten_nested_bool_queries(query: str, expected: dict) -> None:
+        assert optimize(parse(query)) == expected
+
+    @staticmethod
+    def should_merge_alternative_terms_on_same_field() -> None:
+        query = {
+            "bool": {
+                "should": [
+                    {"term": {"a": "x"}},
+                    {"term": {"b": "x"}},
+                    {"bool": {"should": [{"term": {"a": {"value": "y"}}}, {"terms": {"a": ["z", "x"]}}]}},
+                ],
+                "minimum_should_match": 1,
+            }
+        }
+        assert optimize(query) == {"bool": {"should": [{"terms": {"a": ["x", "y", "z"]}}, {"term": {"b": "x"}}]}}
+
+    @staticmethod
+    def should_not_merge_terms_when_several_alternatives_are_required() -> None:
+        query = {"bool": {"should": [{"term": {"a": "x"}}, {"term": {"a": "y"}}], "minimum_should_match": 2}}
+        assert optimize(query) == query
+
+    @staticmethod
+    def should_move_must_clauses_to_filter() -> None:
+        query = {"bool": {"must": [{"term": {"a": "x"}}, {"bool": {"must": [{"term": {"b": "y"}}]}}]}}
+        assert optimize(query) == {"bool": {"filter": [{"term": {"a": "x"}}, {"term": {"b": "y"}}]}}
+
+    @staticmethod
+    def should_optimize_nested_queries() -> None:
+        assert optimize(parse("items:{ name:banana or name:apple or not (not stock:9) }")) == {
+            "nested": {
+                "path": "items",
+                "query": {
+                    "bool": {
+                        "should": [
+                            {"match": {"items.name": "banana"}},
+                            {"match": {"items.name": "apple"}},
+                            {"match": {"items.stock": "9"}},
+                        ]
+                    }
+                },
+                "score_mode": "none",
+            }
+        }
+
+    @staticmethod
+    def should_leave_unsupported_bool_options() -> None:
+        query = {"bool": {"should": [{"term": {"a": "x"}}, {"term": {"a": "y"}}], "boost": 2.0}}
+        assert optimize(query) == query
@@ -1,5 +1,7 @@
 import pytest
 
+from lark.exceptions import UnexpectedInput
+
 from elastic_log_cli.kql.parser import get_parser, parse, transform
 
 
@@ -56,6 +58,65 @@ class TestParseKQL:
             (r"foo:bar \and baz", {"match": {"foo": "bar and baz"}}),
             (r"foo:bar\tbaz", {"match": {"foo": "bar\tbaz"}}),
             (" foo ", {"exists": {"field": "foo"}}),
+            ("  foo : bar  ", {"match": {"foo": "bar"}}),
+            ("foo bar:baz", {"match": {"foo bar": "baz"}}),
+            ("foo:bar or", {"match": {"foo": "bar or"}}),
+            ("foo:bar andy", {"match": {"foo": "bar andy"}}),
+            (r"foo:bar \OR baz", {"match": {"foo": "bar OR baz"}}),
+            (r"foo:\not", {"match": {"foo": "not"}}),
+            (r"foo:bar\\", {"match": {"foo": "bar\\"}}),
+            ("foo:ba*", {"query_string": {"query": "ba*", "fields": ["foo"], "analyze_wildcard": True}}),
+            ("foo:b*r", {"query_string": {"query": "b*r", "fields": ["foo"], "analyze_wildcard": True}}),
+            ("foo:*ar", {"query_string": {"query": "*ar", "fields": ["foo"], "analyze_wildcard": True}}),
+            ("foo:b?r*", {"query_string": {"query": "b\\?r*", "fields": ["foo"], "analyze_wildcard": True}}),
+            ("foo:b?r*z", {"query_string": {"query": "b\\?r*z", "fields": ["foo"], "analyze_wildcard": True}}),
+            (r"foo:ba\*", {"match": {"foo": "ba*"}}),
+            (r"foo:\*", {"match": {"foo": "*"}}),
+            (r"foo:b\*r*", {"query_string": {"query": "b\\*r*", "fields": ["foo"], "analyze_wildcard": True}}),
+            (r"foo:b\*r*z", {"query_string": {"query": "b\\*r*z", "fields": ["foo"], "analyze_wildcard": True}}),
+            ('foo:"ba*"', {"match": {"foo": "ba*"}}),
+            ("*:bar", {"multi_match": {"query": "bar", "fields": ["*"], "lenient": True}}),
+            ("foo.*:bar", {"multi_match": {"query": "bar", "fields": ["foo.*"], "lenient": True}}),
+            (
+                'foo.*:"bar baz"',
+                {"multi_match": {"query": "bar baz", "fields": ["foo.*"], "type": "phrase", "lenient": True}},
+            ),
+            (
+                "foo.*:ba* baz",
+                {
+                    "query_string": {
+                        "query": "ba*\\ baz",
+                        "fields": ["foo.*"],
+                        "analyze_wildcard": True,
+                        "lenient": True,
+                    }
+                },
+            ),
+            ("foo.*:*", {"exists": {"field": "foo.*"}}),
+            (
+                "items:{ name:ba* and *:qux }",
+                {
+                    "nested": {
+                        "path": "items",
+                        "query": {
+                            "bool": {
+                                "filter": [
+                                    {
+                                        "query_string": {
+                                            "query": "ba*",
+                                            "fields": ["items.name"],
+                                            "analyze_wildcard": True,
+                                        }
+                                    },
+                                    {"multi_match": {"query": "qux", "fields": ["items.*"], "lenient": True}},
+                                ]
+                            }
+                        },
+                        "score_mode": "none",
+                    }
+                },
+            ),
+            ("not nothing", {"bool": {"must_not": [{"exists": {"field": "nothing"}}]}}),
             ("foo:bar and qux:mux", {"bool": {"filter": [{"match": {"foo": "bar"}}, {"match": {"qux": "mux"}}]}}),
             (
                 "foo:bar or qux:mux",
@@ -242,3 +303,30 @@ class TestParseKQL:
     )
     def should_produce_expected_query(query: str, expected: dict):
         assert parse(query) == expected
+
+    @staticmethod
+    @pytest.mark.parametrize("query", ["", "foo:", ":bar", "foo:(bar", "foo:bar)", "foo:bar\\", r"foo:bar\ or baz"])
+    def should_reject_invalid_queries(query: str):
+        with pytest.raises(UnexpectedInput):
+            parse(query)
+
+
+class TestGetParser:
+    @staticmethod
+    def should_use_lalr_parser():
+        assert get_parser().options.parser == "lalr"
+
+    @staticmethod
+    def should_cache_compiled_parser(cache_dir):
+        get_parser.cache_clear()
+        get_parser()
+        assert (cache_dir / "kql-parser.lark").exists()
+
+    @staticmethod
+    def should_parse_lists_of_values_with_cached_parser(cache_dir):
+        get_parser.cache_clear()
+        get_parser()
+        get_parser.cache_clear()  # Load the parser from the cache file
+        assert parse("foo:(a or b)") == {
+            "bool": {"should": [{"match": {"foo": "a"}}, {"match": {"foo": "b"}}], "minimum_should_match": 1}
+        }
@@ -0,0 +1,42 @@
+import pytest
+
+from elastic_log_cli.kql.wildcards import WildcardString, match_fields, parse_pattern, wildcard_pattern
+
+
+class TestWildcardString:
+    @staticmethod
+    @pytest.mark.parametrize(
+        "parts,is_prefix,matches_anything",
+        [
+            (["win", ""], True, False),
+            (["", "win"], False, False),
+            (["w", "n"], False, False),
+            (["win", "", ""], False, False),
+            (["", ""], False, True),
+        ],
+    )
+    def should_classify_wildcards(parts: list[str], is_prefix: bool, matches_anything: bool) -> None:
+        value = WildcardString(parts)
+        assert value == "*".join(parts)
+        assert value.is_prefix is is_prefix
+        assert value.matches_anything is matches_anything
+
+
+class TestParsePattern:
+    @staticmethod
+    @pytest.mark.parametrize("parts", [["a", "b"], ["a*b", ""], ["", "a?b\\c", ""]])
+    def should_invert_wildcard_pattern(parts: list[str]) -> None:
+        assert parse_pattern(wildcard_pattern(WildcardString(parts))).parts == parts
+
+    @staticmethod
+    def should_unescape_query_string_characters() -> None:
+        assert parse_pattern(r"foo\ bar\:baz*").parts == ["foo bar:baz", ""]
+
+
+class TestMatchFields:
+    @staticmethod
+    def should_match_any_characters_including_dots() -> None:
+        fields = ["service.name", "service.version.major", "service", "host.name"]
+        assert match_fields("service.*", fields) == ["service.name", "service.version.major"]
+        assert match_fields("*.name", fields) == ["service.name", "host.name"]
+        assert match_fields("*", fields) == fields
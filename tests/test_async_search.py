@@ -0,0 +1,82 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING
+
+import pytest
+
+from elastic_log_cli.utils.backoff import exponential_backoff
+from tests.fake_elasticsearch import FakeElasticsearch
+
+if TYPE_CHECKING:
+    import httpx
+else:
+    httpx = pytest.importorskip("httpx")
+
+from elastic_log_cli.async_search import search_after_scan
+
+SORT: list[dict | str] = [{"@timestamp": {"order": "asc"}}, "_seq_no"]
+QUERY: dict = {"match_all": {}}
+
+
+def _logs(count: int, index: str) -> list[dict]:
+    start = datetime(2022, 3, 5, 12)
+    return [{"@timestamp": (start + timedelta(seconds=i)).isoformat(), "message": f"{index} {i}"} for i in range(count)]
+
+
+def _client(elasticsearch: FakeElasticsearch, failures: int = 0) -> httpx.AsyncClient:
+    remaining_failures = [failures]
+
+    def _handle(request: httpx.Request) -> httpx.Response:
+        if remaining_failures[0]:
+            remaining_failures[0] -= 1
+            raise httpx.ConnectError("Connection refused", request=request)
+        params = dict(request.url.params)
+        body = json.loads(request.content) if request.content else None
+        status, payload = elasticsearch.handle(request.method, request.url.path, params, body)
+        return httpx.Response(status, json=payload)
+
+    return httpx.AsyncClient(base_url="http://elasticsearch:9200", transport=httpx.MockTransport(_handle))
+
+
+async def _collect(scan) -> list[dict]:
+    return [hit async for hit in scan]
+
+
+class TestAsyncSearchAfterScan:
+    @staticmethod
+    def should_run_concurrent_scans_over_one_client() -> None:
+        elasticsearch = FakeElasticsearch()
+        elasticsearch.index(_logs(15, "a"), index="a")
+        elasticsearch.index(_logs(8, "b"), index="b")
+
+        async def _main() -> tuple[list[dict], list[dict]]:
+            async with _client(elasticsearch) as client:
+                return await asyncio.gather(
+                    _collect(search_after_scan(client, index="a", query=QUERY, sort=SORT, size=4)),
+                    _collect(search_after_scan(client, index="b", query=QUERY, sort=SORT, size=4)),
+                )
+
+        first, second = asyncio.run(_main())
+        assert [hit["_source"]["message"] for hit in first] == [f"a {i}" for i in range(15)]
+        assert [hit["_source"]["message"] for hit in second] == [f"b {i}" for i in range(8)]
+
+    @staticmethod
+    def should_back_off_on_connection_errors() -> None:
+        elasticsearch = FakeElasticsearch()
+        elasticsearch.index(_logs(3, "a"), index="a")
+        backoffs: list[float] = []
+
+        async def _main() -> list[dict]:
+            async with _client(elasticsearch, failures=2) as client:
+                scan = search_after_scan(
+                    client,
+                    index="a",
+                    query=QUERY,
+                    sort=SORT,
+                    backoff=exponential_backoff(factor=0.001, on_backoff=lambda _, amount: backoffs.append(amount)),
+                )
+                return await _collect(scan)
+
+        assert len(asyncio.run(_main())) == 3
+        assert backoffs == [0.001, 0.002]
@@ -0,0 +1,35 @@
+import pytest
+
+from elastic_log_cli.checkpoint import Checkpoint
+from elastic_log_cli.exceptions import ElasticLogValidationError
+
+
+class TestCheckpoint:
+    @staticmethod
+    def should_resume_saved_progress(tmp_path) -> None:
+        path = tmp_path / "checkpoint.json"
+        Checkpoint(path, key={"index": "logs"}).save(["2022-03-05T12:00:00", 4], documents=5)
+        checkpoint = Checkpoint(path, key={"index": "logs"})
+        checkpoint.resume()
+        assert checkpoint.search_after == ["2022-03-05T12:00:00", 4]
+        assert checkpoint.documents == 5
+        assert [file.name for file in tmp_path.iterdir()] == ["checkpoint.json"]
+
+    @staticmethod
+    def should_flush_output_before_saving(tmp_path) -> None:
+        flushed = []
+        checkpoint = Checkpoint(tmp_path / "checkpoint.json", key={}, before_save=lambda: flushed.append(True))
+        checkpoint.save([1], documents=1)
+        assert flushed == [True]
+
+    @staticmethod
+    def should_not_resume_a_different_scan(tmp_path) -> None:
+        path = tmp_path / "checkpoint.json"
+        Checkpoint(path, key={"index": "logs"}).save([1], documents=1)
+        with pytest.raises(ElasticLogValidationError):
+            Checkpoint(path, key={"index": "other"}).resume()
+
+    @staticmethod
+    def should_require_a_saved_checkpoint(tmp_path) -> None:
+        with pytest.raises(ElasticLogValidationError):
+            Checkpoint(tmp_path / "checkpoint.json", key={}).resume()
@@ -1,4 +1,13 @@
-from elastic_log_cli.cli import query_from_args
+import gzip
+import io
+import json
+
+import pytest
+from click.testing import CliRunner
+
+from elastic_log_cli.cli import cli, query_from_args
+from elastic_log_cli.exceptions import ElasticLogValidationError
+from tests.fake_elasticsearch import FakeElasticsearch
 
 
 class TestQueryFromArgs:
@@ -17,3 +26,253 @@ class TestQueryFromArgs:
                 ]
             }
         }
+
+
+class TestCLI:
+    @staticmethod
+    def _invoke(*args: str) -> list[dict]:
+        result = CliRunner().invoke(
+            cli,
+            ["--index", "logs", "--timestamp-field", "time", "--start", "2022-02-27T12:00:00", *args],
+            catch_exceptions=False,
+        )
+        assert result.exit_code == 0, result.output
+        return [json.loads(line) for line in result.output.splitlines()]
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "extra_args", [[], ["--slices", "3"], ["--parallel", "2"], ["--stream"], ["--adaptive-page-size"]]
+    )
+    def should_output_matching_logs_in_order(elasticsearch: FakeElasticsearch, extra_args: list[str]) -> None:
+        elasticsearch.index(
+            [
+                {"time": f"2022-02-27T12:{minute:02}:00", "level": level}
+                for minute in range(59, -1, -1)
+                for level in ("INFO", "ERROR")
+            ]
+        )
+        output = TestCLI._invoke("--end", "2022-02-27T12:30:00", "--page-size", "4", *extra_args, "level:ERROR")
+        assert output == [{"time": f"2022-02-27T12:{minute:02}:00", "level": "ERROR"} for minute in range(31)]
+
+    @staticmethod
+    def should_renew_point_in_time_keep_alive_with_each_page(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index([{"time": f"2022-02-27T12:{minute:02}:00"} for minute in range(10)])
+        args = ("--end", "2022-02-27T13:00:00", "--page-size", "4", "--slices", "2", "--keep-alive", "5m", "time:*")
+        assert len(TestCLI._invoke(*args)) == 10
+        (open_params,) = [params for method, _, params, _ in elasticsearch.requests if method == "POST"]
+        assert open_params["keep_alive"] == "5m"
+        searches = [body for _, path, _, body in elasticsearch.requests if path == "/_search"]
+        assert len(searches) > 2
+        assert {body["pit"]["keep_alive"] for body in searches} == {"5m"}
+
+    @staticmethod
+    def should_reject_invalid_keep_alive(elasticsearch: FakeElasticsearch) -> None:
+        with pytest.raises(ElasticLogValidationError, match="--keep-alive must be a time interval"):
+            TestCLI._invoke("--end", "2022-02-27T13:00:00", "--slices", "2", "--keep-alive", "5 minutes", "time:*")
+        assert not elasticsearch.requests
+
+    @staticmethod
+    def should_write_stats_file(elasticsearch: FakeElasticsearch, tmp_path) -> None:
+        elasticsearch.index([{"time": f"2022-02-27T12:{minute:02}:00"} for minute in range(10)])
+        stats_file = tmp_path / "stats.json"
+        output = TestCLI._invoke(
+            "--end", "2022-02-27T13:00:00", "--page-size", "4", "--stats-file", str(stats_file), "time:*"
+        )
+        stats = json.loads(stats_file.read_text())
+        assert stats["documents"] == len(output) == 10
+        assert stats["requests"] == 4
+        assert stats["response_bytes"] > 0
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "extra_args,expected",
+        [
+            (["--source-excludes", "level"], {"time": "2022-02-27T12:00:00", "host": {"name": "web-01"}}),
+            (["--source", "time,level", "--source-excludes", "time"], {"level": "INFO"}),
+            (["--retrieve", "fields", "--source", "host.*"], {"host.name": ["web-01"]}),
+            (
+                ["--retrieve", "docvalue_fields"],
+                {"time": ["2022-02-27T12:00:00"], "level": ["INFO"], "host.name": ["web-01"]},
+            ),
+        ],
+    )
+    def should_output_requested_fields(elasticsearch: FakeElasticsearch, extra_args: list[str], expected: dict) -> None:
+        elasticsearch.index([{"time": "2022-02-27T12:00:00", "level": "INFO", "host": {"name": "web-01"}}])
+        assert TestCLI._invoke("--end", "2022-02-27T13:00:00", *extra_args, "level:INFO") == [expected]
+
+    @staticmethod
+    def should_serve_historical_logs_from_cache(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index([{"time": f"2022-02-27T12:{minute:02}:00"} for minute in range(10)])
+        args = ("--end", "2022-02-27T13:00:00", "--page-size", "4", "--cache-results", "time:*")
+        output = TestCLI._invoke(*args)
+        assert len(output) == 10
+        requests = len(elasticsearch.requests)
+        assert TestCLI._invoke(*args) == output
+        assert len(elasticsearch.requests) == requests
+
+    @staticmethod
+    def should_count_matching_logs(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index([{"time": f"2022-02-27T12:{minute:02}:00Z", "level": "INFO"} for minute in range(10)])
+        assert TestCLI._invoke("--end", "2022-02-27T13:00:00Z", "--count", "level:INFO") == [{"count": 10}]
+        assert len(elasticsearch.requests) == 1
+
+    @staticmethod
+    def should_output_histogram_of_matching_logs(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index([{"time": f"2022-02-27T12:{minute:02}:00Z", "level": "INFO"} for minute in (0, 1, 6, 7, 8)])
+        assert TestCLI._invoke("--end", "2022-02-27T13:00:00Z", "--histogram", "5m", "level:INFO") == [
+            {"timestamp": "2022-02-27T12:00:00.000Z", "count": 2},
+            {"timestamp": "2022-02-27T12:05:00.000Z", "count": 3},
+        ]
+        assert len(elasticsearch.requests) == 1
+
+    @staticmethod
+    @pytest.mark.parametrize("interval", ["5 minutes", "2w", "2M", "2q", "2y"])
+    def should_reject_invalid_histogram_interval(elasticsearch: FakeElasticsearch, interval: str) -> None:
+        with pytest.raises(ElasticLogValidationError, match="--histogram must be a time interval"):
+            TestCLI._invoke("--histogram", interval, "level:INFO")
+        assert not elasticsearch.requests
+
+    @staticmethod
+    def should_merge_logs_from_several_clusters(clusters: dict[str, FakeElasticsearch]) -> None:
+        logs = [{"time": f"2022-02-27T12:{minute:02}:00", "level": "INFO"} for minute in range(10)]
+        clusters["eu"].index(logs[:3] + logs[6:])
+        clusters["us"].index(logs[3:6])
+        output = TestCLI._invoke("--end", "2022-02-27T13:00:00", "--cluster", "eu", "--cluster", "us", "level:INFO")
+        assert output == logs
+        assert TestCLI._invoke("--cluster", "eu", "--cluster", "us", "--count", "level:INFO") == [{"count": 10}]
+
+    @staticmethod
+    def should_reject_unknown_cluster(clusters: dict[str, FakeElasticsearch]) -> None:
+        with pytest.raises(ElasticLogValidationError):
+            TestCLI._invoke("--cluster", "ap", "level:INFO")
+
+    @staticmethod
+    def should_write_compressed_output(elasticsearch: FakeElasticsearch) -> None:
+        logs = [{"time": f"2022-02-27T12:{minute:02}:00", "level": "INFO"} for minute in range(10)]
+        elasticsearch.index(logs)
+        result = CliRunner().invoke(
+            cli,
+            ["--index", "logs", "-t", "time", "-s", "2022-02-27T12:00:00", "-e", "2022-02-27T13:00:00"]
+            + ["--output-format", "ndjson.gz", "level:INFO"],
+            catch_exceptions=False,
+        )
+        assert result.exit_code == 0, result.output
+        assert [json.loads(line) for line in gzip.decompress(result.stdout_bytes).splitlines()] == logs
+
+    @staticmethod
+    def should_write_columnar_output_batched_by_page(elasticsearch: FakeElasticsearch) -> None:
+        pyarrow = pytest.importorskip("pyarrow")
+        logs = [
+            {"time": f"2022-02-27T12:{minute:02}:00", "level": "INFO", "host": {"name": "web-01"}}
+            for minute in range(10)
+        ]
+        elasticsearch.index(logs)
+        result = CliRunner().invoke(
+            cli,
+            ["--index", "logs", "-t", "time", "-s", "2022-02-27T12:00:00", "-e", "2022-02-27T13:00:00"]
+            + ["--output-format", "arrow", "--page-size", "4", "--source", "time,host.name", "level:INFO"],
+            catch_exceptions=False,
+        )
+        assert result.exit_code == 0, result.output
+        reader = pyarrow.ipc.open_stream(io.BytesIO(result.stdout_bytes))
+        assert reader.schema.names == ["time", "host.name"]
+        batches = list(reader)
+        assert [batch.num_rows for batch in batches] == [4, 4, 2]
+        assert pyarrow.Table.from_batches(batches).to_pylist() == [
+            {"time": log["time"], "host.name": "web-01"} for log in logs
+        ]
+
+    @staticmethod
+    def should_reject_wildcard_columns() -> None:
+        with pytest.raises(ElasticLogValidationError):
+            TestCLI._invoke("--end", "2022-02-27T13:00:00", "--output-format", "parquet", "--source", "host.*", "*")
+
+    @staticmethod
+    def should_resume_export_from_checkpoint(elasticsearch: FakeElasticsearch, tmp_path) -> None:
+        logs = [{"time": f"2022-02-27T12:{minute:02}:00", "level": "INFO"} for minute in range(20)]
+        elasticsearch.index(logs[:10])
+        checkpoint = str(tmp_path / "checkpoint.json")
+        args = ("--end", "2022-02-27T13:00:00", "--page-size", "4", "--checkpoint", checkpoint, "level:INFO")
+        assert TestCLI._invoke(*args) == logs[:10]
+        elasticsearch.index(logs[10:])
+        assert TestCLI._invoke("--resume", *args) == logs[10:]
+        assert json.loads((tmp_path / "checkpoint.json").read_text())["documents"] == 20
+
+    @staticmethod
+    def should_require_checkpoint_to_resume() -> None:
+        with pytest.raises(ElasticLogValidationError):
+            TestCLI._invoke("--end", "2022-02-27T13:00:00", "--resume", "level:INFO")
+
+    @staticmethod
+    def should_reject_checkpoint_with_columnar_output(tmp_path) -> None:
+        checkpoint = str(tmp_path / "checkpoint.json")
+        with pytest.raises(ElasticLogValidationError, match="--checkpoint"):
+            TestCLI._invoke(
+                "--end", "2022-02-27T13:00:00", "--output-format", "parquet", "--checkpoint", checkpoint, "*"
+            )
+
+    @staticmethod
+    def should_filter_and_project_logs_client_side(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index(
+            [
+                {"time": "2022-02-27T12:00:00", "level": "INFO", "message": "Request timed out", "host": {"name": "a"}},
+                {"time": "2022-02-27T12:01:00", "level": "INFO", "message": "Request served", "host": {"name": "b"}},
+            ]
+        )
+        args = ("--end", "2022-02-27T13:00:00", "--grep", "message=timed? out")
+        assert TestCLI._invoke(*args, "--project", "time,host=host.name", "level:INFO") == [
+            {"time": "2022-02-27T12:00:00", "host": "a"}
+        ]
+        assert TestCLI._invoke(*args, "--drop", "host,level", "level:INFO") == [
+            {"time": "2022-02-27T12:00:00", "message": "Request timed out"}
+        ]
+
+    @staticmethod
+    def should_format_logs_with_template(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index([{"time": "2022-02-27T12:00:00", "level": "INFO", "message": "Started"}])
+        result = CliRunner().invoke(
+            cli,
+            ["--index", "logs", "-t", "time", "-s", "2022-02-27T12:00:00", "-e", "2022-02-27T13:00:00"]
+            + ["--line-format", "{time} [{level}] {message}", "level:INFO"],
+            catch_exceptions=False,
+        )
+        assert result.output == "2022-02-27T12:00:00 [INFO] Started\n"
+
+    @staticmethod
+    def should_compile_query_according_to_field_types(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.mappings["logs"] = {"properties": {"time": {"type": "date"}, "level": {"type": "keyword"}}}
+        elasticsearch.index([{"time": "2022-02-27T12:00:00", "level": "INFO"}])
+        output = TestCLI._invoke("--end", "2022-02-27T13:00:00", "--field-aware", "level:INFO")
+        assert output == [{"time": "2022-02-27T12:00:00", "level": "INFO"}]
+        query = elasticsearch.requests[-1][3]["query"]
+        assert {"term": {"level": "INFO"}} in query["bool"]["filter"]
+
+    @staticmethod
+    def should_match_wildcards_in_values_and_fields(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.mappings["logs"] = {
+            "properties": {
+                "time": {"type": "date"},
+                "service": {"properties": {"name": {"type": "keyword"}, "version": {"type": "keyword"}}},
+            }
+        }
+        logs = [
+            {"time": "2022-02-27T12:00:00", "service": {"name": "api-gateway", "version": "1.0"}},
+            {"time": "2022-02-27T12:01:00", "service": {"name": "worker", "version": "api"}},
+            {"time": "2022-02-27T12:02:00", "service": {"name": "scheduler", "version": "2.0"}},
+        ]
+        elasticsearch.index(logs)
+        assert TestCLI._invoke("--end", "2022-02-27T13:00:00", "service.name:api*") == logs[:1]
+        output = TestCLI._invoke("--end", "2022-02-27T13:00:00", "--field-aware", "service.*:api*")
+        assert output == logs[:2]
+
+    @staticmethod
+    def should_analyse_wildcard_values_on_text_fields(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.mappings["logs"] = {"properties": {"time": {"type": "date"}, "message": {"type": "text"}}}
+        logs = [
+            {"time": "2022-02-27T12:00:00", "message": "Error connecting to database"},
+            {"time": "2022-02-27T12:01:00", "message": "Connected to database"},
+        ]
+        elasticsearch.index(logs)
+        assert TestCLI._invoke("--end", "2022-02-27T13:00:00", "--field-aware", "message:error*") == logs[:1]
+        query_string = {"query_string": {"query": "error*", "fields": ["message"], "analyze_wildcard": True}}
+        assert query_string in elasticsearch.requests[-1][3]["query"]["bool"]["filter"]
@@ -0,0 +1,54 @@
+from elastic_log_cli.field_types import FieldTypeCache, field_types_from_mappings, get_field_types
+from tests.fake_elasticsearch import FakeElasticsearch
+
+MAPPINGS = {
+    "properties": {
+        "@timestamp": {"type": "date"},
+        "message": {"type": "text", "fields": {"keyword": {"type": "keyword"}}},
+        "host": {"properties": {"name": {"type": "keyword"}}},
+        "items": {"type": "nested", "properties": {"name": {"type": "keyword"}}},
+        "status": {"type": "integer"},
+    }
+}
+
+
+class TestFieldTypesFromMappings:
+    @staticmethod
+    def should_flatten_fields_by_dotted_path() -> None:
+        assert field_types_from_mappings({"logs": {"mappings": MAPPINGS}}) == {
+            "@timestamp": "date",
+            "message": "text",
+            "message.keyword": "keyword",
+            "host.name": "keyword",
+            "items": "nested",
+            "items.name": "keyword",
+            "status": "integer",
+        }
+
+    @staticmethod
+    def should_omit_fields_with_conflicting_types() -> None:
+        other = {"properties": {"status": {"type": "keyword"}, "level": {"type": "keyword"}}}
+        field_types = field_types_from_mappings({"logs-1": {"mappings": MAPPINGS}, "logs-2": {"mappings": other}})
+        assert "status" not in field_types
+        assert field_types["level"] == "keyword"
+
+
+class TestFieldTypeCache:
+    @staticmethod
+    def should_expire_entries_after_ttl(tmp_path) -> None:
+        now = [1000.0]
+        cache = FieldTypeCache(tmp_path / "cache.sqlite", ttl=60, clock=lambda: now[0])
+        cache.set("logs", {"level": "keyword"})
+        now[0] += 59
+        assert cache.get("logs") == {"level": "keyword"}
+        now[0] += 1
+        assert cache.get("logs") is None
+
+
+class TestGetFieldTypes:
+    @staticmethod
+    def should_fetch_mapping_once(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.mappings["logs"] = MAPPINGS
+        assert get_field_types("logs")["message.keyword"] == "keyword"
+        assert get_field_types("logs")["message.keyword"] == "keyword"
+        assert [path for _, path, _, _ in elasticsearch.requests] == ["/logs/_mapping"]
@@ -0,0 +1,38 @@
+import re
+import subprocess
+import sys
+
+import pytest
+
+# Generous, to avoid flakiness on slow CI runners. Importing the entrypoint costs ~30ms locally, versus ~250ms when
+# heavy dependencies are imported eagerly.
+IMPORT_TIME_BUDGET_MICROSECONDS = 150_000
+
+
+def _import_times(statement: str) -> dict[str, int]:
+    """Cumulative import time of each module imported by the statement, in microseconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)(\S+)", line)
+        if match:
+            times[match.group(3)] = int(match.group(1))
+    return times
+
+
+class TestImportTime:
+    @staticmethod
+    @pytest.mark.parametrize("module", ["requests", "pydantic", "lark", "orjson"])
+    def should_not_import_heavy_modules_on_startup(module: str) -> None:
+        assert module not in _import_times("import elastic_log_cli.__main__")
+
+    @staticmethod
+    def should_import_entrypoint_within_budget() -> None:
+        # Take the best of several runs, to reduce noise
+        cumulative = min(_import_times("import elastic_log_cli.__main__")["elastic_log_cli.__main__"] for _ in range(3))
+        assert cumulative < IMPORT_TIME_BUDGET_MICROSECONDS
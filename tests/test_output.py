@@ -0,0 +1,126 @@
+import gzip
+import io
+from typing import Literal
+
+import pytest
+
+from elastic_log_cli import output
+from elastic_log_cli.exceptions import ElasticLogError
+from elastic_log_cli.output import ColumnarWriter, JSONLinesWriter, dumps, open_writer
+
+DOCUMENT = {"b": [1, 2.5, None], "a": {"d": "ünïcode", "c": True}}
+
+
+class TestDumps:
+    @staticmethod
+    @pytest.mark.parametrize("backend", ["orjson", "stdlib"])
+    def should_produce_compact_json_with_sorted_keys(monkeypatch, backend: str) -> None:
+        if backend == "stdlib":
+            monkeypatch.setattr(output, "orjson", None)
+        assert dumps(DOCUMENT) == '{"a":{"c":true,"d":"ünïcode"},"b":[1,2.5,null]}'.encode("utf-8")
+
+    @staticmethod
+    @pytest.mark.parametrize("backend", ["orjson", "stdlib"])
+    def should_preserve_key_order_when_not_sorting(monkeypatch, backend: str) -> None:
+        if backend == "stdlib":
+            monkeypatch.setattr(output, "orjson", None)
+        assert dumps(DOCUMENT, sort_keys=False) == '{"b":[1,2.5,null],"a":{"d":"ünïcode","c":true}}'.encode("utf-8")
+
+    @staticmethod
+    @pytest.mark.parametrize(
+        "backend,expected",
+        [
+            ("orjson", b'{"large":1e16,"nan":null,"small":1.5e-7}'),
+            ("stdlib", b'{"large":1e+16,"nan":NaN,"small":1.5e-07}'),
+        ],
+    )
+    def should_format_floats_according_to_backend(monkeypatch, backend: str, expected: bytes) -> None:
+        if backend == "stdlib":
+            monkeypatch.setattr(output, "orjson", None)
+        else:
+            pytest.importorskip("orjson")
+        assert dumps({"large": 1e16, "small": 1.5e-7, "nan": float("nan")}) == expected
+
+    @staticmethod
+    def should_fall_back_for_unsupported_values() -> None:
+        assert dumps({"big": 2**70}) == b'{"big":1180591620717411303424}'
+
+
+class TestJSONLinesWriter:
+    @staticmethod
+    def should_batch_writes_until_buffer_is_full() -> None:
+        stream = io.BytesIO()
+        writer = JSONLinesWriter(stream, buffer_size=20)
+        writer.write({"a": 1})
+        assert stream.getvalue() == b""
+        writer.write({"b": 2})
+        writer.write({"c": 3})
+        assert stream.getvalue() == b'{"a":1}\n{"b":2}\n{"c":3}\n'
+
+    @staticmethod
+    def should_flush_on_exit() -> None:
+        stream = io.BytesIO()
+        with JSONLinesWriter(stream) as writer:
+            writer.write({"a": 1})
+        assert stream.getvalue() == b'{"a":1}\n'
+
+    @staticmethod
+    def should_compress_with_gzip() -> None:
+        stream = io.BytesIO()
+        with JSONLinesWriter(stream, compression="gzip") as writer:
+            writer.write({"a": 1})
+            writer.write({"b": 2})
+        assert gzip.decompress(stream.getvalue()) == b'{"a":1}\n{"b":2}\n'
+
+    @staticmethod
+    def should_compress_with_zstd() -> None:
+        zstandard = pytest.importorskip("zstandard")
+        stream = io.BytesIO()
+        with open_writer(stream, "ndjson.zst") as writer:
+            writer.write({"a": 1})
+        assert zstandard.ZstdDecompressor().decompressobj().decompress(stream.getvalue()) == b'{"a":1}\n'
+
+
+class TestColumnarWriter:
+    @staticmethod
+    def _read(output_format: str, content: bytes):
+        pyarrow = pytest.importorskip("pyarrow")
+        if output_format == "parquet":
+            return pyarrow.parquet.read_table(pyarrow.BufferReader(content))
+        return pyarrow.ipc.open_stream(content).read_all()
+
+    @staticmethod
+    @pytest.mark.parametrize("output_format", ["parquet", "arrow"])
+    def should_write_columns_by_dotted_path(output_format: Literal["parquet", "arrow"]) -> None:
+        pytest.importorskip("pyarrow")
+        stream = io.BytesIO()
+        with ColumnarWriter(stream, output_format, columns=["a", "b.c", "d"], batch_size=2) as writer:
+            for value in range(5):
+                writer.write({"a": value, "b": {"c": str(value)}})
+        table = TestColumnarWriter._read(output_format, stream.getvalue())
+        assert [str(field.type) for field in table.schema] == ["int64", "string", "string"]
+        assert table.to_pylist() == [{"a": value, "b.c": str(value), "d": None} for value in range(5)]
+
+    @staticmethod
+    def should_infer_columns_from_first_batch() -> None:
+        pytest.importorskip("pyarrow")
+        stream = io.BytesIO()
+        with ColumnarWriter(stream, "arrow") as writer:
+            writer.write({"b": 1, "a": [1, 2]})
+        assert TestColumnarWriter._read("arrow", stream.getvalue()).to_pylist() == [{"b": 1, "a": [1, 2]}]
+
+    @staticmethod
+    def should_write_empty_file_without_documents() -> None:
+        pytest.importorskip("pyarrow")
+        stream = io.BytesIO()
+        with ColumnarWriter(stream, "parquet", columns=["a"]):
+            pass
+        assert TestColumnarWriter._read("parquet", stream.getvalue()).num_rows == 0
+
+    @staticmethod
+    def should_reject_values_which_change_type() -> None:
+        pytest.importorskip("pyarrow")
+        writer = ColumnarWriter(io.BytesIO(), "arrow", batch_size=1)
+        writer.write({"a": 1})
+        with pytest.raises(ElasticLogError):
+            writer.write({"a": "one"})
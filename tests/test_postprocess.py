@@ -0,0 +1,67 @@
+import pytest
+
+from elastic_log_cli.exceptions import ElasticLogValidationError
+from elastic_log_cli.postprocess import PostProcessor, compile_template, parse_field_pattern
+
+DOCUMENT = {"message": "Request timed out", "status": 504, "host": {"name": "web-01", "ip": "10.0.0.1"}, "tags": ["a"]}
+
+
+class TestPostProcessor:
+    @staticmethod
+    @pytest.mark.parametrize(
+        "include,exclude,expected",
+        [
+            ([("message", "timed? out")], [], True),
+            ([("message", "^timed")], [], False),
+            ([("status", "^5")], [], True),
+            ([("host.name", "web"), ("tags", "^a$")], [], True),
+            ([("missing", "")], [], False),
+            ([], [("host.name", "web")], False),
+            ([], [("missing", "")], True),
+        ],
+    )
+    def should_filter_by_regular_expressions(include: list, exclude: list, expected: bool) -> None:
+        assert (PostProcessor(include=include, exclude=exclude)(DOCUMENT) is not None) is expected
+
+    @staticmethod
+    def should_project_fields_by_path() -> None:
+        post_process = PostProcessor(project=["message", "host=host.name", "missing"])
+        assert post_process(DOCUMENT) == {"message": "Request timed out", "host": "web-01"}
+
+    @staticmethod
+    def should_drop_fields_without_modifying_document() -> None:
+        assert PostProcessor(drop=["host.ip", "tags", "missing.field"])(DOCUMENT) == {
+            "message": "Request timed out",
+            "status": 504,
+            "host": {"name": "web-01"},
+        }
+        assert DOCUMENT["host"] == {"name": "web-01", "ip": "10.0.0.1"}
+
+    @staticmethod
+    def should_reject_invalid_regular_expression() -> None:
+        with pytest.raises(ElasticLogValidationError):
+            PostProcessor(include=[("message", "(")])
+
+
+class TestCompileTemplate:
+    @staticmethod
+    def should_format_fields_by_path() -> None:
+        format_line = compile_template("{{{status}}} {host.name}: {message} {tags} {missing}.")
+        assert format_line(DOCUMENT) == '{504} web-01: Request timed out ["a"] .'
+
+    @staticmethod
+    @pytest.mark.parametrize("template", ["{message", "message}", "{}"])
+    def should_reject_invalid_template(template: str) -> None:
+        with pytest.raises(ElasticLogValidationError):
+            compile_template(template)
+
+
+class TestParseFieldPattern:
+    @staticmethod
+    def should_split_on_first_equals_sign() -> None:
+        assert parse_field_pattern("message=a=b") == ("message", "a=b")
+
+    @staticmethod
+    def should_require_field() -> None:
+        with pytest.raises(ElasticLogValidationError):
+            parse_field_pattern("message")
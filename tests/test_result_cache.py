@@ -0,0 +1,95 @@
+import time
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from elastic_log_cli.result_cache import ResultCache, is_historical
+
+KEY = {"index": "logs", "query": {"match_all": {}}}
+
+
+def _hits(count: int, requested: list[int] = None) -> Iterator[dict]:
+    for i in range(count):
+        if requested is not None:
+            requested.append(i)
+        yield {"_source": {"message": f"log {i}"}, "sort": [i]}
+
+
+def _fail() -> Iterator[dict]:
+    raise AssertionError("Should be served from the cache")
+    yield
+
+
+class TestResultCache:
+    @staticmethod
+    def should_serve_stored_scans(tmp_path):
+        cache = ResultCache(tmp_path / "results.sqlite", chunk_size=3)
+        assert list(cache.cached(KEY, _hits(10))) == list(_hits(10))
+        assert list(cache.cached(KEY, _fail())) == list(_hits(10))
+
+    @staticmethod
+    def should_not_store_incomplete_scans(tmp_path):
+        cache = ResultCache(tmp_path / "results.sqlite", chunk_size=3)
+        scan = cache.cached(KEY, _hits(10))
+        assert [next(scan) for _ in range(5)] == list(_hits(5))
+        scan.close()
+        requested: list[int] = []
+        assert list(cache.cached(KEY, _hits(10, requested))) == list(_hits(10))
+        assert requested == list(range(10))
+
+    @staticmethod
+    def should_key_scans_by_contents_of_key(tmp_path):
+        cache = ResultCache(tmp_path / "results.sqlite")
+        list(cache.cached(KEY, _hits(2)))
+        assert list(cache.cached({**KEY, "index": "other"}, _hits(3))) == list(_hits(3))
+
+    @staticmethod
+    def should_evict_least_recently_used_scans_when_full(tmp_path):
+        cache = ResultCache(tmp_path / "results.sqlite", max_bytes=150)  # Each scan is around 60 bytes
+        list(cache.cached({"scan": 1}, _hits(2)))
+        list(cache.cached({"scan": 2}, _hits(2)))
+        list(cache.cached({"scan": 1}, _fail()))
+        list(cache.cached({"scan": 3}, _hits(2)))
+        assert list(cache.cached({"scan": 1}, _fail())) == list(_hits(2))
+        requested: list[int] = []
+        list(cache.cached({"scan": 2}, _hits(2, requested)))
+        assert requested == [0, 1]
+
+    @staticmethod
+    def should_ignore_unreadable_database(tmp_path):
+        path = tmp_path / "results.sqlite"
+        path.write_bytes(b"not a database")
+        cache = ResultCache(path)
+        assert list(cache.cached(KEY, _hits(3))) == list(_hits(3))
+
+
+class TestIsHistorical:
+    @staticmethod
+    @pytest.mark.parametrize(
+        "end,expected",
+        [
+            (None, False),
+            ("now-1d", False),
+            ("2022-03-05T11:00:00", True),
+            ("2022-03-05T11:55:00", False),
+            ("2022-03-05T11:00:00Z", True),
+            ("2022-03-05T13:00:00+02:00", True),
+            ("2022-03-05T15:00:00", False),
+            ("2022-03-05T15:00:00+02:00", False),
+        ],
+    )
+    def should_only_consider_timestamps_older_than_settle_time(end: str | None, expected: bool):
+        assert is_historical(end, now=datetime(2022, 3, 5, 12, tzinfo=timezone.utc)) is expected
+
+    @staticmethod
+    def should_treat_timestamps_without_timezone_as_utc(monkeypatch):
+        # East of UTC, a naive end a few hours ahead is still in the future
+        monkeypatch.setenv("TZ", "Asia/Tokyo")
+        time.tzset()
+        try:
+            end = (datetime.now(timezone.utc) + timedelta(hours=3)).replace(tzinfo=None).isoformat()
+            assert is_historical(end) is False
+        finally:
+            monkeypatch.undo()
+            time.tzset()
@@ -0,0 +1,418 @@
+import time
+from collections.abc import Iterator
+from datetime import datetime, timedelta
+
+import pytest
+from requests import Response, Timeout
+from requests.exceptions import ChunkedEncodingError
+
+from elastic_log_cli import search
+from elastic_log_cli.checkpoint import Checkpoint
+from elastic_log_cli.config import get_cluster_settings
+from elastic_log_cli.search import (
+    SCAN_FILTER_PATH,
+    date_histogram,
+    multi_cluster_scan,
+    point_in_time_scan,
+    search_after_scan,
+    time_window_scan,
+    time_windows,
+)
+from elastic_log_cli.utils.backoff import exponential_backoff
+from elastic_log_cli.utils.page_size import AdaptivePageSize
+from elastic_log_cli.utils.polling import PollingInterval
+from tests.conftest import FAKE_ELASTICSEARCH_URL
+from tests.fake_elasticsearch import FakeElasticsearch, FakeElasticsearchAdapter
+
+SORT: list[dict | str] = [{"@timestamp": {"order": "asc"}}, "_seq_no"]
+QUERY: dict = {"match_all": {}}
+
+
+def _logs(count: int) -> list[dict]:
+    start = datetime(2022, 3, 5, 12)
+    return [{"@timestamp": (start + timedelta(seconds=i)).isoformat(), "message": f"log {i}"} for i in range(count)]
+
+
+class TestSearchAfterScan:
+    @staticmethod
+    def should_paginate_through_all_results(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index(_logs(25))
+        docs = list(search_after_scan(index="logs", query=QUERY, sort=SORT, size=10))
+        assert [doc["_source"]["message"] for doc in docs] == [f"log {i}" for i in range(25)]
+        assert len([request for request in elasticsearch.requests if request[1].endswith("_search")]) == 4
+
+    @staticmethod
+    def should_fetch_next_page_whilst_current_page_is_consumed(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index(_logs(25))
+        scan = search_after_scan(index="logs", query=QUERY, sort=SORT, size=10, prefetch=1)
+        docs = [next(scan)]
+        deadline = time.monotonic() + 1.0
+        while len(elasticsearch.requests) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert len(elasticsearch.requests) >= 2
+        docs.extend(scan)
+        assert [doc["_source"]["message"] for doc in docs] == [f"log {i}" for i in range(25)]
+
+    @staticmethod
+    def should_poll_adaptively_when_following(elasticsearch: FakeElasticsearch, monkeypatch) -> None:
+        class StopFollowing(Exception):
+            pass
+
+        sleeps: list[float] = []
+
+        def _sleep(seconds: float) -> None:
+            sleeps.append(seconds)
+            if len(sleeps) == 5:
+                raise StopFollowing
+
+        monkeypatch.setattr(search, "sleep", _sleep)
+        elasticsearch.index(_logs(3))
+        scan = search_after_scan(
+            index="logs",
+            query=QUERY,
+            sort=SORT,
+            size=2,
+            follow=True,
+            polling=PollingInterval(minimum=1.0, maximum=3.0),
+        )
+        with pytest.raises(StopFollowing):
+            list(scan)
+        assert sleeps == [0.0, 1.0, 1.0, 2.0, 3.0]
+
+    @staticmethod
+    def should_include_late_logs_within_overlap_when_following(elasticsearch: FakeElasticsearch, monkeypatch) -> None:
+        class StopFollowing(Exception):
+            pass
+
+        logs = _logs(6)
+        late = [{**logs[3], "message": "late"}, {**logs[0], "message": "too late"}]
+        sleeps: list[float] = []
+
+        def _sleep(seconds: float) -> None:
+            if not seconds:
+                return
+            # Once caught up, logs arrive behind the cursor
+            sleeps.append(seconds)
+            if len(sleeps) == 1:
+                elasticsearch.index(late)
+            if len(sleeps) == 3:
+                raise StopFollowing
+
+        monkeypatch.setattr(search, "sleep", _sleep)
+        elasticsearch.index(logs[:5])
+        docs = []
+        with pytest.raises(StopFollowing):
+            for hit in search_after_scan(
+                index="logs",
+                query=QUERY,
+                sort=SORT,
+                size=2,
+                filter_path=SCAN_FILTER_PATH,
+                follow=True,
+                overlap=2.0,
+                polling=PollingInterval(minimum=1.0, maximum=3.0),
+            ):
+                docs.append(hit["_source"])
+        assert docs == logs[:5] + late[:1]
+        assert sleeps == [1.0, 1.0, 1.0]
+
+    @staticmethod
+    def should_tune_page_size_between_pages(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index(_logs(100))
+        page_size = AdaptivePageSize(initial=5, minimum=5, maximum=40, factor=2.0)
+        docs = list(search_after_scan(index="logs", query=QUERY, sort=SORT, page_size=page_size))
+        assert [doc["_source"]["message"] for doc in docs] == [f"log {i}" for i in range(100)]
+        assert [body["size"] for _, _, _, body in elasticsearch.requests] == [5, 10, 20, 40, 40, 40]
+
+    @staticmethod
+    def should_reduce_page_size_on_timeout(elasticsearch: FakeElasticsearch, monkeypatch) -> None:
+        search_response = search._search_response
+
+        def _search_response(**kwargs) -> Response:
+            if kwargs["size"] > 10:
+                raise Timeout
+            return search_response(**kwargs)
+
+        monkeypatch.setattr(search, "_search_response", _search_response)
+        elasticsearch.index(_logs(30))
+        page_size = AdaptivePageSize(initial=40, minimum=5, target_latency=0.0)
+        docs = list(
+            search_after_scan(
+                index="logs", query=QUERY, sort=SORT, page_size=page_size, backoff=exponential_backoff(factor=0.0)
+            )
+        )
+        assert len(docs) == 30
+        assert [body["size"] for _, _, _, body in elasticsearch.requests][0] == 10
+
+    @staticmethod
+    def should_reduce_page_size_when_search_times_out_or_is_rejected(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index(_logs(30))
+        elasticsearch.responses = [(200, {"timed_out": True, "hits": {"hits": []}}), (429, {"error": "rejected"})]
+        page_size = AdaptivePageSize(initial=40, minimum=5)
+        docs = list(
+            search_after_scan(
+                index="logs", query=QUERY, sort=SORT, page_size=page_size, backoff=exponential_backoff(factor=0.0)
+            )
+        )
+        assert len(docs) == 30
+        assert [body["size"] for _, _, _, body in elasticsearch.requests][:3] == [40, 20, 10]
+
+    @staticmethod
+    def should_omit_hit_metadata_with_filter_path(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index(_logs(5))
+        docs = list(search_after_scan(index="logs", query=QUERY, sort=SORT, size=2, filter_path=SCAN_FILTER_PATH))
+        assert len(docs) == 5
+        assert all(set(doc) == {"_source", "sort"} for doc in docs)
+
+    @staticmethod
+    def should_exclude_source_fields(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index(_logs(1))
+        (doc,) = search_after_scan(index="logs", query=QUERY, sort=SORT, source={"excludes": ["message"]})
+        assert set(doc["_source"]) == {"@timestamp"}
+
+    @staticmethod
+    @pytest.mark.parametrize("retrieve", ["fields", "docvalue_fields"])
+    def should_retrieve_fields_instead_of_source(elasticsearch: FakeElasticsearch, retrieve: str) -> None:
+        elasticsearch.index(_logs(1))
+        (doc,) = search_after_scan(
+            index="logs",
+            query=QUERY,
+            sort=SORT,
+            source=False,
+            filter_path=SCAN_FILTER_PATH,
+            fields=["mess*"] if retrieve == "fields" else None,
+            docvalue_fields=["mess*"] if retrieve == "docvalue_fields" else None,
+        )
+        assert doc == {"fields": {"message": ["log 0"]}, "sort": doc["sort"]}
+
+    @staticmethod
+    @pytest.mark.parametrize("extra_args", [{}, {"prefetch": 2}, {"stream": True}])
+    def should_resume_from_checkpoint_of_consumed_pages(
+        elasticsearch: FakeElasticsearch, tmp_path, extra_args: dict
+    ) -> None:
+        if extra_args.get("stream"):
+            pytest.importorskip("ijson")
+        elasticsearch.index(_logs(10))
+        path = tmp_path / "checkpoint.json"
+        scan = search_after_scan(
+            index="logs", query=QUERY, sort=SORT, size=4, checkpoint=Checkpoint(path, key={}), **extra_args
+        )
+        consumed = [next(scan)["_source"] for _ in range(6)]
+        scan.close()
+        checkpoint = Checkpoint(path, key={})
+        checkpoint.resume()
+        assert checkpoint.documents == 4
+        resumed = [
+            hit["_source"]
+            for hit in search_after_scan(index="logs", query=QUERY, sort=SORT, size=4, checkpoint=checkpoint)
+        ]
+        assert consumed[:4] + resumed == _logs(10)
+        assert checkpoint.documents == 10
+
+
+class TestStreamingSearchAfterScan:
+    @staticmethod
+    @pytest.fixture(autouse=True)
+    def ijson() -> None:
+        pytest.importorskip("ijson")
+
+    @staticmethod
+    def should_yield_same_results_as_buffered_scan(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index(_logs(25))
+        docs = list(search_after_scan(index="logs", query=QUERY, sort=SORT, size=10, stream=True))
+        assert docs == list(search_after_scan(index="logs", query=QUERY, sort=SORT, size=10))
+
+    @staticmethod
+    def should_decode_floats_as_floats(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index([{**log, "duration": 0.25} for log in _logs(1)])
+        (doc,) = search_after_scan(index="logs", query=QUERY, sort=SORT, stream=True)
+        assert type(doc["_source"]["duration"]) is float
+
+    @staticmethod
+    def should_resume_from_last_hit_after_interrupted_response(elasticsearch: FakeElasticsearch, monkeypatch) -> None:
+        search_hits = search.search_hits
+        calls: list[list | None] = []
+
+        def _search_hits(**kwargs) -> Iterator[dict]:
+            calls.append(kwargs["search_after"])
+            for count, hit in enumerate(search_hits(**kwargs)):
+                if len(calls) == 1 and count == 3:
+                    raise ChunkedEncodingError("Connection broken")
+                yield hit
+
+        monkeypatch.setattr(search, "search_hits", _search_hits)
+        elasticsearch.index(_logs(10))
+        docs = list(
+            search_after_scan(
+                index="logs", query=QUERY, sort=SORT, size=5, stream=True, backoff=exponential_backoff(factor=0.0)
+            )
+        )
+        assert [doc["_source"]["message"] for doc in docs] == [f"log {i}" for i in range(10)]
+        assert calls[1] == docs[2]["sort"]
+
+
+class TestPointInTimeScan:
+    @staticmethod
+    @pytest.mark.parametrize("slices", [1, 2, 5])
+    def should_yield_all_results_in_sort_order(elasticsearch: FakeElasticsearch, slices: int) -> None:
+        elasticsearch.index(_logs(53))
+        docs = list(point_in_time_scan(index="logs", query=QUERY, sort=SORT, size=7, slices=slices))
+        assert [doc["_source"]["message"] for doc in docs] == [f"log {i}" for i in range(53)]
+
+    @staticmethod
+    def should_close_point_in_time(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index(_logs(10))
+        scan = point_in_time_scan(index="logs", query=QUERY, sort=SORT, size=2, slices=2)
+        next(scan)
+        assert len(elasticsearch.pits) == 1
+        scan.close()
+        assert not elasticsearch.pits
+
+    @staticmethod
+    def should_not_see_documents_indexed_after_opening(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index(_logs(4))
+        scan = point_in_time_scan(index="logs", query=QUERY, sort=SORT, size=1)
+        first = next(scan)
+        elasticsearch.index(_logs(4))
+        assert len([first, *scan]) == 4
+
+
+class TestTimeWindows:
+    @staticmethod
+    def should_split_hits_evenly_between_windows(elasticsearch: FakeElasticsearch) -> None:
+        elasticsearch.index(_logs(100))
+        windows = time_windows(index="logs", query=QUERY, timestamp_field="@timestamp", count=4)
+        assert len(windows) == 4
+        assert windows[0][0] is None and windows[-1][1] is None
+        counts = [
+            sum(
+                1
+                for doc in elasticsearch.documents
+                if (lower is None or _timestamp(doc) >= lower) and (upper is None or _timestamp(doc) < upper)
+            )
+            for lower, upper in windows
+        ]
+        assert sum(counts) == 100
+        assert all(20 <= count <= 30 for count in counts)
+
+    @staticmethod
+    def should_return_single_unbounded_window_without_hits(elasticsearch: FakeElasticsearch) -> None:
+        assert time_windows(index="logs", query=QUERY, timestamp_field="@timestamp", count=4) == [(None, None)]
+
+
+class TestDateHistogram:
+    @staticmethod
+    @pytest.mark.parametrize("interval,interval_type", [("1m", "calendar_interval"), ("30s", "fixed_interval")])
+    def should_count_hits_per_interval(elasticsearch: FakeElasticsearch, interval: str, interval_type: str) -> None:
+        elasticsearch.index(_logs(90))
+        buckets = date_histogram(index="logs", query=QUERY, timestamp_field="@timestamp", interval=interval)
+        assert sum(bucket["count"] for bucket in buckets) == 90
+        assert len(buckets) == {"1m": 2, "30s": 3}[interval]
+        (_, _, _, body), *_ = elasticsearch.requests
+        assert interval_type in body["aggs"]["histogram"]["date_histogram"]
+
+
+class TestTimeWindowScan:
+    @staticmethod
+    @pytest.mark.parametrize("parallel", [1, 3])
+    def should_yield_all_results_in_sort_order(elasticsearch: FakeElasticsearch, parallel: int) -> None:
+        elasticsearch.index(_logs(57))
+        docs = list(
+            time_window_scan(
+                index="logs", query=QUERY, sort=SORT, timestamp_field="@timestamp", size=5, parallel=parallel
+            )
+        )
+        assert [doc["_source"]["message"] for doc in docs] == [f"log {i}" for i in range(57)]
+
+
+def _timestamp(doc: dict) -> int:
+    return int(datetime.fromisoformat(doc["_source"]["@timestamp"]).timestamp() * 1000)
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    def _configure(**environment: str) -> None:
+        for key, value in {"ELASTICSEARCH_URL": FAKE_ELASTICSEARCH_URL, **environment}.items():
+            monkeypatch.setenv(key, value)
+        _clear_caches()
+
+    def _clear_caches() -> None:
+        for function in (get_cluster_settings, search.get_cluster_client):
+            function.cache_clear()
+
+    yield _configure
+    _clear_caches()
+
+
+class TestMultiClusterScan:
+    @staticmethod
+    @pytest.mark.parametrize("prefetch", [0, 2])
+    def should_merge_hits_from_each_cluster_in_sort_order(
+        clusters: dict[str, FakeElasticsearch], prefetch: int
+    ) -> None:
+        logs = _logs(30)
+        clusters["eu"].index(logs[::3])
+        clusters["us"].index([log for i, log in enumerate(logs) if i % 3])
+        docs = list(
+            multi_cluster_scan(
+                ["eu", "us"],
+                lambda: search_after_scan(index="logs", query=QUERY, sort=SORT, size=4, prefetch=prefetch),
+            )
+        )
+        assert [doc["_source"]["message"] for doc in docs] == [f"log {i}" for i in range(30)]
+        assert [doc["_cluster"] for doc in docs[:3]] == ["eu", "us", "us"]
+        assert len(clusters["eu"].requests) == 4
+        assert len(clusters["us"].requests) == 6
+
+    @staticmethod
+    @pytest.mark.parametrize("extra_args", [{}, {"prefetch": 2}, {"stream": True}])
+    def should_not_hold_back_hits_whilst_a_cluster_is_quiet_when_following(
+        clusters: dict[str, FakeElasticsearch], monkeypatch, extra_args: dict
+    ) -> None:
+        if extra_args.get("stream"):
+            pytest.importorskip("ijson")
+        monkeypatch.setattr(search, "sleep", lambda seconds: None)
+        logs = _logs(10)
+        clusters["us"].index(logs[:5])
+        docs = multi_cluster_scan(
+            ["eu", "us"],
+            lambda: search_after_scan(
+                index="logs", query=QUERY, sort=SORT, size=2, follow=True, heartbeats=True, **extra_args
+            ),
+        )
+        assert [next(docs)["_source"] for _ in range(5)] == logs[:5]
+        clusters["us"].index(logs[5:])
+        assert [next(docs)["_source"] for _ in range(5)] == logs[5:]
+        docs.close()
+        assert len(clusters["eu"].requests) > 1
+
+
+class TestGetClient:
+    @staticmethod
+    @pytest.mark.parametrize("url", [FAKE_ELASTICSEARCH_URL, "cloud:name:ZXhhbXBsZS5jb20kYWJjJGRlZg=="])
+    def should_negotiate_compressed_responses_by_default(settings, url: str) -> None:
+        settings(ELASTICSEARCH_URL=url)
+        assert search.get_client().headers["accept-encoding"] == "gzip,deflate"
+
+    @staticmethod
+    def should_not_negotiate_compression_when_disabled(settings) -> None:
+        settings(ELASTICSEARCH_COMPRESSION="none")
+        assert "accept-encoding" not in search.get_client().headers
+
+    @staticmethod
+    def should_apply_timeout_to_requests(settings) -> None:
+        settings(ELASTICSEARCH_TIMEOUT="5")
+        assert search.get_client().timeout == 5
+
+    @staticmethod
+    @pytest.mark.parametrize("compression", ["responses", "all", "none"])
+    def should_search_with_compression(settings, monkeypatch, compression: str) -> None:
+        settings(ELASTICSEARCH_COMPRESSION=compression)
+        elasticsearch = FakeElasticsearch()
+        elasticsearch.index(_logs(5))
+        client = search.get_client()
+        client.mount(FAKE_ELASTICSEARCH_URL, FakeElasticsearchAdapter(elasticsearch))
+        docs = list(search_after_scan(index="logs", query=QUERY, sort=SORT, size=2))
+        assert [doc["_source"]["message"] for doc in docs] == [f"log {i}" for i in range(5)]
+        content_encodings = {headers.get("content-encoding") for headers in elasticsearch.request_headers}
+        assert content_encodings == ({"gzip"} if compression == "all" else {None})
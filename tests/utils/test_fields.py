@@ -0,0 +1,19 @@
+from elastic_log_cli.utils.fields import get_field, without_field
+
+
+class TestGetField:
+    @staticmethod
+    def should_prefer_key_to_dotted_path() -> None:
+        assert get_field({"host.name": "a", "host": {"name": "b"}}, "host.name") == "a"
+        assert get_field({"host": {"name": "b"}}, "host.name") == "b"
+        assert get_field({"host": "b"}, "host.name") is None
+
+
+class TestWithoutField:
+    @staticmethod
+    def should_copy_objects_along_path() -> None:
+        document = {"host": {"name": "a", "ip": "b"}, "level": "INFO"}
+        assert without_field(document, "host.ip") == {"host": {"name": "a"}, "level": "INFO"}
+        assert without_field(document, "level") == {"host": {"name": "a", "ip": "b"}}
+        assert without_field(document, "host.missing") == document
+        assert document == {"host": {"name": "a", "ip": "b"}, "level": "INFO"}
@@ -0,0 +1,47 @@
+import pytest
+
+from elastic_log_cli.utils.page_size import AdaptivePageSize
+
+
+class TestAdaptivePageSize:
+    @staticmethod
+    def should_grow_whilst_pages_are_fast_and_small():
+        page_size = AdaptivePageSize(initial=1000, maximum=10000, target_latency=2.0, factor=2.0)
+        sizes = []
+        for _ in range(5):
+            page_size.observe(hits=page_size.size, latency=0.1, content_bytes=page_size.size * 100)
+            sizes.append(page_size.size)
+        assert sizes == [2000, 4000, 8000, 10000, 10000]
+
+    @staticmethod
+    def should_converge_on_target_latency():
+        page_size = AdaptivePageSize(initial=1000, target_latency=1.0)
+        for _ in range(10):
+            page_size.observe(hits=page_size.size, latency=page_size.size * 0.0005, content_bytes=0)
+        assert page_size.size == 2000
+
+    @staticmethod
+    def should_shrink_when_responses_are_too_large():
+        page_size = AdaptivePageSize(initial=1000, minimum=10, max_bytes=1024 * 1024, factor=4.0)
+        for _ in range(3):
+            page_size.observe(hits=page_size.size, latency=0.01, content_bytes=page_size.size * 10 * 1024)
+        assert page_size.size == 102
+
+    @staticmethod
+    def should_shrink_on_timeout_within_bounds():
+        page_size = AdaptivePageSize(initial=1000, minimum=300)
+        page_size.timed_out()
+        assert page_size.size == 500
+        page_size.timed_out()
+        assert page_size.size == 300
+
+    @staticmethod
+    def should_ignore_empty_pages():
+        page_size = AdaptivePageSize(initial=1000)
+        page_size.observe(hits=0, latency=5.0, content_bytes=100)
+        assert page_size.size == 1000
+
+    @staticmethod
+    def should_reject_minimum_greater_than_maximum():
+        with pytest.raises(ValueError):
+            AdaptivePageSize(minimum=2000, maximum=1000)
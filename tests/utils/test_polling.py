@@ -0,0 +1,23 @@
+import pytest
+
+from elastic_log_cli.utils.polling import PollingInterval
+
+
+class TestPollingInterval:
+    @staticmethod
+    def should_poll_immediately_whilst_pages_are_full():
+        polling = PollingInterval(minimum=1.0, maximum=8.0)
+        assert polling.next(received=10, capacity=10) == 0.0
+
+    @staticmethod
+    def should_back_off_whilst_polls_are_empty_and_reset_when_results_arrive():
+        polling = PollingInterval(minimum=1.0, maximum=8.0, factor=2.0)
+        intervals = [polling.next(received=0, capacity=10) for _ in range(6)]
+        assert intervals == [1.0, 2.0, 4.0, 8.0, 8.0, 8.0]
+        assert polling.next(received=3, capacity=10) == 1.0
+        assert polling.next(received=0, capacity=10) == 1.0
+
+    @staticmethod
+    def should_reject_minimum_greater_than_maximum():
+        with pytest.raises(ValueError):
+            PollingInterval(minimum=2.0, maximum=1.0)
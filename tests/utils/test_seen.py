@@ -0,0 +1,33 @@
+import pytest
+
+from elastic_log_cli.utils.seen import SeenSet
+
+
+def _hit(id_: int, index: str = "logs") -> dict:
+    return {"_index": index, "_id": str(id_)}
+
+
+class TestSeenSet:
+    @staticmethod
+    def should_only_add_unseen_hits() -> None:
+        seen = SeenSet()
+        assert [seen.add(hit) for hit in [_hit(1), _hit(2), _hit(1), _hit(1, index="other")]] == [
+            True,
+            True,
+            False,
+            True,
+        ]
+
+    @staticmethod
+    def should_forget_oldest_hits_when_full() -> None:
+        seen = SeenSet(capacity=3)
+        for id_ in range(5):
+            seen.add(_hit(id_))
+        assert len(seen) == 3
+        assert not seen.add(_hit(4))
+        assert seen.add(_hit(0))
+
+    @staticmethod
+    def should_require_positive_capacity() -> None:
+        with pytest.raises(ValueError):
+            SeenSet(capacity=0)
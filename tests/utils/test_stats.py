@@ -0,0 +1,51 @@
+from elastic_log_cli.utils.stats import Stats, format_summary
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestStats:
+    @staticmethod
+    def should_summarise_throughput_and_latency():
+        clock = FakeClock()
+        stats = Stats(clock=clock)
+        for latency in range(1, 21):
+            stats.record_request(latency=latency / 10, content_bytes=100_000)
+        stats.record_documents(500)
+        stats.record("backoff", 1.5)
+        stats.record("backoff", 0.5)
+        clock.now = 10.0
+        summary = stats.summary()
+        assert summary["documents_per_second"] == 50.0
+        assert summary["response_megabytes_per_second"] == 0.2
+        assert summary["requests"] == 20
+        assert summary["request_latency_p50_seconds"] == 1.0
+        assert summary["request_latency_p95_seconds"] == 1.9
+        assert summary["backoff_seconds"] == 2.0
+
+    @staticmethod
+    def should_bound_latency_samples():
+        stats = Stats(clock=FakeClock(), max_latency_samples=100)
+        for latency in range(10_000):
+            stats.record_request(latency=latency / 10_000, content_bytes=0)
+        summary = stats.summary()
+        assert len(stats.latencies) == 100
+        assert summary["requests"] == 10_000
+        assert 0.3 < summary["request_latency_p50_seconds"] < 0.7
+
+    @staticmethod
+    def should_summarise_without_requests():
+        summary = Stats(clock=FakeClock()).summary()
+        assert summary["request_latency_p95_seconds"] == 0.0
+        assert summary["documents_per_second"] == 0.0
+
+    @staticmethod
+    def should_format_summary_for_humans():
+        stats = Stats(clock=FakeClock())
+        stats.record("output", 0.25)
+        assert "output: 0.25s" in format_summary(stats.summary()).splitlines()